@@ -49,55 +49,143 @@ sys.path.append(os.path.abspath(path))
 ##########################
 # READ DATAFILE         #
 ##########################
+#Define a characteristic of the field patch that is stored in the field store 
+class FieldColumn():
+    ''' Attribute of a FieldPatch that reads and writes one cell of a column
+    (NumPy array) of the field store of the model '''
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, patch, owner=None):
+        if patch is None:
+            return self
+        return getattr(patch.model.fields, self.name)[patch.pos]
+
+    def __set__(self, patch, value):
+        getattr(patch.model.fields, self.name)[patch.pos] = value
+
+#Define a characteristic of the farmer that is part of the statistics of the model 
+class FarmerStatistic():
+    ''' Attribute of a Farmer that is counted in the statistics of the model 
+    (agent_type, agent_farm_size, agent_tree_size): the statistics are 
+    corrected every time it changes '''
+    def __set_name__(self, owner, name):
+        self.name = '_' + name
+
+    def __get__(self, farmer, owner=None):
+        if farmer is None:
+            return self
+        return getattr(farmer, self.name)
+
+    def __set__(self, farmer, value):
+        statistics = farmer.model.statistics
+        if farmer in statistics.farmers:
+            statistics.exclude(farmer)
+            setattr(farmer, self.name, value)
+            statistics.include(farmer)
+        else:
+            setattr(farmer, self.name, value)
+
+#Define the list of the field patches of a farmer 
+class FarmList():
+    ''' Attribute agent_farm_list of a Farmer: the list as it was last set, 
+    or the patches of the farmer in the ownership index of the model if it 
+    was never set (e.g. a farmer restored from a checkpoint), taken once when
+    it is first read '''
+    def __set_name__(self, owner, name):
+        self.name = '_' + name
+
+    def __get__(self, farmer, owner=None):
+        if farmer is None:
+            return self
+        farm_list = farmer.__dict__.get(self.name)
+        if farm_list is None:
+            farm_list = farmer.model.ownership.get_patches(farmer.agent_id)
+            farmer.__dict__[self.name] = farm_list
+        return farm_list
+
+    def __set__(self, farmer, value):
+        farmer.__dict__[self.name] = value
+
 #Define an  agent that represents a farmer 
-class FieldPatch(Agent):
+class FieldPatch():
     ''' This is the environment class that represents a random parcel with a 
     a centroid. Each random parcel is a raster landscape
     Each agent represents the farm as a whole. It does not make decision, is immobile,
-    but is updated with internalized information regards to productivity and land type'''
-    def __init__(self,patch_id, pos, model,field_id, field_owner_id,field_area,\
-                 field_suitability, field_le, field_le_current,\
-                 field_le_potential, field_size, field_soil, \
-                 field_landuse,field_ehs):
-        super().__init__(patch_id, model)
-        # DEFINITION OF THE FIELDS 
-        self.field_owner_id=field_owner_id         # field owner 
-        self.field_size=field_size             # size of the field 
-        self.field_suitability=field_suitability      # suitability of the field for agriculture 
-        self.field_landuse=field_landuse          # land_use type of the field
-        self.field_le = field_le  # land_use type of the field
-        self.field_le_current=field_le_current       # length of landscape elements in a pixel
-        self.field_le_potential=field_le_potential     # perimeter of the field 
-        self.field_ehs=field_ehs              # whether the field belongs to the area selected for the EHS
-
-    #Define the step to find the associated owner of the FIELD agent 
-    def find_field_owner_id(self):
-        self.field_owner = None 
-        if (self.field_owner_id == -1) or (self.field_owner_id == None):
-            self.field_owner = None 
-        else: 
-            for agent in self.model.schedule.agents_by_breed[Farmer].values():
-                if agent.agent_id == self.field_owner_id:
-                    self.field_owner = agent
+    but is updated with internalized information regards to productivity and land type.
+    The characteristics of the fields are stored in the field store of the model 
+    (one array per characteristic), a FieldPatch is only a light view of one cell. 
+    It is not scheduled: the owner and the distance to the owner are derived 
+    when they are asked.'''
+    __slots__ = ('model', 'pos')
+    # DEFINITION OF THE FIELDS 
+    field_id = FieldColumn()              # id of the field
+    field_area = FieldColumn()            # area of the field
+    field_size = FieldColumn()            # size of the field 
+    field_suitability = FieldColumn()     # suitability of the field for agriculture 
+    field_le_current = FieldColumn()      # length of landscape elements in a pixel
+    field_le_potential = FieldColumn()    # perimeter of the field 
+    field_soil = FieldColumn()            # soil of the field
+    field_ehs = FieldColumn()             # whether the field belongs to the area selected for the EHS
+    patch_farm_size = FieldColumn()       # size of the farm to which a patch belongs
 
-    #Define the step to calculate the overall productivity of the FARM agent 
-    def find_field_distance_owner(self):
-        """ Get the distance between two point, accounting for toroidal space.
-        Args:
-            pos_1, pos_2: Coordinate tuples for both points.
-        """
-        self.field_distance_owner = None
-        if self.field_owner != None:
-            x1, y1 = self.pos
-            x2, y2 = self.field_owner.pos
-            dx = np.abs(x1 - x2)
-            dy = np.abs(y1 - y2)
-            self.field_distance_owner = np.sqrt(dx * dx + dy * dy)
-
-    #Define behavior of the agent in the model 
-    def step(self):
-        self.find_field_owner_id()
-        self.find_field_distance_owner()
+    def __init__(self, model, pos):
+        self.model = model
+        self.pos = pos
+
+    #Two views of the same cell are the same patch
+    def __eq__(self, other):
+        return (type(other) is FieldPatch) and (self.pos == other.pos)
+
+    def __hash__(self):
+        return hash(self.pos)
+
+    #Id of the patch in the order of the grid
+    @property
+    def unique_id(self):
+        x, y = self.pos
+        return x * self.model.fields.height + y + 1
+
+    #The owner of the field is kept in the ownership index of the model, 
+    #every change of owner is a transfer in the index 
+    @property
+    def field_owner_id(self):
+        return self.model.fields.field_owner_id[self.pos]
+
+    @field_owner_id.setter
+    def field_owner_id(self, field_owner_id):
+        self.model.ownership.transfer(self.pos, field_owner_id)
+
+    #The landscape elements of the fields are part of the statistics of the model 
+    @property
+    def field_le(self):
+        return self.model.fields.field_le[self.pos]
+
+    @field_le.setter
+    def field_le(self, field_le):
+        self.model.statistics.change_land_use(self.model.fields.field_le[self.pos], field_le)
+        self.model.fields.field_le[self.pos] = field_le
+
+    #The land use of the field is kept in the land use raster of the model, 
+    #so the neighbourhood counts are updated when it changes 
+    @property
+    def field_landuse(self):
+        return self.model.landscape.get_landuse(self.pos)
+
+    @field_landuse.setter
+    def field_landuse(self, field_landuse):
+        self.model.landscape.set_landuse(self.pos, field_landuse)
+
+    #The associated owner of the FIELD agent 
+    @property
+    def field_owner(self):
+        return self.model.ownership.get_owner(self.pos)
+
+    #The distance between the field and its owner, kept in the distance 
+    #service of the model until the field changes owner
+    @property
+    def field_distance_owner(self):
+        return self.model.distances.get_owner_distance(self.pos)
 
 
 #Define an  agent that represents a farmer 
@@ -109,6 +197,14 @@ class Farmer(Agent):
     (1) maximize the net revenue value
     (2) get information from social network
     (3) imitate the social network '''
+    # CHARACTERISTICS COUNTED IN THE STATISTICS OF THE MODEL
+    agent_type = FarmerStatistic()
+    agent_farm_size = FarmerStatistic()
+    agent_tree_size = FarmerStatistic()
+    agent_cessation = FarmerStatistic()
+    # FIELD PATCHES OF THE FARMER
+    agent_farm_list = FarmList()
+
     def __init__(self,agent_id, pos, model, agent_type, agent_age,agent_business_type,\
                  agent_previous_transaction,agent_production,agent_production_extra,\
                  agent_national_landscape ):
@@ -127,6 +223,7 @@ class Farmer(Agent):
         self.agent_previous_transaction =agent_previous_transaction # average transactions made between 2001_2005. 
         self.agent_production_extra =agent_production_extra      # extra dsu per hectare due to differences between spatial data and census data (> 2 dsu/ha)
         self.agent_new = 0
+        self.draw_row = model.draws.add_row() # row of the random numbers of the farmer in each step
         #############################################
         # AGENTS' INITIAL CONDITIONS                #
         #############################################
@@ -157,28 +254,65 @@ class Farmer(Agent):
         if (self == None) and (other_object == None):
             distance = None 
         else:
-            x1, y1 = self.pos
-            x2, y2 = other_object.pos
-            dx = np.abs(x1 - x2)
-            dy = np.abs(y1 - y2)
-            distance = np.sqrt(dx * dx + dy * dy)
+            distance = self.model.distances.calculate(self.pos, other_object.pos)
         return distance 
 
+    #Find the farthest field of the farm (the first one in the order of the grid)
+    def find_farthest_field(self):
+        distances = self.model.distances.get_patch_distances(self.agent_farm_list, self)
+        return self.agent_farm_list[int(np.argmax(distances))]
+
+    #Find the nearest farmers that want to buy land (distance of the model, see Distances)
+    def find_nearest_buyers(self, k):
+        nearest_buyers = []
+        for distance, agent in self.model.buyers.find_nearest(self.pos, k=k):
+            agent.distance_self = distance
+            nearest_buyers.append(agent)
+        if self.model.profiler is not None:
+            self.model.profiler.count('buyers_evaluated', len(nearest_buyers))
+        return nearest_buyers
+
+    #The farmers that want to buy land are kept in the buyer registry of the model
+    @property
+    def agent_expansion(self):
+        return self._agent_expansion
+
+    @agent_expansion.setter
+    def agent_expansion(self, agent_expansion):
+        self._agent_expansion = agent_expansion
+        if agent_expansion == "buy":
+            self.model.buyers.add(self)
+        else:
+            self.model.buyers.remove(self)
+
+    #The land transactions of the last five years (oldest first) are kept in 
+    #the transaction history of the model, with their sum 
+    @property
+    def agent_transactions(self):
+        return self.model.transactions.get_row(self.transaction_row)
+
+    @agent_transactions.setter
+    def agent_transactions(self, agent_transactions):
+        self.model.transactions.set_row(self.transaction_row, agent_transactions)
+
+    #amount of land that an agent has bought/sold in the last 5 years
+    @property
+    def agent_farm_expansion_sum(self):
+        return self.model.transactions.sums[self.transaction_row]
+
     #Define the step to calculate the overall productivity of the FARM agent 
     def calculate_other_characteristics(self):
         # Calculation of other agents' characteristics
         ## Calculation of other agents' characteristics
-        self.agent_transactions = [self.agent_previous_transaction] * 5  # list the transactions (2001_2005) in five years 
-        self.agent_farm_expansion_sum  = sum(self.agent_transactions)         # amount of land that an agent has bought/sold in the last 5 years
+        # the transactions (2001_2005) in five years, kept in the transaction history of the model
+        self.transaction_row = self.model.transactions.add_row([self.agent_previous_transaction] * 5)
         self.agent_farm_expansion =  0    # create the value of land_transaction                   
         # create a list of patches that belong to each agent
-        self.agent_farm_list =[field for field in \
-                               self.model.schedule.get_agents_by_breed(FieldPatch).values()
-                               if (field.field_owner_id == self.agent_id)]
+        self.agent_farm_list = self.model.ownership.get_patches(self.agent_id)
         self.agent_farm_size = sum(field.field_size for field in self.agent_farm_list) # define the farm size
         self.agent_farm_size_previous = self.agent_farm_size  # define the previous farm size   
         self.agent_farm_size_initial=  sum(field.field_size for field in self.agent_farm_list) # define the initial farm size
-        self.agent_decision_trees = random.randint(1, 10)# define randomly the year an agent participated in a policy to protect these elements
+        self.agent_decision_trees = int(self.model.rng_farmers.integers(1, 11))# define randomly the year an agent participated in a policy to protect these elements
         self.agent_cessation = ""  # definition of the variable
         self.agent_tree_size = len([field for field in self.agent_farm_list if \
                                         (field.field_le ==1)] )
@@ -188,125 +322,62 @@ class Farmer(Agent):
     #############################################
     #To intialize option of the agent type 
     def option_agent_type(self):
-        if self.agent_type ==1: # Hobby
-            self.p_expand_type =0.01      # Combined with p_shrink
-            self.p_shrink_type =0.05      # Combined with p_expand, real value = 0.12
-            self.p_stop_type   =0.34      # Data based on farmers between 50_60 years old of the detailed survey 
-            self.p_protect_type=0.20      # Define the probability to cut/keep/plant landscape elements
-            
-        elif self.agent_type == 2:# Conventional
-            self.p_expand_type =0.28      # Combined with p_shrink
-            self.p_shrink_type =0.04      # Combined with p_expand, real value = 0.11
-            self.p_stop_type   =0.36      # Data based on farmers between 50_60 years old of the detailed survey 
-            self.p_protect_type=0.32      # Define the probability to cut/keep/plant landscape elements
-            
-        elif self.agent_type == 3: # Diversifier
-            self.p_expand_type =0.35      # Combined with p_shrink
-            self.p_shrink_type =0.10      # Combined with p_expand, real value = 0.08
-            self.p_stop_type   =0.32      # Data based on farmers between 50_60 years old of the detailed survey 
-            self.p_protect_type=0.47      # Define the probability to cut/keep/plant landscape elements
-            
-        elif self.agent_type == 4:# Expansionist conventional
-            self.p_expand_type =0.60      # Combined with p_shrink
-            self.p_shrink_type =0.005     # Combined with p_expand, real value = 0.02
-            self.p_stop_type   =0.06      # Data based on farmers between 50_60 years old of the detailed survey
-            self.p_protect_type= 0.20      # Define the probability to cut/keep/plant landscape elements
-            
-        elif self.agent_type ==  5: # Expansionist diversifier
-            self.p_expand_type =0.64      # Combined with p_shrink
-            self.p_shrink_type =0.005     # Combined with p_expand, real value = 0.01
-            self.p_stop_type   =0.05      # Data based on farmers between 50_60 years old of the detailed survey
-            self.p_protect_type=0.47      # Define the probability to cut/keep/plant landscape elements
+        # The probabilities to expand, shrink, stop and cut/keep/plant landscape elements 
+        # of each agent type are read from the scenario tables of the model (scenarios.json)
+        scenarios = self.model.scenarios
+        if 0 <= self.agent_type < len(scenarios.type_probabilities):
+            for name, value in zip(scenarios.type_names, \
+                                   scenarios.type_probabilities[self.agent_type].tolist()):
+                if value == value:
+                    setattr(self, name, value)
             
     #To intialize option of the agent
     def option_agent_initial(self):
         # Based on the previous land transactions, 
         # the initial conditions are defined in this step for:
         # Farm cessation
-        self.agent_random_stop= random.uniform(0, 1)
+        rng = self.model.rng_farmers
+        self.agent_random_stop= rng.uniform(0, 1)
         # Protection of landscape elements
-        self.agent_random_protect = random.uniform(0, 1)
+        self.agent_random_protect = rng.uniform(0, 1)
         # Farm expansion
         if self.agent_farm_expansion_sum > 0.1:
-            self.agent_random_expand= random.uniform(0, self.p_expand_type + 0.1)
+            self.agent_random_expand= rng.uniform(0, self.p_expand_type + 0.1)
         
         elif self.agent_farm_expansion_sum < -0.1:
             self.agent_random_expand=  (0.9 - self.p_shrink_type)\
-                + random.uniform(0, self.p_shrink_type + 0.1)
+                + rng.uniform(0, self.p_shrink_type + 0.1)
         
         else:
             self.agent_random_expand = (self.p_expand_type - 0.1)\
-                +random.uniform(0,(1-self.p_shrink_type))\
+                +rng.uniform(0,(1-self.p_shrink_type))\
                 - self.p_expand_type + 0.2
                             
     #############################################
     # FEEDBACK EXOGENOUS SCENARIO               #
     #############################################
     def feedback_exogenous_scenario(self):
-        if self.model.scenario == "Basic":
-            self.p_exogenous_stop  = 1 # For the whole population, no influence  
-            self.p_business_stop   = 0 # For the whole population, no influence
-            self.p_exogenous_expand= 0 # For the whole population, no influence
-            self.p_scenario_ehs    = 0                                # For the whole population, no influence
-            
-        elif self.model.scenario == "Trend":
-            self.p_exogenous_stop  = 1.5 # For the whole population, no influence  
-            self.p_business_stop   = 0 # For the whole population, no influence
-            if self.agent_type <4: # Difference between the buying capacity of non_expansionist and expansionist agents
-                self.p_exogenous_expand= 0.2 # non_expansionits (assumed)
-            else: 
-                self.p_exogenous_expand= 0.3 # expansionist (assumed)
-
-        elif self.model.scenario == 'B2':
-            self.p_exogenous_stop= 1.6 # For the whole population (assumed)
-            self.p_business_stop = 0   # For the whole population, no influence
-            if self.agent_business_type == 1:
-                self.p_business_stop =-0.08 # Arable farms (calculated, secondary data)
-            elif self.agent_business_type == 4:
-                self.p_business_stop =0.15 # Dairy farms (calculated, secondary data)
-            elif self.agent_business_type == 5:
-                self.p_business_stop =-0.06 # Other grassland farms (calculated, secondary data)
-            elif self.agent_business_type == 6:
-                self.p_business_stop = 0.15 # Intensive livestock farms (calculated)
-            elif self.agent_business_type == 7: 
-                self.p_business_stop = 0.10 # Mixed farms (calculated, secondary data)
-            if self.agent_type < 4 :# Difference between the buying capacity of non_expansionist and expansionist agents
-                self.p_exogenous_expand = 0.2 # non_expansionits (assumed)
-                self.p_exogenous_expand = 0.3 # expansionist (assumed) 
-
-        elif self.model.scenario ==  "A1":
-            self.p_exogenous_stop = 2 # For the whole population (assumed)
-            self.p_business_stop  = 0 # For the whole population, no influence
-            if self.agent_business_type == 1:
-                self.p_business_stop = 0.06 # Arable farms (calculated, secondary data)
-            elif self.agent_business_type ==4:
-                self.p_business_stop = 0.09 # Dairy farms (calculated, secondary data)
-            elif self.agent_business_type ==5:
-                self.p_business_stop= -0.11 # Other grassland farms (calculated, secondary data)
-            elif self.agent_business_type ==6:
-                self.p_business_stop  = 0.09# Intensive livestock farms (calculated)
-            elif self.agent_business_type == 7:
-                self.p_business_stop =-0.04 # Mixed farms (calculated, secondary data)
-            if self.agent_type < 4: # Difference between the buying capacity of non_expansionist and expansionist agents
-                self.p_exogenous_expand = 0.2 # non_expansionits (assumed)
-            else:
-                self.p_exogenous_expand  = 0.4 # expansionist (assumed)
+        # The influence of the exogenous processes of the scenario on the whole population,  
+        # on the agribusiness type (p_business_stop) and on the buying capacity of the agent 
+        # type (p_exogenous_expand) is read from the scenario tables of the model. 
+        # A value that the scenario does not define is not set
+        values = self.model.scenarios.get_exogenous(self.model.scenario_index, \
+                                                    self.agent_type, self.agent_business_type)
+        for name, value in zip(('p_exogenous_stop', 'p_business_stop', \
+                                'p_exogenous_expand', 'p_scenario_ehs'), values):
+            value = float(value)
+            if value == value:
+                setattr(self, name, value)
 
     #To incluence of the different scenarios in the probabilities
     def feedback_endogenous_landscape(self):
         # feedback only included in the A1 scenario. Immigrants from the urban areas can buy hobby farms (likelihood 0.5)
         # when these are located in areas surrounded more than 10% with nature (assumed).
-        self.agent_random_sell  =  random.uniform(0, 1)
+        self.agent_random_sell  =  self.model.draws.get_uniform(self.draw_row, 'sell')
         # Count all patches in the study area within a radius of 1Km
-        for patch in self.model.schedule.agents_by_breed[FieldPatch].values():
-            patch.distance_to_agent = self.calculate_distance(patch)
-        self.patches_around =len([patch for patch in\
-                                 self.model.schedule.agents_by_breed[FieldPatch].values()if \
-                                 (patch.field_landuse > 0) and (patch.distance_to_agent < 10)])
+        self.patches_around = self.model.landscape.count_within(self.pos, 10)
         # Count patches with nature in the study area within a radius of 1Km
-        self.nature_around = len([patch for patch in\
-                                 self.model.schedule.agents_by_breed[FieldPatch].values() if \
-                                 (patch.field_landuse ==4) and (patch.distance_to_agent < 10)])
+        self.nature_around = self.model.landscape.count_within(self.pos, 10, landuse_class=4)
         if (self.agent_random_sell > 0.5) and (self.model.scenario == "A1") \
                     and (self.agent_farm_size < 10):
             # Calculate the propotion of surrouding nature area 
@@ -318,7 +389,7 @@ class Farmer(Agent):
             self.surrounding_nature = -1 
         # Those with more than 10% of nature are sold to urban immigrants and probabilities are re_calculated
         if self.surrounding_nature > 0.1: 
-            self.agent_random_expand = random.uniform(0, 1)
+            self.agent_random_expand = self.model.draws.get_uniform(self.draw_row, 'immigrant')
             self.agent_type= 1
             self.agent_age = 37
             self.agent_new = 1 
@@ -334,41 +405,36 @@ class Farmer(Agent):
     ###########################################################################
     #To Increase of the agents' buying capacity per scenario (assumed values)
     def feedback_internal_actions(self):
-        if self.model.scenario == "Basic":
-            self.model.index_growth =  0
-        elif self.model.scenario == "Trend":
-           self.model.index_growth  = 0.1
-        elif self.model.scenario == 'B2': 
-            self.model.index_growth = 0.1
-        elif self.model.scenario == "A1":
-            self.model.index_growth= 0.3
+        # The increase of the buying capacity of the scenario is a constant of 
+        # the context of the step, set once for all the farmers
+        context = self.model.context
+        index_growth = context.index_growth
         
         # Propabibility that an agent will increase his farm_size based on her/his current farm size 
-        # and previous transactions (empirical data). Mean farm size is recalculate every time step 
-        # to include the general changes of farm size of the whole population through time
-        self.model.mean_farm_size = np.mean([farmer.agent_farm_size for farmer in 
-                                 self.model.schedule.get_agents_by_breed(Farmer).values()])
+        # and previous transactions (empirical data). Mean farm size is read from the context 
+        # of the step, kept up to date at every change of farm size of the whole population 
+        mean_farm_size = context.mean_farm_size
         if self.agent_farm_size < 10: # unit ha
             if (self.agent_farm_expansion_sum <= \
-                (2 * self.model.mean_farm_size * self.model.index_growth) and \
-                (self.agent_farm_expansion_sum > self.model.mean_farm_size)): 
-                self.p_expand_feedback = 0.86 + self.model.index_growth
-            if (self.agent_farm_expansion_sum <= self.model.mean_farm_size) and \
+                (2 * mean_farm_size * index_growth) and \
+                (self.agent_farm_expansion_sum > mean_farm_size)): 
+                self.p_expand_feedback = 0.86 + index_growth
+            if (self.agent_farm_expansion_sum <= mean_farm_size) and \
                 (self.agent_farm_expansion_sum > 2):
-                self.p_expand_feedback = 0.61 + self.model.index_growth
+                self.p_expand_feedback = 0.61 + index_growth
         if self.agent_farm_size >= 10: 
-            if (self.agent_farm_expansion_sum <= 2 * self.model.mean_farm_size) and \
-                (self.agent_farm_expansion_sum > self.model.mean_farm_size):
-                self.p_expand_feedback = 0.73 + self.model.index_growth
-            if (self.agent_farm_expansion_sum <= self.model.mean_farm_size) and \
+            if (self.agent_farm_expansion_sum <= 2 * mean_farm_size) and \
+                (self.agent_farm_expansion_sum > mean_farm_size):
+                self.p_expand_feedback = 0.73 + index_growth
+            if (self.agent_farm_expansion_sum <= mean_farm_size) and \
                 (self.agent_farm_expansion_sum > 2):
-                self.p_expand_feedback =  0.45 + self.model.index_growth
+                self.p_expand_feedback =  0.45 + index_growth
 
-        if self.agent_farm_expansion_sum > (2 *self.model.mean_farm_size):
-            self.p_expand_feedback = 0.20 + self.model.index_growth
+        if self.agent_farm_expansion_sum > (2 *mean_farm_size):
+            self.p_expand_feedback = 0.20 + index_growth
             #this value is the same for all agents
-        if self.agent_farm_expansion_sum > (4 * self.model.mean_farm_size):
-            self.p_expand_feedback = (0.05 + self.model.index_growth)
+        if self.agent_farm_expansion_sum > (4 * mean_farm_size):
+            self.p_expand_feedback = (0.05 + index_growth)
             #agents cannot grow anymore
         if self.agent_farm_expansion_sum <= 2:
             self.p_expand_feedback = 1
@@ -387,8 +453,11 @@ class Farmer(Agent):
         # Based on the calibration of the amplitude of the curve, 0.06 was the selected value (calculated)
         self.agent_random_expand_initial = self.agent_random_expand
         self.agent_random_protect_initial = self.agent_random_protect
-        self.agent_random_expand= np.random.normal(self.agent_random_expand_initial, 0.06)
-        self.agent_random_protect=np.random.normal(self.agent_random_protect_initial,0.06)
+        # the normal numbers of the step are drawn for all the farmers at once
+        self.agent_random_expand= self.agent_random_expand_initial + \
+            0.06 * self.model.draws.get_normal(self.draw_row, 'expand')
+        self.agent_random_protect= self.agent_random_protect_initial + \
+            0.06 * self.model.draws.get_normal(self.draw_row, 'protect')
         # Probabilities need to be between 0 and 1.  
         if self.agent_random_expand < 0:
             self.agent_random_expand= 0
@@ -442,7 +511,7 @@ class Farmer(Agent):
                     self.agent_type = 3
                 # Their probabilities are recalculated, but they are 0.5 more likely to sell their farms (assumed)
                 self.option_agent_type()
-                self.agent_random_expand = 0.5 +  random.uniform(0, 0.5)
+                self.agent_random_expand = 0.5 +  0.5 * self.model.draws.get_uniform(self.draw_row, 'stop')
                # Those who don't stop will inherit their farm (no changes in agent type)
         else: 
             self.agent_cessation ="inherit" 
@@ -451,25 +520,12 @@ class Farmer(Agent):
         # Depending on the scenario, \
         #the proportion of agents stopping farming each year varies. 
         #This has to be calculated per year (calculated, secondary data) 
-        self.model.total_agents = self.model.schedule.get_breed_count(Farmer)
-        self.model.total_agents_stop = len([agent for agent in \
-                                 self.model.schedule.get_agents_by_breed(Farmer).values()\
-                                 if (agent.agent_cessation == 'stop' )])
-        if self.model.scenario == "Basic":
-            self.model.index_stop_year = 0.1
-        if self.model.scenario == "Trend":
-            self.model.index_stop_year = 0.025 
-#            self.model.index_stop_year = (0.025 * total_agents)/total_agents_stop
-        if self.model.scenario == "B2":
-            self.model.index_stop_year = 0.029 
-#            self.model.index_stop_year = (0.029 * total_agents)/total_agents_stop
-        if self.model.scenario == "A1":
-            self.model.index_stop_year = 0.040
-#            self.model.index_stop_year = (0.040 * total_agents)/total_agents_stop
+        #It is kept in the context of the step 
+        context = self.model.context
         
         # only agents older than 65 years are able to inherit their farm
         if (self.agent_cessation == "inherit")  and (self.agent_age >= 65):
-            self.percentage_agents =  random.uniform(0, 1)
+            self.percentage_agents =  self.model.draws.get_uniform(self.draw_row, 'inherit')
             # Agents younger than 84 have 0.1 likelihood to inherit their farm (empirical data) 
             # and agents 84 years old inherit the farm
             if ((self.percentage_agents < 0.1) or (self.agent_age >= 84)):
@@ -481,14 +537,14 @@ class Farmer(Agent):
             # The process of stop farming differ between scenarios
             # Based on a random number and the expected number of agent 
             #to stop per year or when they are older than 84, agents stop farming
-            self.percentage_agents =  random.uniform(0, 1)
-            if (self.percentage_agents < self.model.index_stop_year) or (self.agent_age >= 84):
+            self.percentage_agents =  self.model.draws.get_uniform(self.draw_row, 'cessation')
+            if (self.percentage_agents < context.index_stop_year) or (self.agent_age >= 84):
                 if self.model.scenario == "A1":
                     # In the A1 scenario, to sell fields that are part of the EHS in order to develop nature depends on a  
                     # random number and the suitability of the field for agriculture, the lower the suitability the higher chance to be sold
-                    for field in self.agent_farm_list:
-                        field.random_ehs= (random.uniform(0,1) + field.field_suitability)/ 2
-                        if field.random_ehs < 0.5:
+                    random_ehs = self.model.rng_farmers.uniform(0, 1, len(self.agent_farm_list))
+                    for field, random_field in zip(self.agent_farm_list, random_ehs):
+                        if (random_field + field.field_suitability)/ 2 < 0.5:
                             field.field_ehs =1
                     self.fields_ehs = [field for field in self.agent_farm_list if \
                                       field.field_ehs ==1]
@@ -497,19 +553,16 @@ class Farmer(Agent):
                         # patches sold to the nature development organisation
                         farm.field_landuse =  4
                         # new land_use nature
-                    self.agent_farm_list = []
-                    for field in self.model.schedule.get_agents_by_breed(FieldPatch).values():
-                        if field.field_owner_id == self.agent_id:
-                            self.agent_farm_list.append(field)
+                    self.agent_farm_list = self.model.ownership.get_patches(self.agent_id)
                     
                     # Those agent without any other field will quit
                     if (self.agent_farm_list == []):
-                        self.model.schedule.remove()
+                        self.model.remove_farmer(self)
 
                     # In the A1 scenario, non_hobby agents are (0.5) likely to 
                     # sell their fields not suitable for 
                     # agriculture and outside the EHS to be converted into nature
-                    self.agent_random_abandon = random.uniform(0,1)
+                    self.agent_random_abandon = self.model.draws.get_uniform(self.draw_row, 'abandon')
                     if (self.agent_type > 1) and (self.agent_random_abandon > 0.5):
                         # Nature development 
                         self.fields_abandon = [field for field in self.agent_farm_list\
@@ -519,14 +572,11 @@ class Farmer(Agent):
                             # patches sold to the nature development organisation
                             field.field_landuse=  4
                     # new land_use nature
-                    self.agent_farm_list = []
-                    for field in self.model.schedule.get_agents_by_breed(FieldPatch).values():
-                        if field.field_owner_id == self.agent_id:
-                            self.agent_farm_list.append(field)
+                    self.agent_farm_list = self.model.ownership.get_patches(self.agent_id)
                             
                     # Those agent without any other field will quit
                     if (self.agent_farm_list == []):
-                        self.model.schedule.remove()
+                        self.model.remove_farmer(self)
                 else:
                     # In the other sceanrios fields located in the EHS are abandoned 
                     self.fields_ehs = [field for field in self.agent_farm_list if \
@@ -539,28 +589,18 @@ class Farmer(Agent):
                         farm.field_landuse =  4
                     
                     # new land_use nature
-                    self.agent_farm_list = []
-                    for field in self.model.schedule.get_agents_by_breed(FieldPatch).values():
-                        if field.field_owner_id == self.agent_id:
-                            self.agent_farm_list.append(field)
+                    self.agent_farm_list = self.model.ownership.get_patches(self.agent_id)
 
                     # Those agent without any other field will quit
                     if (self.agent_farm_list == []):
-                        self.model.schedule.remove()
+                        self.model.remove_farmer(self)
                     
                     # From the land left, big farms (> 5 fields) are sold to 
                     #different buyers (assumed)
                     while len(self.agent_farm_list > 5):
                         # Selection of the buyer
                         # The buyer should be close to the seller
-                        self.buyers = [agent for agent in \
-                                       self.model.schedule.get_agents_by_breed(Farmer).values()\
-                                       if (agent.agent_expansion == 'buy')]
-                        for agent in self.buyers:
-                            agent.distance_self = self.calculate_distance(agent)
-                        self.buyers.sort(key=lambda \
-                                                x: x.distance_self, reverse=False)
-                        self.nearest_10_buyers = self.buyers[0:9]
+                        self.nearest_10_buyers = self.find_nearest_buyers(9)
                         # the variables to selected the buyer are reset to change 
                         # previous values
                         for agent in self.nearest_10_buyers:
@@ -568,7 +608,7 @@ class Farmer(Agent):
                             agent.weight_distance =0
                             agent.weight_type =0
                             # the variables to select the buyer are re_calculated
-                            agent.weight_random = np.random.uniform(0,1)
+                            agent.weight_random = self.model.rng_market.uniform(0,1)
                             if agent.agent_farm_size > self.agent_farm_size: 
                                 agent.weight_size = 0.1
                             if agent.distance_self < 20:
@@ -581,54 +621,40 @@ class Farmer(Agent):
                         self.nearest_10_buyers.sort(key=lambda x: x.weight_buy, reverse=True)
                         self.buyer = self.nearest_10_buyers[0]
                         # Five fields to be sold are selected  
-                        self.patches_sell =random.sample(self.agent_farm_list, 5)  
+                        self.patches_sell = [self.agent_farm_list[i] for i in \
+                                             self.model.rng_farmers.choice(len(self.agent_farm_list), 5, replace=False)]
                         # Land transaction
                         for patch in self.patches_sell:
                             patch.field_owner_id = self.buyer.agent_id
                         
                         # Update the land owned and land transactions by the closest buyer
-                        self.buyer.agent_farm_list =[]
-                        for field in self.model.schedule.get_agents_by_breed(FieldPatch).values():
-                            if field.field_owner_id == self.buyer.agent_id:
-                                self.buyer.agent_farm_list.append(field)
-                        for field in self.buyer.agent_farm_list:
-                            field.find_field_owner_id()
-                            field.find_field_distance_owner()
+                        self.buyer.agent_farm_list = self.model.ownership.get_patches(self.buyer.agent_id)
                         self.buyer.agent_expansion = "bought"
 
                         # Update the farm of the seller 
-                        self.agent_farm_list =[]
-                        for field in self.model.schedule.get_agents_by_breed(FieldPatch).values():
-                            if field.field_owner_id == self.agent_id:
-                                self.agent_farm_list.append(field)
-                        for field in self.agent_farm_list:
-                            field.find_field_owner_id()
-                            field.find_field_distance_owner()
+                        self.agent_farm_list = self.model.ownership.get_patches(self.agent_id)
                     
                     # Before agents stop farming they can sell their farm 
                     # to urban immigrants (only hobby and in the A1 scenario)
                     self.feedback_endogenous_landscape()
                     # Agents who are not new immigrants would continue selling their land
-                    if self.agent_new == 0:
+                    if (self.agent_new == 0) and (self.model.market is not None):
+                        # With the batched land market, the rest of the farm is offered 
+                        # to the 9 nearest buyers and sold when the market is cleared
+                        self.model.market.offer(self, self.agent_farm_list, k=9)
+                    elif self.agent_new == 0:
                         # The rest of big farms or small farms are sold to one buyer 
                         # The buyer should be close to the seller
                         # The buyer should be close to the seller
                         # The buyer should be close to the seller
-                        self.buyers = [agent for agent in \
-                                       self.model.schedule.get_agents_by_breed(Farmer).values()\
-                                       if (agent.agent_expansion == 'buy')]
-                        for agent in self.buyers:
-                            agent.distance_self = self.calculate_distance(agent)
-                        self.buyers.sort(key=lambda \
-                                                x: x.distance_self, reverse=False)
-                        self.nearest_10_buyers = self.buyers[0:9]
+                        self.nearest_10_buyers = self.find_nearest_buyers(9)
                         for agent in self.nearest_10_buyers:
                             # the variables to selected the buyer are reset
                             agent.weight_size =0
                             agent.weight_distance =0
                             agent.weight_type =0
                             # the variables to select the buyer are calculated
-                            agent.weight_random = np.random.uniform(0,1)
+                            agent.weight_random = self.model.rng_market.uniform(0,1)
                             if agent.agent_farm_size > self.agent_farm_size: 
                                 agent.weight_size = 0.1
                             if agent.distance_self < 20:
@@ -638,37 +664,24 @@ class Farmer(Agent):
                             agent.weight_buy = (agent.weight_size + agent.weight_distance\
                                               + agent.weight_type + agent.weight_random)
                         # Selection of the buyer
-                        self.buyers.sort(key=lambda \
+                        self.nearest_10_buyers.sort(key=lambda \
                                                 x: x.weight_buy, reverse=True)
-                        if self.buyers !=[]:
-                            self.nearest_10_buyers = self.buyers[0:9]
+                        if self.nearest_10_buyers !=[]:
                             self.buyer = self.nearest_10_buyers[0]
                             # Land transaction
                             for field in self.agent_farm_list:
                                 field.field_owner_id = self.buyer.agent_id
     
                             # Update the land owned and land transactions by the closest buyer
-                            self.buyer.agent_farm_list =[]
-                            for field in self.model.schedule.get_agents_by_breed(FieldPatch).values():
-                                if field.field_owner_id == self.buyer.agent_id:
-                                    self.buyer.agent_farm_list.append(field)
-                            for field in self.buyer.agent_farm_list:
-                                field.find_field_owner_id()
-                                field.find_field_distance_owner()
+                            self.buyer.agent_farm_list = self.model.ownership.get_patches(self.buyer.agent_id)
                             self.buyer.agent_expansion = "bought"
 
                         # Update the farm of the seller 
-                        self.agent_farm_list =[]
-                        for field in self.model.schedule.get_agents_by_breed(FieldPatch).values():
-                            if field.field_owner_id == self.agent_id:
-                                self.agent_farm_list.append(field)
-                        for field in self.agent_farm_list:
-                            field.find_field_owner_id()
-                            field.find_field_distance_owner()
+                        self.agent_farm_list = self.model.ownership.get_patches(self.agent_id)
                     
                     # Those agent without any other field will quit
                     if (self.agent_farm_list == []):
-                        self.model.schedule.remove()
+                        self.model.remove_farmer(self)
 
     ###########################################################################
     # EXPANSION/SHRINKAGE                                                     #
@@ -734,16 +747,12 @@ class Farmer(Agent):
                 self.fields_ehs = [field for field in self.agent_farm_list if \
                                       field.field_ehs ==1]
                 if self.fields_ehs != []:
-                    self.field_sell = random.sample(self.fields_ehs,1)
+                    self.field_sell = [self.fields_ehs[self.model.rng_farmers.integers(len(self.fields_ehs))]]
                 else:
-                    self.agent_farm_list.sort(key=lambda \
-                                                x: x.field_distance_owner, reverse=True)
-                    
-                    self.field_sell =self.agent_farm_list[0]
+                    # the farthest field (distances of the whole farm at once)
+                    self.field_sell = self.find_farthest_field()
             else:
-                self.agent_farm_list.sort(key=lambda \
-                                                x: x.field_distance_owner, reverse=True)
-                self.field_sell =self.agent_farm_list[0]
+                self.field_sell = self.find_farthest_field()
                 # In the Basic, Trend and B2 scenarios,\
                 #fields that are in the EHS are developed into nature.
                 # In the A1 scenrio, only those located 
@@ -756,57 +765,35 @@ class Farmer(Agent):
                     # Nature development  
                     self.field_sell.field_owner_id = 9999
                     self.field_sell.field_landuse =4
-                    self.agent_farm_list=[]
-                    for field in self.model.schedule.get_agents_by_breed(FieldPatch).values():
-                        if field.field_owner_id == self.agent_id:
-                            self.agent_farm_list.append(field)
+                    self.agent_farm_list = self.model.ownership.get_patches(self.agent_id)
                     self.field_sell = []
                     # Update the farm of the seller
-                    self.agent_farm_list =[]
-                    for field in self.model.schedule.get_agents_by_breed(FieldPatch).values():
-                        if field.field_owner_id == self.agent_id:
-                            self.agent_farm_list.append(field)
-                    for field in self.agent_farm_list:
-                        field.find_field_owner_id()
-                        field.find_field_distance_owner()
+                    self.agent_farm_list = self.model.ownership.get_patches(self.agent_id)
 
                 
+                elif self.model.market is not None:
+                    # With the batched land market, the field is offered to the closest 
+                    # buyer and sold when the market is cleared after all the farmers
+                    self.model.market.offer(self, [self.field_sell])
                 else:
                     # Individual fields are sold to the closest buyer 
-                    self.buyers = [agent for agent in \
-                                       self.model.schedule.get_agents_by_breed(Farmer).values()\
-                                       if (agent.agent_expansion == 'buy')]
-                    for agent in self.buyers:
-                        agent.distance_self = self.calculate_distance(agent)
-                    self.buyers.sort(key=lambda x: x.distance_self, reverse=False)
+                    self.buyers = self.find_nearest_buyers(1)
                     if self.buyers != []:
                         self.closest_buyer = self.buyers[0]
                         # Land transaction
                         for field in [self.field_sell]:
                                 field.field_owner_id = self.closest_buyer.agent_id
                         # Update the land owned and land transactions by the closest buyer
-                        self.closest_buyer.agent_farm_list =[]
-                        for field in self.model.schedule.get_agents_by_breed(FieldPatch).values():
-                            if field.field_owner_id == self.closest_buyer.agent_id:
-                                self.closest_.agent_farm_list.append(field)
-                        for field in self.closest_buyer.agent_farm_list:
-                            field.find_field_owner_id()
-                            field.find_field_distance_owner()
-                        self.closet_buyer.agent_expansion = "bought"
+                        self.closest_buyer.agent_farm_list = self.model.ownership.get_patches(self.closest_buyer.agent_id)
+                        self.closest_buyer.agent_expansion = "bought"
                     
                 # Update the farm of the seller
-                self.agent_farm_list =[]
-                for field in self.model.schedule.get_agents_by_breed(FieldPatch).values():
-                    if field.field_owner_id == self.agent_id:
-                        self.agent_farm_list.append(field)
-                for field in self.agent_farm_list:
-                    field.find_field_owner_id()
-                    field.find_field_distance_owner()
+                self.agent_farm_list = self.model.ownership.get_patches(self.agent_id)
                 self.agent_expansion = "sold"
                 
                 #Those agent without any other field will quit
                 if (self.agent_farm_list == []):
-                    self.model.schedule.remove()
+                    self.model.remove_farmer(self)
 
     ###########################################################################
     # PROTECT TREE                                                            #
@@ -913,7 +900,7 @@ class Farmer(Agent):
                     # landspcape elements to be planted
                     if self.fields_plant != []:
                         # Selection of the field 
-                        self.field_plant = random.sample(self.fields_plant)
+                        self.field_plant = self.fields_plant[self.model.rng_farmers.integers(len(self.fields_plant))]
                     # Change the amount of landscape elements in the field
                     self.field_plant.field_le = 1
                     self.field_plant.field_le_current = (self.field_plant.field_le_current +\
@@ -945,8 +932,6 @@ class Farmer(Agent):
         # Define the farm to which a patch belongs
         self.patch_farm_area =  self.agent_farm_size
         for farm in self.agent_farm_list:
-            farm.find_field_owner_id()
-            farm.find_field_distance_owner() # define the distance of each patch to the house
             farm.patch_farm_size= self.patch_farm_area       # define the size of the farm to which a patch belongs
             
         # Define whether an agent has fields that are with landscape elements or not
@@ -982,37 +967,68 @@ class Farmer(Agent):
                                         (field.field_le ==1)] )
         self.agent_farm_size_previous = self.agent_farm_size #define the current farm size as previous for the subsequent year
         self.agent_farm_expansion  = self.agent_farm_size -self.agent_farm_size_previous #whether an agent has previously expanded or decreased land
-        self.agent_transactions.remove(self.agent_transactions[0])#delete the land transaction of the first year 
-        self.agent_transactions.append(self.agent_farm_expansion) #add the land transactions of the current year
-        self.agent_farm_expansion_sum  =sum(self.agent_transactions)#update the amount of land that an agent has bought/sold in the last 5 years
+        #add the land transactions of the current year instead of the first year, 
+        #the amount of land that an agent has bought/sold in the last 5 years is updated with it
+        self.model.transactions.add(self.transaction_row, self.agent_farm_expansion)
         self.patch_farm_area = self.agent_farm_size #define a variable that can be used for defining the farm to which a patch belongs
         for farm in self.agent_farm_list:
             farm.patch_farm_size = self.patch_farm_area
 
+    #To update the farm of an agent after the land market is cleared
+    def update_agent_farm(self):
+        self.agent_farm_list = self.model.ownership.get_patches(self.agent_id)
+        self.agent_farm_size =sum(field.field_size for field in self.agent_farm_list)
+        self.agent_tree_size = len([field for field in self.agent_farm_list if \
+                                        (field.field_le ==1)] )
+        self.agent_farm_size_previous = self.agent_farm_size
+        self.patch_farm_area = self.agent_farm_size
+        for farm in self.agent_farm_list:
+            farm.patch_farm_size = self.patch_farm_area
+
     #############################################
     # AGENTS' INITIAL CONDITIONS                #
     #############################################
     # Calculation of other agents' characteristics
+    #The end of each phase is a lap of the profiler of the model (if profiled)
     def step(self):
+        profiler = self.model.profiler
+        if profiler is not None:
+            profiler.lap('schedule')
         ## Calculation of other agents' characteristics
         ## Feedback 
         self.feedback_internal_actions()
         self.feedback_internal_decisions()
+        if profiler is not None:
+            profiler.lap('feedback')
         ## Cessation 
         self.farm_cessation_option()
         self.farm_cessation_decision()
+        self.step_actions()
+
+    #The part of the step from the cessation action, where the farmer can sell, 
+    #buy or abandon land (the array engine also runs it for the farmers that stop)
+    def step_actions(self):
+        profiler = self.model.profiler
         self.farm_cessation_action()
+        if profiler is not None:
+            profiler.lap('cessation')
 
         ###Expansion/Shrinkage 
         self.farm_expansion_option()
         self.farm_expansion_decision()
         self.farm_expansion_action()
+        if profiler is not None:
+            profiler.lap('expansion')
 
         ###Protect tree 
         self.protection_trees_option()
         self.protection_trees_decision()
         self.protection_trees_action()
+        if profiler is not None:
+            profiler.lap('protection')
        
         ## Update the agent 
         self.update_agent()
         self.update_agent_transactions()
+        if profiler is not None:
+            profiler.lap('update')
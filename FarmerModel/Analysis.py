@@ -74,6 +74,11 @@ Data  = model.run_model(step_count=10)
 #
 #print(agent_transactions)
 
+##Time of the phases of the steps and work done in each step (profile=True)
+#model = FarmerModel(verbose=False, profile=True)
+#model.run_model(step_count=10)
+#print(model.datacollector.get_model_vars_dataframe().filter(regex='time_|patches|buyers|transactions|farmers_removed'))
+
 
 ##########################
 # READ REAL DATAFILE     #
@@ -110,4 +115,9 @@ Data  = model.run_model(step_count=10)
 #                              'fields_soil': fields_soil,
 #                              'fields_ehs': fields_ehs,
 #                              'fields_landuse':fields_landuse}
+#
+##The text files can also be converted once into a binary dataset 
+##(python Dataset.py path_data path_dataset), loaded memory-mapped by the model 
+#path_dataset = os.environ.get('FARMER_DATASET', 'dataset')
+#model = FarmerModel(verbose=True, fake_data=False, data_path=path_dataset)
 
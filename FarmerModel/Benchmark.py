@@ -0,0 +1,262 @@
+"""
+REPLICATION OF THE ABM MODEL
+An empirical ABM for regional land use/cover change:
+a Dutch case study (version 1.0.0)
+Quyen Nguyen | 16 December 2019
+THE MODEL INCLUDE FIVE COMPONENTS
+1. Agents: The module defines the characteristics and actions of the environment
+(Field Patch) and the farmers (Farmer)
+2. Schedule: The moduel defines the order that the model runs in cases there are
+several agent breeds. There are 2 breeds in the base model (Farmer and Field Patch).
+The Farmer can make decision, the Field Patch is static and only change after their
+respective owning Farmer makes decision
+3. SimpleModel: The module defines the inital states and the steps that all farmers
+makes during the time t
+4. Server: The module defines the visualization of the model
+5. Analysis: The module shows the analysis of the model
+##########################
+#        BENCHMARK       #
+##########################
+Time the phases of the model (construction, step, calculate_data, collection
+of the results, run_model) for all the sizes and scenarios with fixed seeds,
+write them into a JSON file and compare two files:
+    python Benchmark.py suite <results.json> [quick]
+    python Benchmark.py compare <baseline.json> <results.json> [threshold]
+"""
+##########################
+# IMPORT GENERIC LIBRARY #
+##########################
+import contextlib
+import datetime
+import io
+import json
+import platform
+import sys
+import time
+import mesa
+import numpy as np
+
+##########################
+# IMPORT MODEL COMPONENT #
+##########################
+from Agents import Farmer
+from SimpleModel import FarmerModel
+from Scenarios import load_scenarios, SCENARIO_PATH
+
+#Sizes of the benchmark suite: (height, width, initial_farmers)
+SUITE_SIZES = [(30, 30, 30),
+               (100, 100, 300),
+               (300, 300, 1000),
+               (300, 300, 10000),
+               (1000, 1000, 10000),
+               (1000, 1000, 100000)]
+#Phases timed by the suite (seconds)
+PHASES = ('construction', 'step', 'calculate_data', 'collect', 'run_model')
+
+########################################################
+#  BENCHMARK THE START UP OF THE MODEL                 #
+########################################################
+#Time the construction of a model with fake data
+def benchmark_startup(height=1000, width=1000, initial_farmers=10000, \
+                      scenario='Basic', seed=0, engine='object'):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        model = FarmerModel(verbose=False, fake_data=True, real_data=[None, None],
+                            height=height, width=width,
+                            initial_farmers=initial_farmers,
+                            scenario=scenario, index_growth=0.01,
+                            seed=seed, engine=engine)
+    duration = time.perf_counter() - start
+    return model, duration
+
+#Compare the array engine with the object engine on a fixed seed: results, 
+#fields and farmers must be the same. prepare(model) changes the farmers of 
+#both models before the run (e.g. to force paths that a run does not reach) 
+def check_conformance(scenario='Basic', seed=0, step_count=10, height=30, width=30, \
+                      initial_farmers=100, prepare=None, market='sequential'):
+    models = {}
+    for engine in ['object', 'array']:
+        model = FarmerModel(verbose=False, fake_data=True, real_data=[None, None],
+                            height=height, width=width,
+                            initial_farmers=initial_farmers,
+                            scenario=scenario, index_growth=0.01,
+                            seed=seed, engine=engine, market=market)
+        if prepare is not None:
+            prepare(model)
+            if model.engine is not None:
+                model.engine.load()
+        model.run_model(step_count=step_count)
+        models[engine] = model
+    object_model, array_model = models['object'], models['array']
+    wrong = []
+    if not np.allclose(object_model.result, array_model.result, equal_nan=True):
+        wrong.append('results')
+    for name in ['field_owner_id', 'field_landuse', 'field_le', 'patch_farm_size']:
+        if not np.allclose(getattr(object_model.fields, name), getattr(array_model.fields, name), \
+                           equal_nan=True):
+            wrong.append(name)
+    object_farmers = object_model.schedule.agents_by_breed[Farmer]
+    array_farmers = array_model.schedule.agents_by_breed[Farmer]
+    if list(object_farmers) != list(array_farmers):
+        wrong.append('farmers')
+    else:
+        for name in ['agent_type', 'agent_age', 'agent_farm_size', 'agent_tree_size', \
+                     'agent_farm_expansion_sum', 'agent_random_expand', 'agent_random_protect', \
+                     'p_stop', 'p_expand', 'p_shrink', 'p_protect', 'agent_cessation', \
+                     'agent_expansion', 'agent_decision_trees']:
+            object_values = [getattr(farmer, name) for farmer in object_farmers.values()]
+            array_values = [getattr(farmer, name) for farmer in array_farmers.values()]
+            if object_values == array_values:
+                continue
+            if any(isinstance(value, str) for value in object_values) or not \
+                    np.allclose(np.array(object_values, dtype=float), np.array(array_values, dtype=float)):
+                wrong.append(name)
+    if wrong != []:
+        raise RuntimeError('The array engine differs from the object engine (%s, seed %d): %s' % \
+                           (scenario, seed, ', '.join(wrong)))
+    return models
+
+#Time the steps of the model with an engine
+def benchmark_steps(height=1000, width=1000, initial_farmers=10000, \
+                    scenario='Basic', engine='object', step_count=5, seed=0):
+    model, _ = benchmark_startup(height, width, initial_farmers, scenario, seed, engine)
+    start = time.perf_counter()
+    for i in range(step_count):
+        model.step()
+    return model, (time.perf_counter() - start) / step_count
+
+########################################################
+#  BENCHMARK SUITE                                     #
+########################################################
+#Time the phases of the model for one configuration: the construction, a 
+#step (mean of step_count steps), calculate_data and the collection of the 
+#results (best of repeat calls) and run_model(step_count) on a new model
+def benchmark_phases(height=30, width=30, initial_farmers=30, scenario='Basic', \
+                     engine='object', step_count=5, seed=0, repeat=5):
+    timings = {}
+    model, timings['construction'] = benchmark_startup(height, width, initial_farmers, \
+                                                       scenario, seed, engine)
+    durations = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        model.calculate_data()
+        durations.append(time.perf_counter() - start)
+    timings['calculate_data'] = min(durations)
+    durations = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        model.datacollector.collect(model)
+        durations.append(time.perf_counter() - start)
+    timings['collect'] = min(durations)
+    durations = []
+    for i in range(step_count):
+        start = time.perf_counter()
+        model.step()
+        durations.append(time.perf_counter() - start)
+    timings['step'] = sum(durations) / step_count
+    model, _ = benchmark_startup(height, width, initial_farmers, scenario, seed, engine)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        model.run_model(step_count=step_count)
+    timings['run_model'] = time.perf_counter() - start
+    return timings
+
+#Key of a configuration of the suite (to compare two result files)
+def get_key(result):
+    return (result['scenario'], result['engine'], result['height'], result['width'], \
+            result['initial_farmers'])
+
+#Run the benchmark suite for all the sizes, scenarios and engines and write 
+#the results into a JSON file. A configuration that fails is written with 
+#its error instead of its timings
+def run_suite(path, sizes=SUITE_SIZES, scenarios=None, engines=('object',), \
+              step_count=5, seed=0, repeat=5):
+    if scenarios is None:
+        scenarios = load_scenarios(SCENARIO_PATH).names
+    results = []
+    for height, width, initial_farmers in sizes:
+        for scenario in scenarios:
+            for engine in engines:
+                result = {'scenario': scenario, 'engine': engine, 'height': height, 'width': width, 
+                          'initial_farmers': initial_farmers, 'step_count': step_count, 'seed': seed}
+                try:
+                    result.update(benchmark_phases(height, width, initial_farmers, scenario, engine, \
+                                                   step_count, seed, repeat))
+                except Exception as error:
+                    result['error'] = '%s: %s' % (type(error).__name__, error)
+                results.append(result)
+                print('%-6s %-6s %4d x %-4d fields, %6d farmers: %s' % \
+                      (scenario, engine, height, width, initial_farmers, 
+                       result.get('error') or ', '.join('%s %.4g s' % (phase, result[phase]) \
+                                                      for phase in PHASES)))
+    suite = {'created': datetime.datetime.now().isoformat(timespec='seconds'),
+             'python': platform.python_version(),
+             'numpy': np.__version__,
+             'mesa': mesa.__version__,
+             'machine': platform.platform(),
+             'results': results}
+    with open(path, 'w') as file:
+        json.dump(suite, file, indent=1)
+    return suite
+
+#Compare two result files of the suite: the phases that are slower than the 
+#baseline by more than threshold (0.2 = 20%) are regressions. Phases faster 
+#than min_duration in both files are not compared (noise of the timer)
+def compare_results(baseline_path, path, threshold=0.2, min_duration=0.001):
+    with open(baseline_path) as file:
+        baseline = {get_key(result): result for result in json.load(file)['results']}
+    with open(path) as file:
+        results = json.load(file)['results']
+    regressions = []
+    for result in results:
+        previous = baseline.get(get_key(result))
+        if previous is None:
+            continue
+        if ('error' in result) and ('error' not in previous):
+            regressions.append((get_key(result), 'error', None, None))
+            continue
+        for phase in PHASES:
+            if (phase not in result) or (phase not in previous):
+                continue
+            if max(result[phase], previous[phase]) < min_duration:
+                continue
+            if result[phase] > (1 + threshold) * previous[phase]:
+                regressions.append((get_key(result), phase, previous[phase], result[phase]))
+    return regressions
+
+if __name__ == '__main__':
+    #python Benchmark.py suite <results.json> [quick]: the benchmark suite 
+    #python Benchmark.py compare <baseline.json> <results.json> [threshold] 
+    if (len(sys.argv) >= 3) and (sys.argv[1] == 'suite'):
+        sizes = [size for size in SUITE_SIZES if size[0] <= 300] if 'quick' in sys.argv[3:] else SUITE_SIZES
+        run_suite(sys.argv[2], sizes=sizes)
+        sys.exit(0)
+    if (len(sys.argv) >= 4) and (sys.argv[1] == 'compare'):
+        threshold = float(sys.argv[4]) if len(sys.argv) > 4 else 0.2
+        regressions = compare_results(sys.argv[2], sys.argv[3], threshold)
+        for key, phase, previous, duration in regressions:
+            if phase == 'error':
+                print('%s: fails (it ran in the baseline)' % (key,))
+            else:
+                print('%s: %s %.4f s -> %.4f s (+%.0f%%)' % \
+                      (key, phase, previous, duration, 100 * (duration / previous - 1)))
+        print('%d regression(s)' % len(regressions))
+        sys.exit(1 if regressions else 0)
+    for height, width, initial_farmers in [(30, 30, 30),
+                                           (100, 100, 300),
+                                           (300, 300, 1000),
+                                           (1000, 1000, 10000)]:
+        model, duration = benchmark_startup(height, width, initial_farmers)
+        print('Start up %4d x %-4d fields, %6d farmers: %8.2f s' % \
+              (height, width, initial_farmers, duration))
+    #Conformance of the array engine and time of a step with both engines
+    for scenario in ['Basic', 'Trend', 'A1']:
+        for seed in range(3):
+            check_conformance(scenario, seed)
+    print('The array engine gives the same runs as the object engine')
+    for height, width, initial_farmers in [(300, 300, 10000),
+                                           (1000, 1000, 100000)]:
+        for engine in ['object', 'array']:
+            model, duration = benchmark_steps(height, width, initial_farmers, engine=engine, step_count=1)
+            print('Step %4d x %-4d fields, %6d farmers, %s engine: %8.2f s' % \
+                  (height, width, initial_farmers, engine, duration))
@@ -0,0 +1,294 @@
+"""
+REPLICATION OF THE ABM MODEL
+An empirical ABM for regional land use/cover change:
+a Dutch case study (version 1.0.0)
+Quyen Nguyen | 16 December 2019
+THE MODEL INCLUDE FIVE COMPONENTS
+1. Agents: The module defines the characteristics and actions of the environment
+(Field Patch) and the farmers (Farmer)
+2. Schedule: The moduel defines the order that the model runs in cases there are
+several agent breeds. There are 2 breeds in the base model (Farmer and Field Patch).
+The Farmer can make decision, the Field Patch is static and only change after their
+respective owning Farmer makes decision
+3. SimpleModel: The module defines the inital states and the steps that all farmers
+makes during the time t
+4. Server: The module defines the visualization of the model
+5. Analysis: The module shows the analysis of the model
+##########################
+#      CHECKPOINTS       #
+##########################
+Save the state of a model between two steps into a checkpoint, a directory
+with one .npy file per column of the field store and per characteristic of
+the farmers, and a manifest checkpoint.json (parameters of the model, state
+of the random generators and counters):
+    model.save_checkpoint(<directory of the checkpoint>)
+The model continues from the checkpoint, with the same or other parameters
+(e.g. another scenario from the same year):
+    FarmerModel.from_checkpoint(<directory of the checkpoint>, scenario='A1')
+"""
+##########################
+# IMPORT GENERIC LIBRARY #
+##########################
+import json
+import numbers
+import os
+import numpy as np
+
+##########################
+# IMPORT MODEL COMPONENT #
+##########################
+from Agents import Farmer
+from Fields import FieldStore
+from Dataset import write_array
+
+MANIFEST = 'checkpoint.json'
+#Characteristics of the farmers that are not saved: the model and the position
+#are set when the farmer is restored, the farm is taken from the ownership index
+#when it is first read (Agents.FarmList)
+SKIPPED = ('model', 'pos', '_agent_farm_list')
+MISSING = object()
+
+##########################
+# SAVE A CHECKPOINT      #
+##########################
+#Kind of the values of a characteristic of the farmers: 'number', 'text', 
+#'list' (lists of numbers of the same length), None
+#for the references to agents or patches that are only used within a step
+def get_kind(values):
+    if all(isinstance(value, numbers.Number) for value in values):
+        return 'number'
+    if all(isinstance(value, str) for value in values):
+        return 'text'
+    if all(isinstance(value, list) and (len(value) == len(values[0])) and \
+           all(isinstance(item, numbers.Number) for item in value) for value in values):
+        return 'list'
+    return None
+
+#Write a characteristic of the farmers (values of the farmers that have it)
+def write_farmer_column(path, name, values):
+    present = [value for value in values if value is not MISSING]
+    kind = get_kind(present)
+    if (present == []) or (kind is None):
+        return None
+    if kind == 'text':
+        vocabulary = sorted(set(present))
+        codes = {text: code for code, text in enumerate(vocabulary)}
+        array = np.array([codes.get(value, -1) for value in values], dtype=np.int32)
+    else:
+        items = [item for value in present for item in value] if kind == 'list' else present
+        integer = all(isinstance(item, numbers.Integral) for item in items)
+        fill = 0 if integer else np.nan
+        if kind == 'list':
+            fill = [fill] * len(present[0])
+        array = np.array([fill if value is MISSING else value for value in values], \
+                         dtype=np.int64 if integer else np.float64)
+    entry = write_array(path, 'farmer.' + name, array)
+    entry['kind'] = kind
+    if kind == 'text':
+        entry['values'] = vocabulary
+    if len(present) < len(values):
+        mask = np.array([value is not MISSING for value in values])
+        entry['present'] = write_array(path, 'farmer.' + name + '.present', mask)['file']
+    return entry
+
+#Save the state of a model between two steps into a directory
+def save_checkpoint(model, path):
+    os.makedirs(path, exist_ok=True)
+    # the Farmer objects hold the state of the farmers of the array engine after a sync
+    model.sync_farmers()
+    manifest = {'parameters': {'scenario': model.scenario,
+                               'index_growth': model.index_growth,
+                               'check_statistics': model.check_statistics,
+                               'seed': model.seed,
+                               'engine': 'object' if model.engine is None else 'array',
+                               'scenario_file': model.scenario_file,
+                               'market': 'sequential' if model.market is None else 'batched',
+                               'torus_distance': model.distances.torus},
+                'fields': {}, 'farmers': {}}
+    # the fields as the cells of the patches and one value per patch
+    fields = model.fields
+    manifest['grid'] = [fields.width, fields.height]
+    manifest['fields']['cells'] = write_array(path, 'cells', fields.cells)
+    for name in FieldStore.columns:
+        manifest['fields'][name] = write_array(path, name, getattr(fields, name).values)
+    # farmers in the order of the schedule (the order of the activation)
+    farmers = model.schedule.agents_by_breed[Farmer].values()
+    names = {}
+    for farmer in farmers:
+        names.update(dict.fromkeys(vars(farmer)))
+    for name in names:
+        if name not in SKIPPED:
+            entry = write_farmer_column(path, name, [vars(farmer).get(name, MISSING) for farmer in farmers])
+            if entry is not None:
+                manifest['farmers'][name] = entry
+    positions = np.array([farmer.pos for farmer in farmers], dtype=np.int64).reshape(-1, 2)
+    manifest['farmers']['pos'] = write_array(path, 'farmer.pos', positions)
+    # patches of each owner in the order of the index, and sizes of the farms 
+    # as they were corrected at each land transaction
+    owners, counts, cells, sizes = model.ownership.get_groups()
+    write_array(path, 'ownership.owner', owners)
+    write_array(path, 'ownership.count', counts)
+    write_array(path, 'ownership.cell', cells)
+    write_array(path, 'ownership.size', sizes)
+    # results of the steps, random numbers of the last step and state of the generators
+    manifest['results'] = write_array(path, 'results', model.datacollector.get_values())
+    manifest['results']['names'] = model.datacollector.names
+    write_array(path, 'draws.uniform', model.draws.uniform)
+    write_array(path, 'draws.normal', model.draws.normal)
+    transactions = model.transactions
+    write_array(path, 'transactions.values', transactions.values[:transactions.rows])
+    write_array(path, 'transactions.head', transactions.head[:transactions.rows])
+    write_array(path, 'transactions.sums', transactions.sums[:transactions.rows])
+    statistics = model.statistics
+    schedule = model.schedule
+    manifest['state'] = {'stepcounter': model.stepcounter,
+                         'steps': schedule.steps,
+                         'time': schedule.time,
+                         'current_id': model.current_id,
+                         'running': model.running,
+                         'farmers': len(farmers),
+                         'initial_farmers': model.initial_farmers,
+                         'draw_rows': model.draws.rows,
+                         'generators': {name: generator.bit_generator.state for name, generator \
+                                        in model.streams.generators.items()},
+                         'random': model.random.getstate(),
+                         'statistics': {'agents_by_type': list(statistics.agents_by_type.items()),
+                                        'farm_size_by_type': list(statistics.farm_size_by_type.items()),
+                                        'trees_by_type': list(statistics.trees_by_type.items()),
+                                        'agents_stop': statistics.agents_stop,
+                                        'total_farm_size': statistics.total_farm_size,
+                                        'number_fields': statistics.number_fields,
+                                        'sum_land_use': statistics.sum_land_use}}
+    # the manifest is written last: a checkpoint without manifest is not complete
+    with open(os.path.join(path, MANIFEST + '.tmp'), 'w') as file:
+        json.dump(manifest, file, indent=1, default=to_json)
+    os.replace(os.path.join(path, MANIFEST + '.tmp'), os.path.join(path, MANIFEST))
+    return manifest
+
+#Convert the NumPy numbers of the manifest into Python numbers
+def to_json(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError('%s cannot be written in a checkpoint' % type(value).__name__)
+
+##########################
+# LOAD A CHECKPOINT      #
+##########################
+#Define the checkpoint that a model is restored from
+class Checkpoint():
+    ''' This is a checkpoint saved by save_checkpoint. The arrays are
+    memory-mapped, so the fields are copied once into the field store of the
+    new model and the farmers are created from their columns, without the
+    initial calculations of Farmer. The generators get the state they had
+    when the checkpoint was saved, so the model continues the same run
+    (or, with other parameters, a branch of the run from that step).
+        Args:
+            path: the directory of the checkpoint
+            mmap: whether the arrays are memory-mapped'''
+    def __init__(self, path, mmap=True):
+        manifest_path = os.path.join(path, MANIFEST)
+        if not os.path.exists(manifest_path):
+            raise FileNotFoundError('No checkpoint in %s' % path)
+        with open(manifest_path) as file:
+            self.manifest = json.load(file)
+        self.path = path
+        self.mmap_mode = 'r' if mmap else None
+        self.parameters = self.manifest['parameters']
+        self.state = self.manifest['state']
+        self.fields = {name: self.load(entry['file']) for name, entry in self.manifest['fields'].items()}
+        # size of the grid as the attributes of the model (field store [height, width])
+        self.height, self.width = self.manifest['grid']
+
+    #Load an array of the checkpoint
+    def load(self, file, mmap=True):
+        return np.load(os.path.join(self.path, file if file.endswith('.npy') else file + '.npy'), \
+                       mmap_mode=self.mmap_mode if mmap else None)
+
+    #Copy the fields into the field store of a model and restore the ownership
+    #index from its groups (no new group by owner)
+    def restore_fields(self, model):
+        fields = dict(self.fields)
+        model.fields.add_rows(fields.pop('cells'), build_index=False, **fields)
+        model.ownership.set_groups(self.load('ownership.owner', mmap=False), 
+                                   self.load('ownership.count', mmap=False),
+                                   self.load('ownership.cell', mmap=False),
+                                   self.load('ownership.size', mmap=False))
+
+    #Values of a characteristic of the farmers (MISSING for the farmers without it)
+    def get_farmer_column(self, entry):
+        array = self.load(entry['file'], mmap=False)
+        if entry['kind'] == 'text':
+            vocabulary = entry['values']
+            values = [vocabulary[code] for code in array.tolist()]
+        else:
+            values = array.tolist()
+        if 'present' in entry:
+            present = self.load(entry['present'], mmap=False).tolist()
+            values = [value if exists else MISSING for value, exists in zip(values, present)]
+        return values
+
+    #Create the farmers of a model, in the order of the schedule of the checkpoint
+    def restore_farmers(self, model):
+        entries = dict(self.manifest['farmers'])
+        positions = self.load(entries.pop('pos')['file'], mmap=False).tolist()
+        columns = [(name, self.get_farmer_column(entry)) for name, entry in entries.items()]
+        for i, (x, y) in enumerate(positions):
+            farmer = Farmer.__new__(Farmer)
+            characteristics = vars(farmer)
+            for name, values in columns:
+                if values[i] is not MISSING:
+                    characteristics[name] = values[i]
+            farmer.model = model
+            farmer.pos = (x, y)
+            model.grid.place_agent(farmer, (x, y))
+            model.schedule.add(farmer)
+            if model.scenario != self.parameters['scenario']:
+                # a branch with another scenario: exogenous probabilities of that scenario
+                farmer.feedback_exogenous_scenario()
+            model.statistics.add(farmer)
+            if characteristics.get('_agent_expansion') == "buy":
+                model.buyers.add(farmer)
+        model.agent_id_list = np.array([farmer.agent_id for farmer in \
+                                        model.schedule.agents_by_breed[Farmer].values()])
+        # the counters as they were corrected during the steps
+        statistics = model.statistics
+        saved = self.state['statistics']
+        for name in ['agents_by_type', 'farm_size_by_type', 'trees_by_type']:
+            counters = getattr(statistics, name)
+            counters.clear()
+            counters.update((agent_type, value) for agent_type, value in saved[name])
+        for name in ['agents_stop', 'total_farm_size', 'number_fields', 'sum_land_use']:
+            setattr(statistics, name, saved[name])
+
+    #Set the step, the results and the random generators of a model (the
+    #generators are kept as they are if the model has another seed)
+    def restore_state(self, model):
+        state = self.state
+        model.stepcounter = state['stepcounter']
+        model.schedule.steps = state['steps']
+        model.schedule.time = state['time']
+        model.current_id = state['current_id']
+        model.running = state['running']
+        # the results are restored by name (NaN for the results that were not 
+        # collected, e.g. the timers of a model that was not profiled)
+        results = self.load('results', mmap=False)
+        names = self.manifest['results']['names']
+        collector = model.datacollector
+        collector.data = np.full((max(2 * len(results), 64), len(collector.names)), np.nan, order='F')
+        for column, name in enumerate(collector.names):
+            if name in names:
+                collector.data[:len(results), column] = results[:, names.index(name)]
+        collector.steps = len(results)
+        model.draws.rows = state['draw_rows']
+        model.draws.uniform = self.load('draws.uniform', mmap=False)
+        model.draws.normal = self.load('draws.normal', mmap=False)
+        transactions = model.transactions
+        transactions.values = self.load('transactions.values', mmap=False)
+        transactions.head = self.load('transactions.head', mmap=False)
+        transactions.sums = self.load('transactions.sums', mmap=False)
+        transactions.rows = len(transactions.sums)
+        if model.seed == self.parameters['seed']:
+            for name, generator in model.streams.generators.items():
+                generator.bit_generator.state = state['generators'][name]
+            version, internal, gauss_next = state['random']
+            model.random.setstate((version, tuple(internal), gauss_next))
@@ -0,0 +1,89 @@
+"""
+REPLICATION OF THE ABM MODEL
+An empirical ABM for regional land use/cover change:
+a Dutch case study (version 1.0.0)
+Quyen Nguyen | 16 December 2019
+THE MODEL INCLUDE FIVE COMPONENTS
+1. Agents: The module defines the characteristics and actions of the environment
+(Field Patch) and the farmers (Farmer)
+2. Schedule: The moduel defines the order that the model runs in cases there are
+several agent breeds. There are 2 breeds in the base model (Farmer and Field Patch).
+The Farmer can make decision, the Field Patch is static and only change after their
+respective owning Farmer makes decision
+3. SimpleModel: The module defines the inital states and the steps that all farmers
+makes during the time t
+4. Server: The module defines the visualization of the model
+5. Analysis: The module shows the analysis of the model
+##########################
+#        COLLECTOR       #
+##########################
+"""
+##########################
+# IMPORT GENERIC LIBRARY #
+##########################
+import numpy as np
+import pandas as pd
+
+##########################
+# CREATE DATA COLLECTOR  #
+##########################
+#Define the collector of the results of the model at each step
+class ColumnarCollector():
+    ''' This is the collector of the model results. It is created once with
+    the list of the results (model reporters) and keeps them in one NumPy
+    buffer (step x result). The buffer is stored column by column and doubles
+    its size when it is full, so collecting a step is one row write, and the
+    results can be exported to a DataFrame, Arrow or Parquet without copying
+    every step.
+        Args:
+            model_reporters: list of the names of the model attributes to collect,
+            or dictionary name -> attribute name or function(model)
+            capacity: the number of steps that the buffer holds at the start'''
+    def __init__(self, model_reporters, capacity=64):
+        if not isinstance(model_reporters, dict):
+            model_reporters = {name: name for name in model_reporters}
+        self.names = list(model_reporters)
+        self.reporters = list(model_reporters.values())
+        self.data = np.empty((capacity, len(self.names)), dtype=np.float64, order='F')
+        self.steps = 0
+
+    #Collect the results of the model at the current step
+    def collect(self, model):
+        if self.steps == self.data.shape[0]:
+            data = np.empty((2 * self.data.shape[0], len(self.names)), dtype=np.float64, order='F')
+            data[:self.steps] = self.data[:self.steps]
+            self.data = data
+        for column, reporter in enumerate(self.reporters):
+            if isinstance(reporter, str):
+                self.data[self.steps, column] = getattr(model, reporter)
+            else:
+                self.data[self.steps, column] = reporter(model)
+        self.steps += 1
+
+    #Get the collected results as an array (step x result), without copy
+    def get_values(self):
+        return self.data[:self.steps]
+
+    #Get the collected values of a result, without copy
+    def get_column(self, name):
+        return self.data[:self.steps, self.names.index(name)]
+
+    #Results by name, the same as the model_vars of the Mesa DataCollector
+    @property
+    def model_vars(self):
+        return {name: self.data[:self.steps, column] for column, name in enumerate(self.names)}
+
+    #Get the collected results as a DataFrame (step x result)
+    def get_model_vars_dataframe(self):
+        return pd.DataFrame(self.get_values(), columns=self.names, copy=False)
+
+    #Get the collected results as an Arrow table (optional dependency pyarrow)
+    def to_arrow(self):
+        import pyarrow as pa
+        return pa.Table.from_arrays([pa.array(self.get_column(name)) for name in self.names],
+                                    names=self.names)
+
+    #Write the collected results into a Parquet file (optional dependency pyarrow)
+    def to_parquet(self, path):
+        import pyarrow.parquet as pq
+        pq.write_table(self.to_arrow(), path)
@@ -0,0 +1,73 @@
+"""
+REPLICATION OF THE ABM MODEL
+An empirical ABM for regional land use/cover change:
+a Dutch case study (version 1.0.0)
+Quyen Nguyen | 16 December 2019
+THE MODEL INCLUDE FIVE COMPONENTS
+1. Agents: The module defines the characteristics and actions of the environment
+(Field Patch) and the farmers (Farmer)
+2. Schedule: The moduel defines the order that the model runs in cases there are
+several agent breeds. There are 2 breeds in the base model (Farmer and Field Patch).
+The Farmer can make decision, the Field Patch is static and only change after their
+respective owning Farmer makes decision
+3. SimpleModel: The module defines the inital states and the steps that all farmers
+makes during the time t
+4. Server: The module defines the visualization of the model
+5. Analysis: The module shows the analysis of the model
+##########################
+#      STEP CONTEXT      #
+##########################
+"""
+##########################
+# IMPORT GENERIC LIBRARY #
+##########################
+import numpy as np
+
+##########################
+# CREATE STEP CONTEXT    #
+##########################
+#Define the context of a step that is shared by all the farmers
+class StepContext():
+    ''' This is the context of a step of the model, shared by all the farmers
+    instead of being recalculated by each of them. The constants of the
+    scenario (index_growth, index_stop_year, from the scenario tables of the
+    model) are set once at the start of the step (refresh). The aggregates of the farmers (number of farmers,
+    number of farmers that stop, mean farm size) are read from the counters
+    of the statistics of the model, which are corrected at every change of
+    a farmer: a land transaction that changes a farm size is part of the
+    next mean farm size at once, as when every farmer scanned all the others.
+        Args:
+            model: the model of the context'''
+    def __init__(self, model):
+        self.model = model
+        self.refresh()
+
+    #Set the constants of the scenario at the start of a step
+    def refresh(self):
+        model = self.model
+        # a scenario without index_growth uses the index_growth of the model
+        index_growth = model.scenarios.index_growth[model.scenario_index]
+        index_stop_year = model.scenarios.index_stop_year[model.scenario_index]
+        self.index_growth = float(index_growth) if index_growth == index_growth else model.index_growth
+        self.index_stop_year = float(index_stop_year) if index_stop_year == index_stop_year else \
+            getattr(model, 'index_stop_year', None)
+        model.index_growth = self.index_growth
+        model.index_stop_year = self.index_stop_year
+
+    #Number of farmers in the model
+    @property
+    def total_agents(self):
+        return len(self.model.statistics.farmers)
+
+    #Number of farmers that stop farming
+    @property
+    def total_agents_stop(self):
+        return self.model.statistics.agents_stop
+
+    #Mean farm size of all the farmers (nan without farmers)
+    @property
+    def mean_farm_size(self):
+        statistics = self.model.statistics
+        if len(statistics.farmers) == 0:
+            return np.nan
+        return sum(statistics.farm_size_by_type.values()) / len(statistics.farmers)
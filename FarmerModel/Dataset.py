@@ -0,0 +1,132 @@
+"""
+REPLICATION OF THE ABM MODEL
+An empirical ABM for regional land use/cover change:
+a Dutch case study (version 1.0.0)
+Quyen Nguyen | 16 December 2019
+THE MODEL INCLUDE FIVE COMPONENTS
+1. Agents: The module defines the characteristics and actions of the environment
+(Field Patch) and the farmers (Farmer)
+2. Schedule: The moduel defines the order that the model runs in cases there are
+several agent breeds. There are 2 breeds in the base model (Farmer and Field Patch).
+The Farmer can make decision, the Field Patch is static and only change after their
+respective owning Farmer makes decision
+3. SimpleModel: The module defines the inital states and the steps that all farmers
+makes during the time t
+4. Server: The module defines the visualization of the model
+5. Analysis: The module shows the analysis of the model
+##########################
+#     REAL DATASET       #
+##########################
+Convert the real data (text rasters and final_agent_data.csv) once into a
+binary dataset, a directory with one .npy file per raster and per column of
+the farmers and a manifest dataset.json:
+    python Dataset.py <directory of the real data> <directory of the dataset>
+The dataset is then given to the model by its path:
+    FarmerModel(fake_data=False, data_path=<directory of the dataset>)
+"""
+##########################
+# IMPORT GENERIC LIBRARY #
+##########################
+import json
+import os
+import sys
+import numpy as np
+
+#Text rasters of the real data: name in the model -> (file, dtype in the dataset)
+RASTERS = {'fields_suitability': ('field_suitability.txt', np.float32),
+           'fields_area': ('fields_area.txt', np.float32),
+           'fields_ehs': ('fields_ehs.txt', np.int8),
+           'fields_id': ('fields_id.txt', np.int32),
+           'fields_le': ('fields_le.txt', np.float32),
+           'fields_le_current': ('fields_le_current.txt', np.float32),
+           'fields_le_potential': ('fields_le_potential.txt', np.float32),
+           'fields_owner': ('fields_owner.txt', np.int32),
+           'fields_size': ('fields_size.txt', np.float32),
+           'fields_soil': ('fields_soil.txt', np.float32),
+           'fields_landuse': ('land_types.txt', np.int8)}
+#Value of the nodata cells (empty or NaN in the text) of the integer rasters,
+#the value that the model already reads as "no field" or "no owner"
+NODATA = {'fields_id': 0,
+          'fields_owner': -1,
+          'fields_ehs': 0,
+          'fields_landuse': 0}
+#Columns of final_agent_data.csv used by the model -> dtype in the dataset
+FARMER_FILE = 'final_agent_data.csv'
+FARMER_COLUMNS = {'agent_id': np.int32,
+                  'agent_x': np.int32,
+                  'agent_y': np.int32,
+                  'agent_type': np.int8,
+                  'agent_business': np.int8,
+                  'agent_age': np.int16,
+                  'agent_nlandscape': np.float32,
+                  'agent_product': np.float32,
+                  'agent_product_extra': np.float32,
+                  'agent_trans': np.float32}
+MANIFEST = 'dataset.json'
+
+##########################
+# CONVERT THE REAL DATA  #
+##########################
+#Cast values to a narrow dtype, the values must not change (except the precision of floats).
+#The nodata cells (NaN or None) of an integer raster get the value nodata
+def to_dtype(values, dtype, name, nodata=None):
+    if nodata is not None:
+        values = np.asarray(values, dtype=np.float64)
+        values = np.where(np.isnan(values), nodata, values)
+    converted = values.astype(dtype)
+    if np.issubdtype(dtype, np.integer) and not np.array_equal(converted, values):
+        raise ValueError('%s does not fit in %s' % (name, np.dtype(dtype).name))
+    return converted
+
+#Write an array into the dataset (temporary file first, so a failed conversion
+#never leaves half a file)
+def write_array(dataset_path, name, values):
+    path = os.path.join(dataset_path, name + '.npy')
+    with open(path + '.tmp', 'wb') as file:
+        np.save(file, values)
+    os.replace(path + '.tmp', path)
+    return {'file': name + '.npy', 'dtype': values.dtype.name, 'shape': list(values.shape)}
+
+#Convert the text rasters and the farmer table of a directory into a dataset
+def convert_dataset(source_path, dataset_path):
+    import pandas as pd   # only needed to parse the text files once
+    os.makedirs(dataset_path, exist_ok=True)
+    manifest = {'rasters': {}, 'farmers': {}}
+    for name, (file, dtype) in RASTERS.items():
+        values = pd.read_csv(os.path.join(source_path, file), sep=" ", header=None).values
+        nodata = NODATA.get(name)
+        manifest['rasters'][name] = write_array(dataset_path, name, to_dtype(values, dtype, name, nodata))
+        manifest['rasters'][name]['nodata'] = nodata
+    farmers = pd.read_csv(os.path.join(source_path, FARMER_FILE))
+    for name, dtype in FARMER_COLUMNS.items():
+        manifest['farmers'][name] = write_array(dataset_path, name, \
+                                                to_dtype(farmers[name].values, dtype, name))
+    # the manifest is written last: a dataset without manifest is not complete
+    with open(os.path.join(dataset_path, MANIFEST), 'w') as file:
+        json.dump(manifest, file, indent=1)
+    return manifest
+
+##########################
+# LOAD THE DATASET       #
+##########################
+#Load a dataset as the real data of the model: [farmer columns, rasters],
+#each a dict of arrays, memory-mapped unless mmap=False
+def load_dataset(dataset_path, mmap=True):
+    manifest_path = os.path.join(dataset_path, MANIFEST)
+    if not os.path.exists(manifest_path):
+        raise FileNotFoundError('No dataset in %s (convert the real data with Dataset.py)' % dataset_path)
+    with open(manifest_path) as file:
+        manifest = json.load(file)
+    mmap_mode = 'r' if mmap else None
+    load = lambda entry: np.load(os.path.join(dataset_path, entry['file']), mmap_mode=mmap_mode)
+    farmers = {name: load(entry) for name, entry in manifest['farmers'].items()}
+    rasters = {name: load(entry) for name, entry in manifest['rasters'].items()}
+    return [farmers, rasters]
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print('Usage: python Dataset.py <directory of the real data> <directory of the dataset>')
+        sys.exit(1)
+    manifest = convert_dataset(sys.argv[1], sys.argv[2])
+    print('Converted %d rasters and %d farmer columns into %s' % \
+          (len(manifest['rasters']), len(manifest['farmers']), sys.argv[2]))
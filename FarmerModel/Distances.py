@@ -0,0 +1,99 @@
+"""
+REPLICATION OF THE ABM MODEL
+An empirical ABM for regional land use/cover change:
+a Dutch case study (version 1.0.0)
+Quyen Nguyen | 16 December 2019
+THE MODEL INCLUDE FIVE COMPONENTS
+1. Agents: The module defines the characteristics and actions of the environment
+(Field Patch) and the farmers (Farmer)
+2. Schedule: The moduel defines the order that the model runs in cases there are
+several agent breeds. There are 2 breeds in the base model (Farmer and Field Patch).
+The Farmer can make decision, the Field Patch is static and only change after their
+respective owning Farmer makes decision
+3. SimpleModel: The module defines the inital states and the steps that all farmers
+makes during the time t
+4. Server: The module defines the visualization of the model
+5. Analysis: The module shows the analysis of the model
+##########################
+#       DISTANCES        #
+##########################
+"""
+##########################
+# IMPORT GENERIC LIBRARY #
+##########################
+import numpy as np
+
+##########################
+# CREATE DISTANCE SERVICE#
+##########################
+#Define the distances between the field patches and the farmsteads of their owners
+class DistanceService():
+    ''' This is the service of the distances of the model. The farmers never
+    move, so the distance between a field patch and the farmstead of its
+    owner only changes when the patch changes owner: it is calculated once
+    and kept by row of the field store, stamped with the owner it was
+    calculated for. A stamp that differs from the current field_owner_id (a land
+    transaction) makes the value stale, so nothing has to be invalidated
+    explicitly. The distances of a whole farm are calculated at once.
+    The distance is euclidean; with torus=True it wraps around the borders
+    of the grid, as the MultiGrid(torus=True) of the model.
+        Args:
+            model: the model of the fields and the farmers
+            torus: whether the distance wraps around the borders of the grid'''
+    def __init__(self, model, torus=False):
+        self.model = model
+        self.torus = torus
+        fields = self.fields = model.fields
+        self.width = fields.width
+        self.height = fields.height
+        self.distance = np.full(len(fields), np.nan)                # distance to the owner of each patch
+        self.distance_owner = np.full(len(fields), -2, dtype=np.int64) # owner of the distance
+
+    #Get the distance between two positions
+    def calculate(self, pos_1, pos_2):
+        dx = abs(pos_1[0] - pos_2[0])
+        dy = abs(pos_1[1] - pos_2[1])
+        if self.torus:
+            dx = min(dx, self.width - dx)
+            dy = min(dy, self.height - dy)
+        return np.sqrt(dx * dx + dy * dy)
+
+    #Get the distances between many positions (arrays xs, ys) and one position
+    def calculate_many(self, xs, ys, pos):
+        dx = np.abs(np.asarray(xs) - pos[0])
+        dy = np.abs(np.asarray(ys) - pos[1])
+        if self.torus:
+            dx = np.minimum(dx, self.width - dx)
+            dy = np.minimum(dy, self.height - dy)
+        return np.sqrt(dx * dx + dy * dy)
+
+    #Get the distances between the patches (arrays xs, ys) and the farmstead of
+    #their owner, only the distances of the patches that changed owner are calculated
+    def get_distances(self, xs, ys, owner):
+        xs = np.asarray(xs, dtype=np.int64)
+        ys = np.asarray(ys, dtype=np.int64)
+        rows = self.fields.row[xs, ys]
+        stale = self.distance_owner[rows] != owner.agent_id
+        if stale.any():
+            self.distance[rows[stale]] = self.calculate_many(xs[stale], ys[stale], owner.pos)
+            self.distance_owner[rows[stale]] = owner.agent_id
+        return self.distance[rows]
+
+    #Get the distances between a list of patches and the farmstead of their owner
+    def get_patch_distances(self, patches, owner):
+        if patches == []:
+            return np.empty(0)
+        xs, ys = zip(*(patch.pos for patch in patches))
+        return self.get_distances(xs, ys, owner)
+
+    #Get the distance between a patch and the farmstead of its owner
+    #(None if the owner is not an active farmer)
+    def get_owner_distance(self, pos):
+        owner = self.model.ownership.get_owner(pos)
+        if owner == None:
+            return None
+        row = self.fields.row[pos]
+        if self.distance_owner[row] != owner.agent_id:
+            self.distance[row] = self.calculate(pos, owner.pos)
+            self.distance_owner[row] = owner.agent_id
+        return self.distance[row]
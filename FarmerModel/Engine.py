@@ -0,0 +1,530 @@
+"""
+REPLICATION OF THE ABM MODEL
+An empirical ABM for regional land use/cover change:
+a Dutch case study (version 1.0.0)
+Quyen Nguyen | 16 December 2019
+THE MODEL INCLUDE FIVE COMPONENTS
+1. Agents: The module defines the characteristics and actions of the environment
+(Field Patch) and the farmers (Farmer)
+2. Schedule: The moduel defines the order that the model runs in cases there are
+several agent breeds. There are 2 breeds in the base model (Farmer and Field Patch).
+The Farmer can make decision, the Field Patch is static and only change after their
+respective owning Farmer makes decision
+3. SimpleModel: The module defines the inital states and the steps that all farmers
+makes during the time t
+4. Server: The module defines the visualization of the model
+5. Analysis: The module shows the analysis of the model
+##########################
+#      ARRAY ENGINE      #
+##########################
+"""
+##########################
+# IMPORT GENERIC LIBRARY #
+##########################
+import numpy as np
+
+##########################
+# IMPORT MODEL COMPONENT #
+##########################
+from Agents import Farmer
+
+#Values of the text characteristics of the farmers, kept as codes in the columns
+CESSATION = ('', 'inherit', 'stop')
+EXPANSION = ('', 'buy', 'stable', 'sell', 'sold', 'bought')
+PROTECTION = ('', 'done', 'cut', 'plant', 'keep')
+
+##########################
+# CREATE ARRAY ENGINE    #
+##########################
+#Define the engine that runs the step of all the farmers with NumPy columns
+class ArrayEngine():
+    ''' This is the array engine of the model, an alternative to stepping the
+    Farmer objects one by one. The state of the farmers is held as NumPy
+    columns (one row per farmer) and the feedback, cessation, expansion,
+    protection and update of Farmer.step are computed for all the farmers
+    at once with masked array operations, from the same random numbers
+    (the step draws of the model) and the same activation order (the
+    shuffle of the schedule). Only the land transactions stay sequential:
+    the farmers that sell a field do it one by one in the activation order,
+    and the farmers that stop farming run the rest of their step with the
+    object code (Farmer.step_actions), as the land market is per transaction.
+    The farmers in the buyer registry also run it with the object code: the
+    farmers before them in the activation order can sell them land, which
+    changes their decisions. The decisions of the other farmers are taken
+    from the state at the start of the step. The Farmer objects are only written when
+    they are needed (sync), the statistics of the model are set from the columns.
+        Args:
+            model: the model of the farmers'''
+    int_columns = ('agent_id', 'agent_type', 'agent_age', 'agent_business_type', \
+                   'agent_new', 'draw_row', 'transaction_row', 'agent_decision_trees', 'agent_tree_size', \
+                   'agent_trees', 'count_field_le', 'agent_agent_decision_trees')
+    float_columns = ('agent_production', 'agent_production_extra', 'national_landscape', \
+                     'agent_random_stop', 'agent_random_expand', 'agent_random_protect', \
+                     'agent_farm_size', 'agent_farm_size_previous', 'agent_farm_expansion', \
+                     'agent_production_scale', 'patch_farm_area', \
+                     'p_expand_type', 'p_shrink_type', 'p_stop_type', 'p_protect_type', \
+                     'p_exogenous_stop', 'p_business_stop', 'p_exogenous_expand', \
+                     'p_expand_feedback', 'p_stop_feedback', 'p_scenario_ehs', \
+                     'p_stop', 'p_expand', 'p_shrink', 'p_protect')
+    code_columns = {'agent_cessation': CESSATION,
+                    'cessation': CESSATION,
+                    'agent_expansion': EXPANSION,
+                    'agent_protection': PROTECTION,
+                    'protection': PROTECTION}
+
+    def __init__(self, model):
+        self.model = model
+        #Probabilities of the agent types, one row per agent_type
+        self.type_probabilities = model.scenarios.type_probabilities
+        self.load()
+
+    ##########################
+    # COLUMNS OF THE FARMERS #
+    ##########################
+    #Take the state of the Farmer objects of the model into the columns, 
+    #one column at a time (all the farmers of the schedule are alive)
+    def load(self):
+        farmers = self.farmers = list(self.model.schedule.agents_by_breed[Farmer].values())
+        n = len(farmers)
+        for name in self.int_columns:
+            setattr(self, name, np.array([getattr(farmer, name, 0) for farmer in farmers], dtype=np.int64))
+        for name in self.float_columns:
+            setattr(self, name, np.array([getattr(farmer, name, np.nan) for farmer in farmers], dtype=np.float64))
+        for name, values in self.code_columns.items():
+            codes = {value: code for code, value in enumerate(values)}
+            setattr(self, name, np.array([codes[getattr(farmer, name, '')] for farmer in farmers], dtype=np.int8))
+        self.alive = np.ones(n, dtype=bool)
+        self.rows_by_id = {farmer.unique_id: row for row, farmer in enumerate(self.farmers)}
+        # table id -> row to find the row of the owner of each field (-1 if the 
+        # owner is not a farmer), sorted ids if the ids are too large for a table
+        self.sorted_rows = np.argsort(self.agent_id, kind='stable')
+        self.sorted_ids = self.agent_id[self.sorted_rows]
+        if (n > 0) and (self.sorted_ids[0] >= 0) and (self.sorted_ids[-1] <= 16 * n + 1024):
+            self.row_of_id = np.full(self.sorted_ids[-1] + 1, -1, dtype=np.int64)
+            self.row_of_id[self.agent_id[::-1]] = np.arange(n)[::-1]
+        else:
+            self.row_of_id = None
+        fields = self.model.fields
+        self.field_xs, self.field_ys = fields.xs, fields.ys
+
+    #Take the state of one Farmer object into its row
+    def load_row(self, row):
+        farmer = self.farmers[row]
+        for name in self.int_columns:
+            getattr(self, name)[row] = getattr(farmer, name, 0)
+        for name in self.float_columns:
+            getattr(self, name)[row] = getattr(farmer, name, np.nan)
+        for name, values in self.code_columns.items():
+            getattr(self, name)[row] = values.index(getattr(farmer, name, ''))
+        self.alive[row] = farmer.unique_id in self.model.schedule.agents_by_breed[Farmer]
+
+    #Write the state of the selected rows into their Farmer objects
+    def sync_rows(self, rows):
+        # the columns are converted to lists once (default: value of a characteristic 
+        # that is not set, it is only written if the farmer already has it)
+        columns = [(name, getattr(self, name)[rows].tolist(), 0) for name in self.int_columns]
+        columns += [(name, getattr(self, name)[rows].tolist(), None) for name in self.float_columns]
+        columns += [(name, np.array(values, dtype=object)[getattr(self, name)[rows]].tolist(), '') \
+                    for name, values in self.code_columns.items()]
+        hobby = (self.agent_production_scale[rows] <= 20).tolist()
+        # the statistics are set from the columns, they are not corrected here
+        statistics = self.model.statistics
+        for i, row in enumerate(rows.tolist()):
+            farmer = self.farmers[row]
+            counted = farmer in statistics.farmers
+            statistics.farmers.discard(farmer)
+            for name, values, default in columns:
+                value = values[i]
+                if ((value == value) and (value != default)) or hasattr(farmer, name):
+                    setattr(farmer, name, value)
+            if hobby[i]:
+                farmer.agent_production_class = "hobby"
+            else:
+                farmer.agent_production_class = "small"
+            farmer.agent_farm_list = self.model.ownership.get_patches(farmer.agent_id)
+            if counted:
+                statistics.farmers.add(farmer)
+
+    #Write the state of one row into its Farmer object
+    def sync_row(self, row):
+        self.sync_rows(np.array([row]))
+
+    #Write the state of all the farmers into the Farmer objects
+    def sync(self):
+        self.sync_rows(np.flatnonzero(self.alive))
+
+    #Run a method of the Farmer object of a row (sequential part of the step)
+    def run_object(self, row, method):
+        self.sync_row(row)
+        buyers = list(self.model.buyers)
+        getattr(self.farmers[row], method)()
+        self.load_row(row)
+        # the buyers of the land of the farmer leave the buyer registry ("bought")
+        for buyer in buyers:
+            if (buyer not in self.model.buyers) and (buyer.unique_id in self.rows_by_id):
+                self.agent_expansion[self.rows_by_id[buyer.unique_id]] = \
+                    EXPANSION.index(buyer.agent_expansion)
+
+    #Land bought/sold in the last five years by all the farmers, from the 
+    #transaction history of the model 
+    @property
+    def agent_farm_expansion_sum(self):
+        return self.model.transactions.sums[self.transaction_row]
+
+    #Set the probabilities of the agent types of the selected farmers
+    def set_type_probabilities(self, selected):
+        probabilities = self.type_probabilities[self.agent_type[selected]]
+        self.p_expand_type[selected] = probabilities[:, 0]
+        self.p_shrink_type[selected] = probabilities[:, 1]
+        self.p_stop_type[selected] = probabilities[:, 2]
+        self.p_protect_type[selected] = probabilities[:, 3]
+
+    #Rows of the farmers that own the fields (fields of the farmers that left are not counted)
+    def get_field_rows(self):
+        xs, ys = self.field_xs, self.field_ys
+        owners = self.model.fields.field_owner_id[xs, ys]
+        if self.row_of_id is not None:
+            known = (owners >= 0) & (owners < len(self.row_of_id))
+            rows = np.where(known, self.row_of_id[np.where(known, owners, 0)], -1)
+            owned = rows >= 0
+            owned[owned] = self.alive[rows[owned]]
+        else:
+            index = np.minimum(np.searchsorted(self.sorted_ids, owners), len(self.sorted_ids) - 1)
+            rows = self.sorted_rows[index]
+            owned = (self.sorted_ids[index] == owners) & self.alive[rows]
+        if self.model.profiler is not None:
+            self.model.profiler.count('patches_scanned', len(xs))
+        return xs[owned], ys[owned], rows[owned]
+
+    #Number of fields, farm size and number of fields with landscape elements of the farmers
+    def count_fields(self, field_rows):
+        fields = self.model.fields
+        xs, ys, rows = field_rows
+        n = len(self.farmers)
+        number_fields = np.bincount(rows, minlength=n)
+        farm_size = np.bincount(rows, weights=fields.field_size[xs, ys], minlength=n)
+        tree_size = np.bincount(rows, weights=fields.field_le[xs, ys] == 1, minlength=n).astype(np.int64)
+        return number_fields, farm_size, tree_size
+
+    ##########################
+    # STEP OF THE FARMERS    #
+    ##########################
+    #Run one step of all the farmers (Farmer.step)
+    def step(self):
+        model = self.model
+        schedule = model.schedule
+        # the same activation order as the schedule (same permutation of the same agents)
+        order = [self.rows_by_id[farmer.unique_id] for farmer in schedule.get_activation_order(Farmer)]
+        uniform = model.draws.uniform[self.draw_row]
+        normal = model.draws.normal[self.draw_row]
+        draw = lambda name: uniform[:, model.draws.uniform_columns[name]]
+        alive = self.alive.copy()
+        field_rows = self.get_field_rows()
+        number_fields, _, _ = self.count_fields(field_rows)
+        # the end of each phase is a lap of the profiler of the model (if profiled)
+        profiler = model.profiler
+        if profiler is not None:
+            profiler.lap('schedule')
+
+        ## Feedback
+        self.feedback_internal_actions(alive)
+        self.feedback_internal_decisions(alive, normal[:, model.draws.normal_columns['expand']], \
+                                         normal[:, model.draws.normal_columns['protect']])
+        if profiler is not None:
+            profiler.lap('feedback')
+        ## Cessation
+        self.farm_cessation_option(alive)
+        self.farm_cessation_decision(alive, draw('stop'))
+        self.farm_cessation_action(alive, draw('inherit'))
+        if profiler is not None:
+            profiler.lap('cessation')
+        # the farmers that stop and the buyers run the rest of their step with the object code
+        stop = alive & ((self.agent_cessation == CESSATION.index('stop')) | self.get_buyers())
+        active = alive & ~stop
+
+        ###Expansion/Shrinkage
+        self.farm_expansion_option(active)
+        self.farm_expansion_decision(active, number_fields)
+        if profiler is not None:
+            profiler.lap('expansion')
+
+        ###Protect tree
+        self.protection_trees_option(active)
+        self.protection_trees_decision(active, field_rows)
+        if profiler is not None:
+            profiler.lap('protection')
+
+        ## Land transactions, one by one in the activation order
+        sell = active & (self.agent_expansion == EXPANSION.index('sell'))
+        protect = active & np.isin(self.agent_protection, (PROTECTION.index('cut'), \
+                                                           PROTECTION.index('plant')))
+        transactions = stop | sell | protect
+        for row in order:
+            if not transactions[row]:
+                continue
+            if stop[row]:
+                self.run_object(row, 'step_actions')
+                continue
+            if sell[row]:
+                self.farm_expansion_action(row)
+                if profiler is not None:
+                    profiler.lap('expansion')
+            if protect[row] and self.alive[row]:
+                self.run_object(row, 'protection_trees_action')
+                if profiler is not None:
+                    profiler.lap('protection')
+
+        ## Update the agent
+        self.update_agent(active & self.alive)
+        schedule.steps += 1
+        schedule.time += 1
+        if profiler is not None:
+            profiler.lap('update')
+
+        # the batched land market is cleared after the update of all the farmers,
+        # as in the object code
+        if model.market is not None:
+            self.clear_market()
+            if profiler is not None:
+                profiler.lap('market')
+        self.set_statistics()
+
+    #Rows of the farmers in the buyer registry of the model
+    def get_buyers(self):
+        buyers = np.zeros(len(self.farmers), dtype=bool)
+        rows = [self.rows_by_id[buyer.unique_id] for buyer in self.model.buyers \
+                if buyer.unique_id in self.rows_by_id]
+        buyers[rows] = True
+        return buyers
+
+    #Clear the batched land market of the model. The sellers and the buyers are
+    #written into their Farmer objects, the market updates their farms as in the 
+    #object code, then their rows are taken back (the sellers without fields left)
+    def clear_market(self):
+        model = self.model
+        farmers = [seller for seller, positions, k in model.market.offers] + list(model.buyers)
+        rows = np.array(sorted({self.rows_by_id[farmer.unique_id] for farmer in farmers \
+                                if farmer.unique_id in self.rows_by_id}), dtype=np.int64)
+        rows = rows[self.alive[rows]]
+        self.sync_rows(rows)
+        model.market.clear()
+        for row in rows.tolist():
+            self.load_row(row)
+
+    #Set the statistics of the model from the columns
+    def set_statistics(self):
+        alive = self.alive
+        self.model.statistics.set_counters(self.agent_type[alive], self.agent_farm_size[alive], \
+                                           self.agent_tree_size[alive], \
+                                           self.agent_cessation[alive] == CESSATION.index('stop'))
+
+    ##########################
+    # FEEDBACK               #
+    ##########################
+    #Farmer.feedback_internal_actions for the selected farmers
+    def feedback_internal_actions(self, selected):
+        context = self.model.context
+        growth = context.index_growth
+        # mean farm size of the population at the start of the step
+        mean = context.mean_farm_size
+        total = self.agent_farm_expansion_sum
+        size = self.agent_farm_size
+        feedback = self.p_expand_feedback
+        # the same rules in the same order as the object code
+        small = selected & (size < 10)
+        large = selected & (size >= 10)
+        feedback[small & (total <= 2 * mean * growth) & (total > mean)] = 0.86 + growth
+        feedback[small & (total <= mean) & (total > 2)] = 0.61 + growth
+        feedback[large & (total <= 2 * mean) & (total > mean)] = 0.73 + growth
+        feedback[large & (total <= mean) & (total > 2)] = 0.45 + growth
+        feedback[selected & (total > 2 * mean)] = 0.20 + growth
+        feedback[selected & (total > 4 * mean)] = 0.05 + growth
+        # previous transactions do not influence agents' options
+        feedback[selected] = 1
+        self.p_stop_feedback[selected & (total < 0.1)] = 0.14
+        self.p_stop_feedback[selected & (total >= 0.1)] = -0.14
+
+    #Farmer.feedback_internal_decisions for the selected farmers
+    def feedback_internal_decisions(self, selected, normal_expand, normal_protect):
+        expand = self.agent_random_expand
+        protect = self.agent_random_protect
+        expand[selected] = expand[selected] + 0.06 * normal_expand[selected]
+        protect[selected] = protect[selected] + 0.06 * normal_protect[selected]
+        # Probabilities need to be between 0 and 1 (only one of them is corrected)
+        below_expand = selected & (expand < 0)
+        above_expand = selected & ~below_expand & (expand > 1)
+        below_protect = selected & ~below_expand & ~above_expand & (protect < 0)
+        above_protect = selected & ~below_expand & ~above_expand & ~below_protect & (protect > 1)
+        expand[below_expand] = 0
+        expand[above_expand] = 1
+        protect[below_protect] = 0
+        protect[above_protect] = 1
+
+    ##########################
+    # CESSATION              #
+    ##########################
+    #Farmer.farm_cessation_option for the selected farmers
+    def farm_cessation_option(self, selected):
+        option = selected & (self.agent_cessation == CESSATION.index(''))
+        p_stop = (self.p_stop_type * self.p_exogenous_stop * \
+                  (1 + self.p_business_stop) * (1 + self.p_stop_feedback))
+        if self.model.scenario == "B2":
+            p_stop = np.where(self.national_landscape == 1, p_stop * 0.9, p_stop * 1.1)
+            p_stop = np.where((self.agent_type == 3) | (self.agent_type == 5), p_stop * 0.9, p_stop * 1.1)
+        self.p_stop[option] = np.clip(p_stop[option], 0, 1)
+        self.p_stop[selected & ~option] = 0
+
+    #Farmer.farm_cessation_decision for the selected farmers
+    def farm_cessation_decision(self, selected, random_stop):
+        old = selected & (self.agent_age > 50)
+        stop = old & (self.agent_random_stop < self.p_stop)
+        self.cessation[stop] = CESSATION.index('stop')
+        self.agent_type[stop & (self.agent_type == 4)] = 2
+        self.agent_type[stop & (self.agent_type == 5)] = 3
+        self.set_type_probabilities(stop)
+        self.agent_random_expand[stop] = 0.5 + 0.5 * random_stop[stop]
+        self.agent_cessation[selected & ~old] = CESSATION.index('inherit')
+
+    #Farmer.farm_cessation_action for the selected farmers (inheritance only,
+    #the farmers that stop are run with the object code)
+    def farm_cessation_action(self, selected, random_inherit):
+        inherit = selected & (self.agent_cessation == CESSATION.index('inherit')) & (self.agent_age >= 65)
+        new = inherit & ((random_inherit < 0.1) | (self.agent_age >= 84))
+        self.agent_age[new] = 37
+        self.agent_cessation[new] = CESSATION.index('')
+
+    ##########################
+    # EXPANSION/SHRINKAGE    #
+    ##########################
+    #Farmer.farm_expansion_option for the selected farmers
+    def farm_expansion_option(self, selected):
+        self.p_expand[selected] = (self.p_expand_type * self.p_expand_feedback * \
+                                   (1 + self.p_exogenous_expand))[selected]
+        # the object code sets p_scenario_ehs to 0 in all the scenarios
+        self.p_scenario_ehs[selected] = 0
+        self.p_shrink[selected] = (self.p_shrink_type * (1 + self.p_scenario_ehs))[selected]
+        # Probabilities need to be between 0 and 1 (only one of them is corrected)
+        p_expand = self.p_expand
+        p_shrink = self.p_shrink
+        below_expand = selected & (p_expand < 0)
+        above_expand = selected & ~below_expand & (p_expand > 1)
+        below_shrink = selected & ~below_expand & ~above_expand & (p_shrink < 0)
+        above_shrink = selected & ~below_expand & ~above_expand & ~below_shrink & (p_shrink > 1)
+        p_expand[below_expand] = 0
+        p_expand[above_expand] = 1
+        p_shrink[below_shrink] = 0
+        p_shrink[above_shrink] = 1
+
+    #Farmer.farm_expansion_decision for the selected farmers
+    def farm_expansion_decision(self, selected, number_fields):
+        buy = selected & (self.p_expand > self.agent_random_expand) & \
+            (self.agent_cessation != CESSATION.index('stop')) & (self.agent_farm_expansion_sum > -1)
+        # the buyers go back to "stable" at once, as in the object code
+        self.agent_expansion[buy] = EXPANSION.index('stable')
+        sell = selected & ((1 - self.p_shrink) < self.agent_random_expand) & \
+            (number_fields > 1) & (self.agent_farm_expansion_sum < 1)
+        self.agent_expansion[sell] = EXPANSION.index('sell')
+
+    #Farmer.farm_expansion_action of one farmer that sells a field
+    def farm_expansion_action(self, row):
+        model = self.model
+        fields = model.fields
+        farmer = self.farmers[row]
+        positions = model.ownership.get_positions(farmer.agent_id)
+        if model.scenario == "B2":
+            # a field in the EHS is chosen, but it is not sold in the object code
+            fields_ehs = [pos for pos in positions if fields.field_ehs[pos] == 1]
+            if fields_ehs != []:
+                model.rng_farmers.integers(len(fields_ehs))
+            return
+        # the farthest field is sold (the first one in the order of the grid)
+        xs, ys = np.array(positions).T
+        distances = model.distances.get_distances(xs, ys, farmer)
+        field_sell = fields.get_patch(positions[int(np.argmax(distances))])
+        if (((model.scenario != "A1") and (field_sell.field_ehs == 1)) or \
+                ((model.scenario == "A1") and (field_sell.field_ehs == -1) and \
+                 (field_sell.field_suitability < 0.5))):
+            # Nature development
+            field_sell.field_owner_id = 9999
+            field_sell.field_landuse = 4
+        elif model.market is not None:
+            # the field is sold when the land market is cleared (clear_market)
+            model.market.offer(farmer, [field_sell])
+        else:
+            # Individual fields are sold to the closest buyer
+            buyers = farmer.find_nearest_buyers(1)
+            if buyers != []:
+                field_sell.field_owner_id = buyers[0].agent_id
+                buyers[0].agent_expansion = "bought"
+                if buyers[0].unique_id in self.rows_by_id:
+                    self.agent_expansion[self.rows_by_id[buyers[0].unique_id]] = EXPANSION.index('bought')
+        self.agent_expansion[row] = EXPANSION.index('sold')
+        # Those agent without any other field will quit
+        if model.ownership.get_patch_count(farmer.agent_id) == 0:
+            model.remove_farmer(farmer)
+            self.alive[row] = False
+
+    ##########################
+    # PROTECT TREE           #
+    ##########################
+    #Farmer.protection_trees_option for the selected farmers
+    def protection_trees_option(self, selected):
+        self.p_protect[selected] = self.p_protect_type[selected]
+
+    #Farmer.protection_trees_decision for the selected farmers
+    def protection_trees_decision(self, selected, field_rows):
+        model = self.model
+        decide = selected & (self.agent_decision_trees >= 6)
+        if model.scenario == "A1":
+            fields = model.fields
+            xs, ys, rows = field_rows
+            cut = (fields.field_le[xs, ys] == 1) & (fields.field_suitability[xs, ys] > 0.5)
+            fields_cut = np.bincount(rows[cut], minlength=len(self.farmers))
+            cutting = decide & (fields_cut > 0) & (self.p_protect < self.agent_random_protect) & \
+                (self.agent_type != 1)
+            self.protection[cutting] = PROTECTION.index('cut')
+            self.protection[decide & ~cutting] = PROTECTION.index('keep')
+            self.agent_decision_trees[decide] = 0
+        if model.scenario == "B2":
+            keep = decide & (self.agent_trees == 1) & (self.p_protect * 1.5 < self.agent_random_protect) & \
+                (self.agent_type != 1)
+            self.protection[keep] = PROTECTION.index('keep')
+            plant = selected & (self.p_protect > self.agent_random_protect) & (self.agent_type != 1)
+            self.protection[plant] = PROTECTION.index('plant')
+            self.agent_decision_trees[selected] = 0
+
+    ##########################
+    # UPDATE AGENT           #
+    ##########################
+    #Farmer.update_agent and Farmer.update_agent_transactions for the selected farmers
+    def update_agent(self, selected):
+        fields = self.model.fields
+        size = self.agent_farm_size
+        scale = np.where(size < 1, self.agent_production + self.agent_production_extra, \
+                         size * self.agent_production + self.agent_production_extra)
+        self.agent_production_scale[selected] = scale[selected]
+        # the fields of the farmers after the land transactions of the step
+        field_rows = self.get_field_rows()
+        _, farm_size, tree_size = self.count_fields(field_rows)
+        self.count_field_le[selected] = tree_size[selected]
+        self.agent_trees[selected] = tree_size[selected] >= 1
+        # FEEDBACK BETWEEN AGENT TYPES _ HOBBY VS. OTHERS
+        hobby = selected & (self.agent_type != 1) & (scale <= 20)
+        self.agent_type[hobby] = 1
+        self.set_type_probabilities(hobby)
+        conventional = selected & (self.agent_type == 1) & (scale > 20) & (self.agent_new == 0)
+        self.agent_type[conventional] = 2
+        self.set_type_probabilities(conventional)
+        self.agent_age[selected] += 1
+        self.agent_agent_decision_trees[selected] = self.agent_decision_trees[selected] + 1
+        # Update the land transactions of the last five years
+        size[selected] = farm_size[selected]
+        self.agent_tree_size[selected] = tree_size[selected]
+        self.agent_farm_size_previous[selected] = size[selected]
+        self.agent_farm_expansion[selected] = size[selected] - self.agent_farm_size_previous[selected]
+        self.model.transactions.add_rows(self.transaction_row[selected], self.agent_farm_expansion[selected])
+        self.patch_farm_area[selected] = size[selected]
+        # Define the size of the farm to which a patch belongs
+        xs, ys, rows = field_rows
+        updated = selected[rows]
+        fields.patch_farm_size[xs[updated], ys[updated]] = size[rows[updated]]
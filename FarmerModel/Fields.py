@@ -0,0 +1,270 @@
+"""
+REPLICATION OF THE ABM MODEL
+An empirical ABM for regional land use/cover change:
+a Dutch case study (version 1.0.0)
+Quyen Nguyen | 16 December 2019
+THE MODEL INCLUDE FIVE COMPONENTS
+1. Agents: The module defines the characteristics and actions of the environment
+(Field Patch) and the farmers (Farmer)
+2. Schedule: The moduel defines the order that the model runs in cases there are
+several agent breeds. There are 2 breeds in the base model (Farmer and Field Patch).
+The Farmer can make decision, the Field Patch is static and only change after their
+respective owning Farmer makes decision
+3. SimpleModel: The module defines the inital states and the steps that all farmers
+makes during the time t
+4. Server: The module defines the visualization of the model
+5. Analysis: The module shows the analysis of the model
+##########################
+#         FIELDS         #
+##########################
+"""
+##########################
+# IMPORT GENERIC LIBRARY #
+##########################
+import numpy as np
+from mesa.space import MultiGrid, accept_tuple_argument
+
+##########################
+# IMPORT MODEL COMPONENT #
+##########################
+from Agents import FieldPatch
+
+##########################
+# CREATE FIELD COLUMN    #
+##########################
+#Define one characteristic of the field patches, one value per field patch
+class CellColumn():
+    ''' This is one characteristic of the field patches in the field store:
+    one value per field patch (row of the store), read and written by the
+    position [x, y] of the patches through the map of the cells to the rows,
+    as a NumPy array [x, y] (a position, arrays xs, ys or a mask of the grid).
+    The last value is the value of the cells without a field patch (nodata),
+    it does not change when such a cell is written.
+        Args:
+            store: the field store of the column
+            data: the values of the rows, then the nodata value'''
+    def __init__(self, store, data):
+        self.store = store
+        self.data = data
+
+    #Values of the field patches, one per row (in the order of the grid)
+    @property
+    def values(self):
+        return self.data[:-1]
+
+    @property
+    def dtype(self):
+        return self.data.dtype
+
+    @property
+    def shape(self):
+        return self.store.row.shape
+
+    def __getitem__(self, index):
+        return self.data[self.store.row[index]]
+
+    def __setitem__(self, index, value):
+        nodata = self.data[-1]
+        self.data[self.store.row[index]] = value
+        self.data[-1] = nodata
+
+    #Array [x, y] of the column over the whole grid (nodata without a field patch),
+    #only made when a raster is needed (e.g. the counts of the landscape)
+    def __array__(self, dtype=None, copy=None):
+        raster = self.data[self.store.row]
+        return raster if dtype is None else raster.astype(dtype)
+
+##########################
+# CREATE FIELD STORE     #
+##########################
+#Define the storage of the field patches, one array per characteristic
+class FieldStore():
+    ''' This is the storage of all the field patches of the model. Each
+    characteristic of the fields is one NumPy array with one value per field
+    patch (struct of arrays), instead of one Python object with a dozen
+    attributes per cell. Only the cells that hold a field patch have a row,
+    so the columns follow the number of fields and not the size of the grid;
+    the grid only keeps the mask exists and the row of each cell (5 bytes
+    per cell). The columns are read and written by position [x, y] (see
+    CellColumn). FieldPatch is only a light view of one cell of the store,
+    created when it is needed. A column keeps the narrower dtype of its
+    raster (e.g. float32 and int8 of a dataset).
+        Args:
+            model: the model of the fields
+            width, height: the size of the grid'''
+    columns = {'field_id': np.int64,             # id of the field
+               'field_owner_id': np.int64,       # field owner (-1 if no owner)
+               'field_area': np.float64,         # area of the field
+               'field_suitability': np.float64,  # suitability of the field for agriculture
+               'field_le': np.float64,           # landscape elements in the field
+               'field_le_current': np.float64,   # length of landscape elements in a pixel
+               'field_le_potential': np.float64, # perimeter of the field
+               'field_size': np.float64,         # size of the field
+               'field_soil': np.float64,         # soil of the field
+               'field_landuse': np.int32,        # land_use type of the field
+               'field_ehs': np.int8,             # whether the field belongs to the area selected for the EHS
+               'patch_farm_size': np.float64}    # size of the farm to which a patch belongs
+    #Value of the columns in the cells without a field patch (0 if not listed),
+    #also the value of the patches until it is set
+    nodata = {'field_owner_id': -1,
+              'patch_farm_size': np.nan}
+    def __init__(self, model, width, height):
+        self.model = model
+        self.width = width
+        self.height = height
+        self.exists = np.zeros((width, height), dtype=bool)        # cells that hold a field patch
+        self.row = np.full((width, height), -1, dtype=np.int32)    # row of the patch of each cell (-1 without)
+        self.set_rows(np.zeros(0, dtype=np.int64))
+
+    #Number of field patches
+    def __len__(self):
+        return len(self.cells)
+
+    #Give a row to the field patches of the cells (cell numbers x * height + y,
+    #in the order of the grid) and create the columns with the nodata values.
+    #dtypes are the dtypes of the rasters of the columns (see get_dtype)
+    def set_rows(self, cells, dtypes={}):
+        self.cells = cells
+        self.xs, self.ys = np.divmod(cells, self.height)    # positions of the rows
+        self.exists[:] = False
+        self.exists.flat[cells] = True
+        self.row[:] = -1
+        self.row.flat[cells] = np.arange(len(cells))
+        for name, dtype in self.columns.items():
+            dtype = self.get_dtype(dtype, dtypes.get(name))
+            setattr(self, name, CellColumn(self, np.full(len(cells) + 1, self.nodata.get(name, 0), dtype=dtype)))
+
+    #Store the characteristics of all the field patches at once. Each 
+    #characteristic is an array [x, y] of the size of the grid (e.g. a 
+    #memory-mapped raster of a dataset), read tile by tile of tile_size 
+    #columns so no full temporary copy of a raster is made, and only the 
+    #values of the cells with a field patch are kept. exists defines the cells
+    #that hold a field patch; if None, the cells with a field_id (not 0, None 
+    #or NaN) hold a field patch, all the cells without field_id.
+    #The ownership index is built from the owners unless build_index = False
+    def add_patches(self, exists=None, tile_size=256, build_index=True, **columns):
+        tiles = [slice(start, min(start + tile_size, self.width)) for start in range(0, self.width, tile_size)]
+        for tile in tiles:
+            if exists is not None:
+                self.exists[tile] = exists[tile]
+            elif 'field_id' in columns:
+                self.exists[tile] = self.has_field_id(columns['field_id'][tile])
+            else:
+                self.exists[tile] = True
+        self.set_rows(np.flatnonzero(self.exists), \
+                      {name: np.asarray(values).dtype for name, values in columns.items()})
+        for tile in tiles:
+            patches = self.exists[tile]
+            rows = self.row[tile][patches]
+            for name, values in columns.items():
+                values = np.asarray(values[tile])[patches]
+                if name == 'field_owner_id':
+                    # fields without an owner (None or NaN) get the owner -1
+                    values = np.nan_to_num(np.asarray(values, dtype=np.float64), nan=-1)
+                elif name == 'field_id':
+                    # patches of exists without a field_id get the field_id 0
+                    values = np.where(self.has_field_id(values), values, 0)
+                getattr(self, name).data[rows] = values
+        if build_index:
+            self.model.ownership.build()
+
+    #Store the field patches of the cells from columns with one value per 
+    #patch (e.g. the columns of a checkpoint), in the order of the cells
+    def add_rows(self, cells, build_index=True, **columns):
+        self.set_rows(np.asarray(cells, dtype=np.int64), \
+                      {name: np.asarray(values).dtype for name, values in columns.items()})
+        for name, values in columns.items():
+            getattr(self, name).values[:] = values
+        if build_index:
+            self.model.ownership.build()
+
+    #Dtype of a column: the dtype of its raster if it is narrower than the dtype 
+    #of the column and of the same kind (integer or float)
+    @staticmethod
+    def get_dtype(dtype, raster_dtype=None):
+        dtype = np.dtype(dtype)
+        if raster_dtype is None:
+            return dtype
+        if (raster_dtype.kind == dtype.kind) and (raster_dtype.itemsize < dtype.itemsize):
+            return raster_dtype
+        return dtype
+
+    #Cells of a tile of field_id that hold a field (not 0, None or NaN)
+    @staticmethod
+    def has_field_id(field_id):
+        field_id = np.asarray(field_id)
+        if field_id.dtype == object:
+            field_id = np.array(field_id, dtype=np.float64)   # None becomes NaN
+        valid = (field_id != 0)
+        if np.issubdtype(field_id.dtype, np.floating):
+            valid &= ~np.isnan(field_id)
+        return valid
+
+    #Get the view of the field patch at a position
+    def get_patch(self, pos):
+        return FieldPatch(self.model, pos)
+
+    #Iterate over the views of all the field patches
+    def iter_patches(self):
+        for x, y in zip(self.xs.tolist(), self.ys.tolist()):
+            yield FieldPatch(self.model, (x, y))
+
+##########################
+# CREATE FIELD GRID      #
+##########################
+#Define the grid that also shows the field patches in its cells
+class FieldGrid(MultiGrid):
+    ''' MultiGrid of the farmers that also returns the view of the field
+    patch of a cell as its first content, so the visualization and the code
+    that looks into the cells still see the field patches, while they are not
+    placed in the grid one by one. Only the cells that hold agents are stored
+    (position -> list of agents), instead of one list per cell of the whole
+    grid and the set of the empty cells of Mesa, so the memory follows the 
+    number of farmers and not the size of the grid. A cell is empty if it
+    holds no field patch and no agent; the empty cells are derived from the
+    field store when they are asked (empties), not kept up to date.'''
+    def __init__(self, width, height, torus, fields):
+        self.height = height
+        self.width = width
+        self.torus = torus
+        self.cells = {}     # position -> agents of the cell
+        self._neighborhood_cache = dict()
+        self.fields = fields
+
+    #Column x of the grid, as the grid of Mesa (lists of the agents of the cells)
+    def __getitem__(self, index):
+        return [self.cells.get((index, y), []) for y in range(self.height)]
+
+    def __iter__(self):
+        for x in range(self.width):
+            yield from self[x]
+
+    def coord_iter(self):
+        for x in range(self.width):
+            for y in range(self.height):
+                yield self.cells.get((x, y), []), x, y
+
+    def _place_agent(self, pos, agent):
+        self.cells.setdefault(pos, []).append(agent)
+
+    def _remove_agent(self, pos, agent):
+        cell = self.cells[pos]
+        cell.remove(agent)
+        if not cell:
+            del self.cells[pos]
+
+    def is_cell_empty(self, pos):
+        return (pos not in self.cells) and not self.fields.exists[pos]
+
+    @accept_tuple_argument
+    def iter_cell_list_contents(self, cell_list):
+        for x, y in cell_list:
+            if self.fields.exists[x, y]:
+                yield self.fields.get_patch((x, y))
+            yield from self.cells.get((x, y), ())
+
+    #Cells without a field patch and without agents, as the set of Mesa
+    @property
+    def empties(self):
+        xs, ys = np.nonzero(~self.fields.exists)
+        return {pos for pos in zip(xs.tolist(), ys.tolist()) if pos not in self.cells}
@@ -0,0 +1,147 @@
+"""
+REPLICATION OF THE ABM MODEL
+An empirical ABM for regional land use/cover change:
+a Dutch case study (version 1.0.0)
+Quyen Nguyen | 16 December 2019
+THE MODEL INCLUDE FIVE COMPONENTS
+1. Agents: The module defines the characteristics and actions of the environment
+(Field Patch) and the farmers (Farmer)
+2. Schedule: The moduel defines the order that the model runs in cases there are
+several agent breeds. There are 2 breeds in the base model (Farmer and Field Patch).
+The Farmer can make decision, the Field Patch is static and only change after their
+respective owning Farmer makes decision
+3. SimpleModel: The module defines the inital states and the steps that all farmers
+makes during the time t
+4. Server: The module defines the visualization of the model
+5. Analysis: The module shows the analysis of the model
+##########################
+#        LANDSCAPE       #
+##########################
+"""
+##########################
+# IMPORT GENERIC LIBRARY #
+##########################
+import numpy as np
+
+##########################
+# CREATE LANDUSE RASTER  #
+##########################
+#Define the raster that holds the land use of all the field patches
+class LanduseRaster():
+    ''' This is the raster of the land use (field_landuse) of the field patches,
+    indexed by the position [x, y] of the patches on the grid. It answers
+    "how many patches of land use class k are within radius r of (x, y)".
+    For every (class, radius) that is asked, a count map is computed once with
+    a disk kernel (row-wise prefix sums) and afterwards it is updated only around
+    the patches whose land use changes. A query is then one array lookup.
+    The distance is the same as Farmer.calculate_distance (the distance service
+    of the model): euclidean, and with torus=True it wraps around the borders
+    of the grid, where each patch is counted once.
+        Args:
+            landuse: the land use indexed by [x, y] (the field_landuse column
+            of the field store)
+            torus: whether the distance wraps around the borders of the grid'''
+    def __init__(self, landuse, torus=False):
+        self.landuse = landuse
+        self.torus = torus
+        self.count_maps = {}   # (landuse_class, radius) -> count of the patches of that class in the disk
+
+    #Get the land use of a patch
+    def get_landuse(self, pos):
+        return self.landuse[pos]
+
+    #Change the land use of a patch and update the count maps around it
+    def set_landuse(self, pos, landuse):
+        previous_landuse = self.landuse[pos]
+        self.landuse[pos] = landuse
+        for (landuse_class, radius), count_map in self.count_maps.items():
+            change = (int(self.in_class(landuse, landuse_class)) -
+                      int(self.in_class(previous_landuse, landuse_class)))
+            if change != 0:
+                xs, ys = self.disk_cells(pos, radius)
+                count_map[xs, ys] += change
+
+    #Count the patches of a land use class within a radius (distance < radius)
+    #of a position. landuse_class = None counts all the patches with a land use (> 0)
+    def count_within(self, pos, radius, landuse_class=None):
+        key = (landuse_class, radius)
+        if key not in self.count_maps:
+            self.count_maps[key] = self.calculate_count_map(landuse_class, radius)
+        return int(self.count_maps[key][pos])
+
+    #Define whether a land use belongs to a class
+    @staticmethod
+    def in_class(landuse, landuse_class):
+        if landuse_class == None:
+            return landuse > 0
+        return landuse == landuse_class
+
+    #Get the half width of each row of a disk (rows dx with dx*dx + dy*dy < radius*radius)
+    @staticmethod
+    def disk_rows(radius):
+        rows = []
+        for dx in range(-radius, radius + 1):
+            half_width = int(np.ceil(np.sqrt(radius * radius - dx * dx))) - 1
+            if half_width >= 0:
+                rows.append((dx, half_width))
+        return rows
+
+    #Get the rows of a disk on the grid as (dx, lowest dy, highest dy). With torus
+    #the rows that wrap onto the same column are kept once (the widest one) and a
+    #row that wraps onto itself covers the column once
+    def disk_spans(self, radius):
+        if not self.torus:
+            return [(dx, -half_width, half_width) for dx, half_width in self.disk_rows(radius)]
+        width, height = self.landuse.shape
+        columns = {}
+        for dx, half_width in self.disk_rows(radius):
+            columns[dx % width] = max(half_width, columns.get(dx % width, -1))
+        spans = []
+        for dx, half_width in columns.items():
+            low = -half_width
+            high = min(half_width, low + height - 1)
+            spans.append((dx, low, high))
+        return spans
+
+    #Get the cells of the grid within a radius of a position
+    def disk_cells(self, pos, radius):
+        x, y = pos
+        width, height = self.landuse.shape
+        xs, ys = [], []
+        for dx, low, high in self.disk_spans(radius):
+            if self.torus:
+                ys.append((y + np.arange(low, high + 1)) % height)
+                xs.append(np.full(high - low + 1, (x + dx) % width))
+                continue
+            if (x + dx < 0) or (x + dx >= width):
+                continue
+            y_min = max(y + low, 0)
+            y_max = min(y + high, height - 1)
+            xs.append(np.full(y_max - y_min + 1, x + dx))
+            ys.append(np.arange(y_min, y_max + 1))
+        return np.concatenate(xs), np.concatenate(ys)
+
+    #Calculate for every cell the number of patches of a class within a radius
+    def calculate_count_map(self, landuse_class, radius):
+        width, height = self.landuse.shape
+        mask = self.in_class(np.asarray(self.landuse), landuse_class).astype(np.int32)
+        count_map = np.zeros((width, height), dtype=np.int32)
+        if self.torus:
+            # prefix sums along y of three copies of the grid, so a row that wraps
+            # around the borders is one difference of the prefix sums
+            prefix = np.zeros((width, 3 * height + 1), dtype=np.int32)
+            prefix[:, 1:] = np.cumsum(np.tile(mask, (1, 3)), axis=1)
+            y = np.arange(height) + height
+            for dx, low, high in self.disk_spans(radius):
+                rows = prefix[(np.arange(width) + dx) % width]
+                count_map += rows[:, y + high + 1] - rows[:, y + low]
+            return count_map
+        # prefix sums along y, padded with the radius so the disk never leaves the array
+        padded = np.zeros((width + 2 * radius, height + 2 * radius + 1), dtype=np.int32)
+        padded[radius:radius + width, radius + 1:radius + height + 1] = mask
+        prefix = np.cumsum(padded, axis=1)
+        y = np.arange(height) + radius
+        for dx, low, high in self.disk_spans(radius):
+            rows = prefix[radius + dx:radius + dx + width]
+            count_map += rows[:, y + high + 1] - rows[:, y + low]
+        return count_map
@@ -0,0 +1,231 @@
+"""
+REPLICATION OF THE ABM MODEL
+An empirical ABM for regional land use/cover change:
+a Dutch case study (version 1.0.0)
+Quyen Nguyen | 16 December 2019
+THE MODEL INCLUDE FIVE COMPONENTS
+1. Agents: The module defines the characteristics and actions of the environment
+(Field Patch) and the farmers (Farmer)
+2. Schedule: The moduel defines the order that the model runs in cases there are
+several agent breeds. There are 2 breeds in the base model (Farmer and Field Patch).
+The Farmer can make decision, the Field Patch is static and only change after their
+respective owning Farmer makes decision
+3. SimpleModel: The module defines the inital states and the steps that all farmers
+makes during the time t
+4. Server: The module defines the visualization of the model
+5. Analysis: The module shows the analysis of the model
+##########################
+#         MARKET         #
+##########################
+"""
+##########################
+# IMPORT GENERIC LIBRARY #
+##########################
+import numpy as np
+from collections import defaultdict
+
+##########################
+# CREATE BUYER REGISTRY  #
+##########################
+#Define the registry of the farmers that want to buy land
+class BuyerRegistry():
+    ''' This is the registry of the farmers that are in the "buy" state
+    (agent_expansion == "buy"). The buyers are kept in square buckets of the
+    grid, so a seller only looks at the buckets around its own position to
+    find the nearest buyers instead of sorting all the buyers.
+    The distance is the same as the one of the distance service of the model
+    (Distances.DistanceService): euclidean, and with torus=True it wraps
+    around the borders of the grid.
+        Args:
+            width, height: the size of the grid
+            torus: whether the distance wraps around the borders of the grid
+            bucket_size: the size (in patches) of the side of a bucket'''
+    def __init__(self, width, height, torus=False, bucket_size=10):
+        self.width = width
+        self.height = height
+        self.torus = torus
+        self.bucket_size = bucket_size
+        self.buckets_x = int(np.ceil(width / bucket_size))
+        self.buckets_y = int(np.ceil(height / bucket_size))
+        self.buckets = defaultdict(dict)   # bucket -> buyers in that bucket
+        self.bucket_of = {}                # buyer -> bucket
+
+    #Number of buyers
+    def __len__(self):
+        return len(self.bucket_of)
+
+    #Check whether a farmer is a buyer
+    def __contains__(self, buyer):
+        return buyer in self.bucket_of
+
+    #Iterate over the buyers
+    def __iter__(self):
+        return iter(self.bucket_of)
+
+    #Add a buyer
+    def add(self, buyer):
+        if buyer in self.bucket_of:
+            return
+        bucket = self.find_bucket(buyer.pos)
+        self.buckets[bucket][buyer] = None
+        self.bucket_of[buyer] = bucket
+
+    #Remove a buyer (if it is registered)
+    def remove(self, buyer):
+        bucket = self.bucket_of.pop(buyer, None)
+        if bucket is None:
+            return
+        del self.buckets[bucket][buyer]
+        if not self.buckets[bucket]:
+            del self.buckets[bucket]
+
+    #Find the bucket of a position
+    def find_bucket(self, pos):
+        x, y = pos
+        return (int(x) // self.bucket_size, int(y) // self.bucket_size)
+
+    #Get the distance between two positions
+    def calculate_distance(self, pos_1, pos_2):
+        dx = abs(pos_1[0] - pos_2[0])
+        dy = abs(pos_1[1] - pos_2[1])
+        if self.torus:
+            dx = min(dx, self.width - dx)
+            dy = min(dy, self.height - dy)
+        return np.sqrt(dx * dx + dy * dy)
+
+    #Get the buckets that are exactly `ring` buckets away from a bucket
+    #(wrapped around the borders of the grid with torus, clipped without)
+    def find_ring(self, bucket, ring):
+        bx, by = bucket
+        ring_buckets = set()
+        for i in range(-ring, ring + 1):
+            for j in range(-ring, ring + 1):
+                if max(abs(i), abs(j)) != ring:
+                    continue
+                if self.torus:
+                    ring_buckets.add(((bx + i) % self.buckets_x, (by + j) % self.buckets_y))
+                elif (0 <= bx + i < self.buckets_x) and (0 <= by + j < self.buckets_y):
+                    ring_buckets.add((bx + i, by + j))
+        return ring_buckets
+
+    #Get the nearest buyers of a position as a list of (distance, buyer),
+    #sorted by distance. k limits the number of buyers, radius the distance.
+    def find_nearest(self, pos, k=None, radius=None):
+        if not self.bucket_of:
+            return []
+        start = self.find_bucket(pos)
+        if self.torus:
+            last_ring = max(self.buckets_x, self.buckets_y) // 2 + 1
+        else:
+            last_ring = max(self.buckets_x, self.buckets_y)
+        visited = set()
+        candidates = []
+        for ring in range(last_ring + 1):
+            for bucket in self.find_ring(start, ring) - visited:
+                visited.add(bucket)
+                for buyer in self.buckets.get(bucket, ()):
+                    distance = self.calculate_distance(pos, buyer.pos)
+                    if (radius is None) or (distance < radius):
+                        candidates.append((distance, buyer.unique_id, buyer))
+            # Buyers outside the visited rings are at least (ring - 1) buckets away
+            bound = (ring - 1) * self.bucket_size
+            if (radius is not None) and (bound >= radius):
+                break
+            if (k is not None) and (len(candidates) >= k):
+                candidates.sort(key=lambda candidate: candidate[:2])
+                if candidates[k - 1][0] <= bound:
+                    break
+        candidates.sort(key=lambda candidate: candidate[:2])
+        if k is not None:
+            candidates = candidates[:k]
+        return [(distance, buyer) for distance, unique_id, buyer in candidates]
+
+##########################
+# CREATE LAND MARKET     #
+##########################
+#Define the land market that clears all the offers of a step at once
+class LandMarket():
+    ''' This is the batched land market of the model. During the step the
+    farmers only offer the fields they sell; after all the farmers have
+    stepped, the offers are cleared in one pass in the order of the sellers
+    (unique_id), so the result does not depend on the activation order. Each
+    offer goes to the closest buyer (k=1) or, for a whole farm (k>1), to the
+    buyer with the highest weight_buy among the k nearest buyers (weight_size,
+    weight_distance, weight_type, weight_random, as in the sale of a farm in
+    Farmer.farm_cessation_action). The buyers are found with the buyer
+    registry of the model, and the ownership changes are applied together,
+    then the farm of each seller and buyer is updated once.
+        Args:
+            model: the model of the market'''
+    def __init__(self, model):
+        self.model = model
+        self.offers = []   # (seller, positions of the fields, number of nearest buyers)
+
+    #Number of offers that are not cleared yet
+    def __len__(self):
+        return len(self.offers)
+
+    #Offer fields of a seller (FieldPatch objects) to the k nearest buyers
+    def offer(self, seller, fields, k=1):
+        self.offers.append((seller, [field.pos for field in fields], k))
+
+    #Select the buyer of an offer, None if there is no buyer
+    def select_buyer(self, seller, k):
+        nearest = self.model.buyers.find_nearest(seller.pos, k=k)
+        if self.model.profiler is not None:
+            self.model.profiler.count('buyers_evaluated', len(nearest))
+        for distance, buyer in nearest:
+            buyer.distance_self = distance
+        if nearest == []:
+            return None
+        if k == 1:
+            return nearest[0][1]
+        buyers = []
+        for distance, buyer in nearest:
+            # the variables to select the buyer are calculated
+            buyer.weight_random = self.model.rng_market.uniform(0, 1)
+            buyer.weight_size = 0.1 if buyer.agent_farm_size > seller.agent_farm_size else 0
+            buyer.weight_distance = 0.1 if distance < 20 else 0
+            buyer.weight_type = 0.1 if buyer.agent_type > 3 else 0
+            buyer.weight_buy = (buyer.weight_size + buyer.weight_distance \
+                                + buyer.weight_type + buyer.weight_random)
+            buyers.append(buyer)
+        # the nearest buyer wins a tie (stable sort)
+        buyers.sort(key=lambda buyer: buyer.weight_buy, reverse=True)
+        return buyers[0]
+
+    #Clear all the offers of the step and return the transactions
+    #(seller, buyer, positions)
+    def clear(self):
+        model = self.model
+        fields = model.fields
+        offers = sorted(self.offers, key=lambda offer: offer[0].unique_id)
+        self.offers = []
+        transfers = {}      # position -> buyer
+        transactions = []
+        for seller, positions, k in offers:
+            # fields that the seller does not own anymore are not sold
+            positions = [pos for pos in positions if (pos not in transfers) and \
+                         (fields.field_owner_id[pos] == seller.agent_id)]
+            if positions == []:
+                continue
+            buyer = self.select_buyer(seller, k)
+            if buyer is None:
+                continue
+            for pos in positions:
+                transfers[pos] = buyer
+            # the buyer leaves the registry, as after a sale in the step
+            buyer.agent_expansion = "bought"
+            transactions.append((seller, buyer, positions))
+        # Land transactions
+        for pos, buyer in transfers.items():
+            fields.get_patch(pos).field_owner_id = buyer.agent_id
+        # Update the farms of the sellers and the buyers (once each)
+        for farmer in dict.fromkeys(farmer for seller, buyer, positions in transactions \
+                                    for farmer in (seller, buyer)):
+            farmer.update_agent_farm()
+        # Those agent without any other field will quit
+        for seller in dict.fromkeys(seller for seller, buyer, positions in transactions):
+            if model.ownership.get_patch_count(seller.agent_id) == 0:
+                model.remove_farmer(seller)
+        return transactions
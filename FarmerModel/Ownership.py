@@ -0,0 +1,174 @@
+"""
+REPLICATION OF THE ABM MODEL
+An empirical ABM for regional land use/cover change:
+a Dutch case study (version 1.0.0)
+Quyen Nguyen | 16 December 2019
+THE MODEL INCLUDE FIVE COMPONENTS
+1. Agents: The module defines the characteristics and actions of the environment
+(Field Patch) and the farmers (Farmer)
+2. Schedule: The moduel defines the order that the model runs in cases there are
+several agent breeds. There are 2 breeds in the base model (Farmer and Field Patch).
+The Farmer can make decision, the Field Patch is static and only change after their
+respective owning Farmer makes decision
+3. SimpleModel: The module defines the inital states and the steps that all farmers
+makes during the time t
+4. Server: The module defines the visualization of the model
+5. Analysis: The module shows the analysis of the model
+##########################
+#        OWNERSHIP       #
+##########################
+"""
+##########################
+# IMPORT GENERIC LIBRARY #
+##########################
+import numpy as np
+from collections import defaultdict
+from itertools import islice
+
+##########################
+# CREATE OWNERSHIP INDEX #
+##########################
+#Define the index that links the field patches with their owners
+class OwnershipIndex():
+    ''' This is the index that keeps track of which field patches belong to
+    which owner (owner_id -> patches) and which owner each field patch belongs
+    to (patch -> owner_id, the field_owner_id column of the field store).
+    A land transaction only changes the field_owner_id of a patch, so the index
+    is updated in O(1) every time it changes instead of scanning all the field
+    patches to rebuild the farm of an agent. Patches are kept by their cell
+    number x * height + y (in the order of the grid), which is cheaper to
+    build and to save than a position (x, y) per patch.
+    Only the owned patches (farmers and nature) are kept in the index, the
+    patches without an owner (-1) are only in the field store.
+    The positions and the patches of an owner in the order of the grid are
+    kept once they are asked, until the patches of that owner change. The
+    lists are shared by the callers, so they must not be changed.
+        Args:
+            schedule: the schedule of the model that holds the owners
+            owner_breed: the agent breed of the owners (Farmer)
+            fields: the field store of the model
+            profiler: the profiler of the model (None without profiling)'''
+    def __init__(self, schedule, owner_breed, fields, profiler=None):
+        self.schedule = schedule
+        self.owner_breed = owner_breed
+        self.fields = fields
+        self.profiler = profiler
+        self.patches_by_owner = defaultdict(dict)   # owner_id -> cells of the patches of that owner
+        self.size_by_owner = defaultdict(float)     # owner_id -> total field size of that owner
+        self.positions_by_owner = {}                # owner_id -> positions of the patches in the order of the grid
+        self.views_by_owner = {}                    # owner_id -> patches in the order of the grid
+
+    #Build the index from the field store with a single group by owner
+    def build(self):
+        fields = self.fields
+        rows = np.flatnonzero(fields.field_owner_id.values != -1)
+        owners = fields.field_owner_id.values[rows]
+        rows, owners = rows[np.argsort(owners, kind='stable')], np.sort(owners, kind='stable')
+        starts = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]])[:len(owners)]
+        counts = np.diff(np.r_[starts, len(owners)])
+        sizes = np.add.reduceat(fields.field_size.values[rows], starts)
+        self.set_groups(owners[starts], counts, fields.cells[rows], sizes)
+
+    #Fill the index with groups of patches: owners[i] owns the next counts[i]
+    #cells and has the total field size sizes[i]
+    def set_groups(self, owners, counts, cells, sizes):
+        self.patches_by_owner.clear()
+        self.size_by_owner.clear()
+        self.positions_by_owner.clear()
+        self.views_by_owner.clear()
+        cells = iter(cells.tolist())
+        for owner_id, count, size in zip(owners.tolist(), counts.tolist(), sizes.tolist()):
+            self.patches_by_owner[owner_id] = dict.fromkeys(islice(cells, count))
+            self.size_by_owner[owner_id] = float(size)
+
+    #Get the groups of patches of the index as they are given to set_groups
+    #(e.g. to save them in a checkpoint)
+    def get_groups(self):
+        owners = np.array(list(self.patches_by_owner), dtype=np.int64)
+        counts = np.array([len(cells) for cells in self.patches_by_owner.values()], dtype=np.int64)
+        cells = np.fromiter((cell for cells in self.patches_by_owner.values() for cell in cells), \
+                            dtype=np.int64, count=int(counts.sum()))
+        sizes = np.array([self.size_by_owner[owner_id] for owner_id in owners.tolist()], dtype=np.float64)
+        return owners, counts, cells, sizes
+
+    #Get the cell number of a position
+    def get_cell(self, pos):
+        return pos[0] * self.fields.height + pos[1]
+
+    #Register a patch with the owner written in the field store
+    def add(self, pos):
+        owner_id = int(self.fields.field_owner_id[pos])
+        if owner_id == -1:
+            return
+        self.clear_views(owner_id)
+        self.patches_by_owner[owner_id][self.get_cell(pos)] = None
+        self.size_by_owner[owner_id] += self.fields.field_size[pos]
+
+    #Unregister a patch from its current owner
+    def remove(self, pos):
+        owner_id = int(self.fields.field_owner_id[pos])
+        if owner_id == -1:
+            return
+        self.clear_views(owner_id)
+        del self.patches_by_owner[owner_id][self.get_cell(pos)]
+        self.size_by_owner[owner_id] -= self.fields.field_size[pos]
+        if not self.patches_by_owner[owner_id]:
+            del self.patches_by_owner[owner_id]
+            del self.size_by_owner[owner_id]
+
+    #Drop the positions and the patches kept for an owner
+    def clear_views(self, owner_id):
+        self.positions_by_owner.pop(owner_id, None)
+        self.views_by_owner.pop(owner_id, None)
+
+    #Move a patch to its new owner
+    def transfer(self, pos, owner_id):
+        if (owner_id == None):
+            owner_id = -1
+        if self.fields.field_owner_id[pos] == owner_id:
+            return
+        if self.profiler is not None:
+            self.profiler.count('transactions')
+        self.remove(pos)
+        self.fields.field_owner_id[pos] = owner_id
+        self.add(pos)
+
+    #Get the list of patches of an owner in the same order as the grid
+    def get_patches(self, owner_id):
+        if owner_id not in self.patches_by_owner:
+            return []
+        if self.profiler is not None:
+            self.profiler.count('patches_scanned', len(self.patches_by_owner[owner_id]))
+        patches = self.views_by_owner.get(owner_id)
+        if patches is None:
+            patches = [self.fields.get_patch(pos) for pos in self.get_positions(owner_id)]
+            self.views_by_owner[owner_id] = patches
+        return patches
+
+    #Get the positions of the patches of an owner in the same order as the grid
+    def get_positions(self, owner_id):
+        if owner_id not in self.patches_by_owner:
+            return []
+        positions = self.positions_by_owner.get(owner_id)
+        if positions is None:
+            height = self.fields.height
+            positions = [divmod(cell, height) for cell in sorted(self.patches_by_owner[owner_id])]
+            self.positions_by_owner[owner_id] = positions
+        return positions
+
+    #Count the number of patches of an owner
+    def get_patch_count(self, owner_id):
+        if owner_id not in self.patches_by_owner:
+            return 0
+        return len(self.patches_by_owner[owner_id])
+
+    #Get the total size of the patches of an owner (e.g. 9999 for nature)
+    def get_size(self, owner_id):
+        return self.size_by_owner.get(owner_id, 0)
+
+    #Get the farmer that owns a patch, None if the owner is not an active farmer
+    def get_owner(self, pos):
+        owner_id = self.fields.field_owner_id[pos]
+        if (owner_id == -1):
+            return None
+        return self.schedule.agents_by_breed[self.owner_breed].get(owner_id)
@@ -0,0 +1,91 @@
+"""
+REPLICATION OF THE ABM MODEL
+An empirical ABM for regional land use/cover change:
+a Dutch case study (version 1.0.0)
+Quyen Nguyen | 16 December 2019
+THE MODEL INCLUDE FIVE COMPONENTS
+1. Agents: The module defines the characteristics and actions of the environment
+(Field Patch) and the farmers (Farmer)
+2. Schedule: The moduel defines the order that the model runs in cases there are
+several agent breeds. There are 2 breeds in the base model (Farmer and Field Patch).
+The Farmer can make decision, the Field Patch is static and only change after their
+respective owning Farmer makes decision
+3. SimpleModel: The module defines the inital states and the steps that all farmers
+makes during the time t
+4. Server: The module defines the visualization of the model
+5. Analysis: The module shows the analysis of the model
+##########################
+#       PROFILING        #
+##########################
+"""
+##########################
+# IMPORT GENERIC LIBRARY #
+##########################
+import time
+
+#Phases of the step of the farmers, timed by the profiler
+PHASES = ('schedule',     # activation order, random draws and the schedule between two farmers
+          'feedback',     # feedback of the internal actions and decisions
+          'cessation',    # farm cessation (option, decision, action with the land sales)
+          'expansion',    # farm expansion (option, decision, action with the buyer search)
+          'protection',   # protection of the landscape elements
+          'update',       # update of the farmers and of their transactions
+          'market')       # clearing of the batched land market
+#Counters of the step
+COUNTERS = ('patches_scanned',    # field patches read from the ownership index
+            'buyers_evaluated',   # buyers found by the searches of the sellers
+            'transactions',       # field patches that changed owner
+            'farmers_removed')    # farmers that left the model
+
+##########################
+# CREATE STEP PROFILER   #
+##########################
+#Define the timers and counters of the phases of the step of a model
+class StepProfiler():
+    ''' This is the profiler of the steps of a model (FarmerModel(profile=True)).
+    The step of the farmers (Farmer.step or the array engine) marks the end
+    of each phase with lap(phase): the time since the previous lap is added
+    to that phase, so the phases add up to the step. The counters are
+    incremented where the work is done (ownership index, buyer search, land
+    market, removal of the farmers). The timers and counters are set to 0 at
+    the start of each step and collected with the results of the model
+    (time_<phase> in seconds, time_step and the counters): as the results,
+    they are collected at the start of the next step. Without profiling
+    the profiler of the model is None and the steps only check that.'''
+    def __init__(self):
+        self.timings = dict.fromkeys(PHASES, 0.0)
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.step_time = 0.0
+        self.start = self.last = time.perf_counter()
+
+    #Set the timers and counters to 0 at the start of a step
+    def start_step(self):
+        for phase in PHASES:
+            self.timings[phase] = 0.0
+        for name in COUNTERS:
+            self.counters[name] = 0
+        self.start = self.last = time.perf_counter()
+
+    #Add the time since the previous lap to a phase
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.timings[phase] += now - self.last
+        self.last = now
+
+    #End of a step: the rest of the step is part of the schedule
+    def end_step(self):
+        self.lap('schedule')
+        self.step_time = self.last - self.start
+
+    #Add to a counter of the step
+    def count(self, name, number=1):
+        self.counters[name] += number
+
+    #Reporters of the collector of the model (result name -> function(model))
+    def get_reporters(self):
+        reporters = {'time_' + phase: (lambda model, phase=phase: model.profiler.timings[phase]) \
+                     for phase in PHASES}
+        reporters['time_step'] = lambda model: model.profiler.step_time
+        for name in COUNTERS:
+            reporters[name] = lambda model, name=name: model.profiler.counters[name]
+        return reporters
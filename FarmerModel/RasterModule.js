@@ -0,0 +1,94 @@
+// Canvas of the fields (one pixel per cell, scaled) and the farmers of FarmerModel,
+// drawn from the frames of Visualization.RasterCanvas
+var RasterModule = function(canvas_width, canvas_height, field_colors, farmer_colors) {
+	// Create the element
+	var canvas = $(`<canvas width="${canvas_width}" height="${canvas_height}" class="world-grid"/>`)[0];
+	$("#elements").append(canvas);
+	var context = canvas.getContext("2d");
+	// Raster of the fields, one pixel per cell
+	var buffer = document.createElement("canvas");
+	var bufferContext = buffer.getContext("2d");
+	var image = null;
+	var cells = null;
+	var width = 0;
+	var height = 0;
+
+	// Colors as [r, g, b]
+	var toRGB = function(color) {
+		return [1, 3, 5].map(function(i) { return parseInt(color.substr(i, 2), 16); });
+	};
+	var palette = field_colors.map(toRGB);
+
+	// Decode base64 text into bytes
+	var decode = function(text) {
+		var binary = atob(text);
+		var bytes = new Uint8Array(binary.length);
+		for (var i = 0; i < binary.length; i++)
+			bytes[i] = binary.charCodeAt(i);
+		return bytes;
+	};
+
+	// Write the color of a cell (index x * height + y, y = 0 at the bottom)
+	var setPixel = function(i) {
+		var x = Math.floor(i / height);
+		var y = i % height;
+		var p = ((height - y - 1) * width + x) * 4;
+		var color = palette[cells[i]];
+		if (color === undefined) {
+			image.data[p + 3] = 0;
+			return;
+		}
+		image.data[p] = color[0];
+		image.data[p + 1] = color[1];
+		image.data[p + 2] = color[2];
+		image.data[p + 3] = 255;
+	};
+
+	this.render = function(frame) {
+		if (frame.full) {
+			// the canvas follows the size of the grid of the model
+			width = frame.width;
+			height = frame.height;
+			var cell = Math.max(1, Math.floor(Math.min(canvas_width / width, canvas_height / height)));
+			canvas.width = cell * width;
+			canvas.height = cell * height;
+			buffer.width = width;
+			buffer.height = height;
+			image = bufferContext.createImageData(width, height);
+			cells = decode(frame.cells);
+			for (var i = 0; i < cells.length; i++)
+				setPixel(i);
+		} else {
+			// a delta frame without a full frame before it cannot be drawn
+			if (cells === null)
+				return;
+			var index = new Uint32Array(decode(frame.index).buffer);
+			var values = decode(frame.values);
+			for (var k = 0; k < index.length; k++) {
+				cells[index[k]] = values[k];
+				setPixel(index[k]);
+			}
+		}
+		bufferContext.putImageData(image, 0, 0);
+		context.imageSmoothingEnabled = false;
+		context.clearRect(0, 0, canvas.width, canvas.height);
+		context.drawImage(buffer, 0, 0, canvas.width, canvas.height);
+
+		// Farmers (x, y, agent_type) on top of the fields
+		var cellWidth = canvas.width / width;
+		var cellHeight = canvas.height / height;
+		var farmers = frame.farmers;
+		for (var j = 0; j < farmers.length; j += 3) {
+			context.beginPath();
+			context.arc((farmers[j] + 0.5) * cellWidth, (height - farmers[j + 1] - 0.5) * cellHeight,
+						0.5 * Math.min(cellWidth, cellHeight), 0, 2 * Math.PI);
+			context.fillStyle = farmer_colors[farmers[j + 2] - 1] || "gray";
+			context.fill();
+		}
+	};
+
+	this.reset = function() {
+		cells = null;
+		context.clearRect(0, 0, canvas.width, canvas.height);
+	};
+};
@@ -0,0 +1,135 @@
+"""
+REPLICATION OF THE ABM MODEL
+An empirical ABM for regional land use/cover change:
+a Dutch case study (version 1.0.0)
+Quyen Nguyen | 16 December 2019
+THE MODEL INCLUDE FIVE COMPONENTS
+1. Agents: The module defines the characteristics and actions of the environment
+(Field Patch) and the farmers (Farmer)
+2. Schedule: The moduel defines the order that the model runs in cases there are
+several agent breeds. There are 2 breeds in the base model (Farmer and Field Patch).
+The Farmer can make decision, the Field Patch is static and only change after their
+respective owning Farmer makes decision
+3. SimpleModel: The module defines the inital states and the steps that all farmers
+makes during the time t
+4. Server: The module defines the visualization of the model
+5. Analysis: The module shows the analysis of the model
+##########################
+#        REPORTING       #
+##########################
+"""
+##########################
+# IMPORT GENERIC LIBRARY #
+##########################
+import json
+import sys
+
+##########################
+# CREATE REPORTERS       #
+##########################
+#Define the reporter of the progress of the model, it writes the results
+#collected by the data collector every `interval` steps
+class ProgressReporter():
+    ''' Base class of the progress reporters. The model calls report() after
+    the initial results and after every step; the reporter only formats the
+    results (the last row of the collector) every `interval` steps.
+        Args:
+            interval: number of steps between two reports
+            stream: where the lines are written (standard output by default)'''
+    def __init__(self, interval=1, stream=None):
+        self.interval = interval
+        self.stream = stream
+
+    #Report the last results of the model if it is time to do it
+    def report(self, model):
+        step = model.datacollector.steps - 1
+        if step % self.interval == 0:
+            values = model.datacollector.get_values()[-1]
+            self.emit(step, model.datacollector.names, values)
+
+    #Write a message of the model (e.g. the model is created)
+    def message(self, text):
+        pass
+
+    #Write the results of a step
+    def emit(self, step, names, values):
+        pass
+
+    #Write out what the reporter keeps in memory (at the end of a run)
+    def flush(self):
+        pass
+
+    #Close the reporter, the one who created it closes it when it is done
+    def close(self):
+        pass
+
+    #The reporter can be used in a with statement that closes it
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, line):
+        stream = self.stream if self.stream is not None else sys.stdout
+        stream.write(line + '\n')
+
+#Define the reporter that writes nothing
+class SilentReporter(ProgressReporter):
+    ''' Reporter that writes nothing (the model does not call it at all)'''
+
+#Define the reporter that writes one summary line per report
+class SummaryReporter(ProgressReporter):
+    ''' Reporter that writes one line with all the results of a step'''
+    def message(self, text):
+        self.write(text)
+
+    def emit(self, step, names, values):
+        self.write('Step %d | ' % step + ' | '.join('%s %.4g' % (name, value) \
+                                                  for name, value in zip(names, values)))
+
+#Define the reporter that writes one line per result
+class DetailReporter(ProgressReporter):
+    ''' Reporter that writes one line per result of a step'''
+    def message(self, text):
+        self.write(text)
+
+    def emit(self, step, names, values):
+        self.write('')
+        self.write('Step count %d' % step)
+        for name, value in zip(names, values):
+            self.write('This step %s %s' % (name, value))
+
+#Define the reporter that writes the results into a JSON-lines file
+class JsonLinesReporter(ProgressReporter):
+    ''' Reporter that writes one JSON object per report into a file. The file
+    is flushed at the end of every run of the model but stays open, close the
+    reporter (or use it in a with statement) once all the runs are done.
+        Args:
+            path: the JSON-lines file
+            interval: number of steps between two reports'''
+    def __init__(self, path, interval=1):
+        super().__init__(interval)
+        self.file = open(path, 'a', buffering=1)
+
+    def emit(self, step, names, values):
+        record = {'step': step}
+        for name, value in zip(names, values):
+            # NaN (e.g. mean farm size of a type without farmers) is written as null
+            record[name] = None if value != value else float(value)
+        self.file.write(json.dumps(record) + '\n')
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+#Create the reporter of a verbosity level:
+#0 (False) silent, 1 (True) summary line, 2 one line per result
+def create_reporter(verbose, interval=1):
+    if (verbose is False) or (verbose is None) or (verbose == 0):
+        return SilentReporter(interval)
+    if (verbose is True) or (verbose == 1):
+        return SummaryReporter(interval)
+    return DetailReporter(interval)
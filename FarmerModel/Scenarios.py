@@ -0,0 +1,114 @@
+"""
+REPLICATION OF THE ABM MODEL
+An empirical ABM for regional land use/cover change:
+a Dutch case study (version 1.0.0)
+Quyen Nguyen | 16 December 2019
+THE MODEL INCLUDE FIVE COMPONENTS
+1. Agents: The module defines the characteristics and actions of the environment
+(Field Patch) and the farmers (Farmer)
+2. Schedule: The moduel defines the order that the model runs in cases there are
+several agent breeds. There are 2 breeds in the base model (Farmer and Field Patch).
+The Farmer can make decision, the Field Patch is static and only change after their
+respective owning Farmer makes decision
+3. SimpleModel: The module defines the inital states and the steps that all farmers
+makes during the time t
+4. Server: The module defines the visualization of the model
+5. Analysis: The module shows the analysis of the model
+##########################
+#    SCENARIO TABLES     #
+##########################
+"""
+##########################
+# IMPORT GENERIC LIBRARY #
+##########################
+import json
+import os
+from functools import lru_cache
+import numpy as np
+
+#File of the scenarios of the model
+SCENARIO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scenarios.json')
+
+#Read a scenario file once per process (the tables are not changed by the models)
+@lru_cache(maxsize=None)
+def load_scenarios(path=SCENARIO_PATH):
+    with open(path) as file:
+        return ScenarioTables(json.load(file))
+
+##########################
+# CREATE SCENARIO TABLES #
+##########################
+#Define the constants of the scenarios as arrays
+class ScenarioTables():
+    ''' This is the set of constants of the agent types and the scenarios,
+    read from a declarative file (scenarios.json) and compiled into arrays
+    indexed by scenario, agent_type and agent_business_type, so a farmer (or
+    the array engine, for all the farmers at once) looks them up instead of
+    comparing the name of the scenario. A value null (or a type that is not
+    listed and no "default") is not set by the scenario, as in the original
+    if-chains; it is NaN in the arrays. A new scenario only needs a new entry
+    in the file.
+        Args:
+            data: the content of the scenario file'''
+    type_names = ('p_expand_type', 'p_shrink_type', 'p_stop_type', 'p_protect_type')
+    def __init__(self, data):
+        agent_types = {int(agent_type): values for agent_type, values in data['agent_types'].items()}
+        self.names = list(data['scenarios'])
+        self.index = {name: i for i, name in enumerate(self.names)}
+        scenarios = [data['scenarios'][name] for name in self.names]
+        #Probabilities of the agent types, one row per agent_type
+        self.type_probabilities = np.full((max(agent_types) + 1, len(self.type_names)), np.nan)
+        for agent_type, values in agent_types.items():
+            self.type_probabilities[agent_type] = [values[name] for name in self.type_names]
+        #Constants of the scenarios, one value per scenario
+        self.index_growth = self.get_column(scenarios, 'index_growth')
+        self.index_stop_year = self.get_column(scenarios, 'index_stop_year')
+        self.exogenous_stop = self.get_column(scenarios, 'p_exogenous_stop')
+        self.scenario_ehs = self.get_column(scenarios, 'p_scenario_ehs')
+        #Constants per scenario and type, with the value of the types that are not listed
+        self.business_stop, self.business_stop_default = self.get_table(scenarios, 'p_business_stop')
+        self.exogenous_expand, self.exogenous_expand_default = self.get_table(scenarios, 'p_exogenous_expand')
+
+    #Values of a constant in all the scenarios (NaN if null)
+    @staticmethod
+    def get_column(scenarios, name):
+        return np.array([np.nan if scenario.get(name) is None else scenario[name] \
+                         for scenario in scenarios], dtype=float)
+
+    #Values of a constant per scenario and type, and the default of each scenario
+    @staticmethod
+    def get_table(scenarios, name):
+        values = [scenario.get(name) or {} for scenario in scenarios]
+        types = [int(key) for value in values for key in value if key != 'default']
+        table = np.full((len(scenarios), max(types, default=0) + 1), np.nan)
+        default = np.full(len(scenarios), np.nan)
+        for i, value in enumerate(values):
+            if value.get('default') is not None:
+                default[i] = value['default']
+                table[i] = value['default']
+            for key, number in value.items():
+                if key != 'default' and number is not None:
+                    table[i, int(key)] = number
+        return table, default
+
+    #Index of a scenario in the tables
+    def get_scenario(self, name):
+        if name not in self.index:
+            raise ValueError('Unknown scenario %r, the scenarios are: %s' % (name, ', '.join(self.names)))
+        return self.index[name]
+
+    #Look up a table per type (types out of the table take the default)
+    @staticmethod
+    def lookup(table, default, scenario, types):
+        types = np.asarray(types)
+        known = (types >= 0) & (types < table.shape[1])
+        return np.where(known, table[scenario, np.where(known, types, 0)], default[scenario])
+
+    #Exogenous constants of the scenario for farmers (one value or one column each):
+    #p_exogenous_stop, p_business_stop, p_exogenous_expand, p_scenario_ehs
+    def get_exogenous(self, scenario, agent_types, business_types):
+        shape = np.broadcast(np.asarray(agent_types), np.asarray(business_types)).shape
+        return (np.full(shape, self.exogenous_stop[scenario]),
+                self.lookup(self.business_stop, self.business_stop_default, scenario, business_types),
+                self.lookup(self.exogenous_expand, self.exogenous_expand_default, scenario, agent_types),
+                np.full(shape, self.scenario_ehs[scenario]))
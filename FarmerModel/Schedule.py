@@ -49,12 +49,130 @@ path = 'C:\\Users\\User\\Desktop\\Quyen Nguyen\\Internship\\FarmerModel_Dutchcas
 
 sys.path.append(os.path.abspath(path))
 
+#Create the container of the agents of one breed 
+class BreedContainer():
+    ''' This is the container of the agents of one breed of the schedule. The
+    agents are kept in a dense NumPy array of references (grown by doubling)
+    with the position of each agent by unique_id, so an agent is removed by
+    moving the last agent into its place (swap-remove) and the activation
+    order is a permutation of the positions, shuffled in place with the
+    generator of the schedule, without building a list of keys every step.
+    During an activation the agents that move (swap-remove) are followed, so
+    the agents removed by the step of another agent are skipped.
+    It behaves as the dict unique_id -> agent that it replaces.
+        Args:
+            capacity: the initial size of the array'''
+    def __init__(self, capacity=16):
+        self.agents = np.empty(capacity, dtype=object)   # agents in positions [0, count)
+        self.positions = {}                               # unique_id -> position
+        self.order = np.arange(capacity)                  # buffer of the activation order
+        self._arange = np.arange(capacity)                # positions 0, 1, ..., capacity - 1
+        self.count = 0
+        self.moves = None      # during an activation: position in the order -> position (None removed)
+        self.origins = None    # during an activation: position -> position in the order
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, unique_id):
+        return unique_id in self.positions
+
+    def __iter__(self):
+        return iter(list(self.positions))
+
+    def __getitem__(self, unique_id):
+        return self.agents[self.positions[unique_id]]
+
+    def __setitem__(self, unique_id, agent):
+        if unique_id in self.positions:
+            self.agents[self.positions[unique_id]] = agent
+            return
+        if self.count == len(self.agents):
+            self.agents = np.concatenate((self.agents, np.empty(len(self.agents), dtype=object)))
+            self.order = np.arange(len(self.agents))
+            self._arange = np.arange(len(self.agents))
+        if self.moves is not None:
+            # an agent added during an activation is not in its order
+            self.origins[self.count] = None
+        self.agents[self.count] = agent
+        self.positions[unique_id] = self.count
+        self.count += 1
+
+    def __delitem__(self, unique_id):
+        position = self.positions.pop(unique_id)
+        last = self.count - 1
+        if self.moves is not None:
+            self.follow_removal(position, last)
+        if position != last:
+            # the last agent takes the place of the removed one
+            moved = self.agents[last]
+            self.agents[position] = moved
+            self.positions[moved.unique_id] = position
+        self.agents[last] = None
+        self.count = last
+
+    def get(self, unique_id, default=None):
+        position = self.positions.get(unique_id)
+        if position is None:
+            return default
+        return self.agents[position]
+
+    def keys(self):
+        return self.positions.keys()
+
+    def values(self):
+        return list(self.agents[:self.count])
+
+    def items(self):
+        return [(agent.unique_id, agent) for agent in self.values()]
+
+    #Positions of the agents in a random order (in-place permutation of the 
+    #buffer of the order with the generator rng)
+    def shuffle(self, rng):
+        order = self.order[:self.count]
+        order[:] = self._arange[:self.count]
+        rng.shuffle(order)
+        return order
+
+    #Snapshot of the agents in a random order
+    def shuffled(self, rng):
+        return self.agents[self.shuffle(rng)]
+
+    #Iterate over the agents in a random order, the agents removed during the
+    #iteration are skipped and the agents added are not activated
+    def activate(self, rng):
+        order = self.shuffle(rng).tolist()
+        self.moves, self.origins = {}, {}
+        try:
+            for position in order:
+                position = self.moves.get(position, position)
+                if position is not None:
+                    yield self.agents[position]
+        finally:
+            self.moves = self.origins = None
+
+    #Follow the removal of the agent of a position during an activation (the 
+    #last agent takes its place)
+    def follow_removal(self, position, last):
+        origin = self.origins.pop(position, position)
+        if origin is not None:
+            self.moves[origin] = None
+        if position != last:
+            origin = self.origins.pop(last, last)
+            self.origins[position] = origin
+            if origin is not None:
+                self.moves[origin] = position
+
 #Create Schedule 
 class RandomActivationByBreed(RandomActivation):
     #it is a scheduler that activate each type of agent once per step 
+    #The field patches are not agents of the schedule (they are views over 
+    #the field store, see Fields.py), so a step only activates the farmers 
     def __init__(self,model): 
         super().__init__(model)
-        self.agents_by_breed = defaultdict(dict)
+        self.agents_by_breed = defaultdict(BreedContainer)
+        # generator of the activation order (the schedule stream of the model)
+        self.rng = getattr(model, 'rng_schedule', None) or np.random.default_rng()
 
     #add agent 
     def add(self,agent): 
@@ -82,14 +200,17 @@ class RandomActivationByBreed(RandomActivation):
     def get_agents_by_breed(self, breed_class):
         return self.agents_by_breed[breed_class]
     
+    #get the agents of a breed in the order of activation of a step 
+    def get_activation_order(self, breed):
+        return self.agents_by_breed[breed].shuffled(self.rng)
+
     #shueffle order and run all agents of a given breed 
     def step_breed(self, breed): 
-        agent_keys = list(self.agents_by_breed[breed].keys())
-        self.model.random.shuffle(agent_keys)
-        for agent_key in agent_keys:
-            self.agents_by_breed[breed][agent_key].step()
+        # agents removed during the step are skipped 
+        for agent in self.agents_by_breed[breed].activate(self.rng):
+            agent.step()
             
     #count the number of agents within each breed 
     def get_breed_count(self, breed_class):
-        return len(self.agents_by_breed[breed_class].values())
+        return len(self.agents_by_breed[breed_class])
 
@@ -52,62 +52,19 @@ sys.path.append(os.path.abspath(path))
 from Agents import FieldPatch, Farmer
 from Schedule import RandomActivationByBreed
 from SimpleModel import FarmerModel
+from Visualization import RasterCanvas, PortrayalGrid
 
 ########################################################
 #  DEFINE VISUALIZATION COMPONENT                      #
 ########################################################
-def FarmerPotrayal(agent):
-    if agent is None:
-        return
-    portrayal = {}
-    if type(agent) is Farmer:
-        portrayal["Filled"]= "true"
-        portrayal["r"]= 0.5
-        portrayal["scale"] = 1
-        portrayal["Layer"]= 1
-        portrayal["Shape"]= 'circle'
-        if agent.agent_type ==1:
-            portrayal["Color"]=  "red"
-#            portrayal["text"] = 'hobby'
-#            portrayal["text_color"] = None
-        elif agent.agent_type ==2:
-            portrayal["Color"]=  "blue"
-#            portrayal["text"] = 'conventional'
-#            portrayal["text_color"] = None
-        elif agent.agent_type ==3:
-            portrayal["Color"]=  "black"
-#            portrayal["text"] = 'diversifier'
-#            portrayal["text_color"] = None
-        elif agent.agent_type ==4:
-            portrayal["Color"]=  "orange"
-#            portrayal["text"] = 'conventional expansionist'
-#            portrayal["text_color"] = None
-        elif agent.agent_type ==5:
-            portrayal["Color"]=  "gray"
-#            portrayal["text"] = 'diversifier expansionist'
-#            portrayal["text_color"] = None
-
-
-    elif type(agent) is FieldPatch:
-        if agent.field_le >0.5:
-            portrayal["Color"] = ["#00FF00", "#00CC00", "#009900"]
-        elif agent.field_le <=0.5:
-            portrayal["Color"] = ["#405c40", "#608960", "#89ac89"]
-        portrayal["Shape"] = "rect"
-        portrayal["Filled"] = "true"
-        portrayal["Layer"] = 0
-        portrayal["w"] = 1
-        portrayal["h"] = 1
-#        portrayal["text"] = agent.field_owner_id
-#        portrayal["text_color"] = 'white'
-
-
-    return portrayal
-
-########################################################
-#  DEFINE VISUALIZATION COMPONENT                      #
-########################################################
-canvas_element = CanvasGrid(FarmerPotrayal, 30,30, 500, 500)
+#The fields are drawn as a raster of the size of the model, only the cells 
+#that changed are sent at each step. With "python Server.py grid" the model is 
+#drawn on the CanvasGrid of Mesa (30 x 30 at most, as the sliders), one shape 
+#per agent from the portrayal cache (Visualization) 
+if 'grid' in sys.argv[1:]:
+    canvas_element = PortrayalGrid(30, 30, 500, 500)
+else:
+    canvas_element = RasterCanvas(500, 500)
 chart_element1 = ChartModule([{"Label": "percentage_agent_hobby", "Color": "red"},
                              {"Label": "percentage_agent_conventional", "Color": "blue"},
                              {"Label": "percentage_agent_diversifier", "Color": "black"},
@@ -30,7 +30,6 @@ from mesa import Agent, Model
 from mesa.time import RandomActivation 
 from mesa.space import MultiGrid
 from mesa.batchrunner import BatchRunner
-from mesa.datacollection import DataCollector
 from collections import defaultdict 
 from mesa.visualization.ModularVisualization import ModularServer 
 from mesa.visualization.modules import CanvasGrid, ChartModule
@@ -52,6 +51,22 @@ sys.path.append(os.path.abspath(path))
 
 from Agents import FieldPatch, Farmer
 from Schedule import RandomActivationByBreed
+from Ownership import OwnershipIndex
+from Landscape import LanduseRaster
+from Market import BuyerRegistry, LandMarket
+from Distances import DistanceService
+from Dataset import load_dataset
+from Fields import FieldStore, FieldGrid
+from Statistics import ModelStatistics, AGENT_TYPES
+from Collector import ColumnarCollector
+from Reporting import create_reporter, SilentReporter
+from Streams import RandomStreams, StepDraws
+from Transactions import TransactionHistory
+from Profiling import StepProfiler
+from Engine import ArrayEngine
+from Context import StepContext
+from Scenarios import load_scenarios, SCENARIO_PATH
+from Checkpoint import Checkpoint, save_checkpoint
 
 ##########################
 # CREATE FARMER MODEL    #
@@ -61,17 +76,43 @@ class FarmerModel(Model):
     '''
     Create a FARM LANDUSE MODEL with the given parameters.
         Args:
-            verbose: Define if needs to print out main results after each step
+            verbose: Define if needs to print out main results after each step. 
+            Verbosity level: 0 (False) nothing, 1 (True) one summary line, 
+            2 one line per result 
+            report_interval: number of steps between two reports of the results 
+            reporter: a reporter from Reporting (e.g. JsonLinesReporter) that 
+            replaces the one defined by verbose. The model flushes it at the end 
+            of run_model, the caller owns it and closes it (e.g. with statement) 
+            seed: the seed of the random generators of the model (a new random 
+            seed if None), the same seed gives the same run 
+            engine: 'object' steps the Farmer objects one by one, 'array' steps 
+            all the farmers at once with NumPy columns (see Engine) 
             fake_data: Define if the model will generate fake data from predefined 
             parameter. 
             real_data: If fake_data = False, the real data should be provided. It is 
             a vector that includes two datasets, 1st one is farmer data and 2nd one is 
             land use data. If fake_data, then this parameter is [None, None].
+            data_path: If fake_data = False only. The directory of a binary dataset 
+            made by Dataset.py from the real data, loaded memory-mapped instead 
+            of real_data 
             height: If fake_data =True only. Define the height of the entire area 
             width: If fake_data =True only. Define the width of the entire area 
             initial_farmers: If fake_data =True only. Define the number of the farmers
-            scenario: 4 scenarios: 'Base', 'Trend', 'A1', 'B2',
+            scenario: 4 scenarios: 'Basic', 'Trend', 'A1', 'B2' (or a scenario of scenario_file)
             index_growth: the baseline growth of the commodity price in the model 
+            check_statistics: Debug mode, compare the statistics kept up to date 
+            during the steps with a full recalculation at each step 
+            scenario_file: the file of the constants of the agent types and the 
+            scenarios (scenarios.json of the model if None) 
+            market: 'sequential' sells the fields during the step of each farmer, 
+            'batched' collects the offers and clears them after all the farmers 
+            (see Market.LandMarket) 
+            torus_distance: whether the distances between the fields and the 
+            farmers wrap around the borders of the grid (see Distances) 
+            checkpoint: the directory of a checkpoint (see Checkpoint), the model 
+            continues from the state of the checkpoint instead of the data 
+            profile: time the phases of the steps and count the work done (see 
+            Profiling), collected with the results 
     '''
     description = 'A model for simulating land use conversion'
 
@@ -82,28 +123,89 @@ class FarmerModel(Model):
                  width =30, \
                  initial_farmers =30,\
                  scenario = 'Basic', \
-                 index_growth = 0.01):
+                 index_growth = 0.01,\
+                 check_statistics = False,\
+                 report_interval = 1,\
+                 reporter = None,\
+                 seed = None,\
+                 engine = 'object',\
+                 scenario_file = None,\
+                 market = 'sequential',\
+                 torus_distance = False,\
+                 data_path = None,\
+                 checkpoint = None,\
+                 profile = False):
         '''
         Create a FARM LANDUSE MODEL with the given parameters.
         Args:
-            verbose: Define if needs to print out main results after each step
+            verbose: Define if needs to print out main results after each step. 
+            Verbosity level: 0 (False) nothing, 1 (True) one summary line, 
+            2 one line per result 
+            report_interval: number of steps between two reports of the results 
+            reporter: a reporter from Reporting (e.g. JsonLinesReporter) that 
+            replaces the one defined by verbose. The model flushes it at the end 
+            of run_model, the caller owns it and closes it (e.g. with statement) 
+            seed: the seed of the random generators of the model (a new random 
+            seed if None), the same seed gives the same run 
+            engine: 'object' steps the Farmer objects one by one, 'array' steps 
+            all the farmers at once with NumPy columns (see Engine) 
             fake_data: Define if the model will generate fake data from predefined 
             parameter. 
             real_data: If fake_data = False, the real data should be provided. It is 
             a vector that includes two datasets, 1st one is farmer data and 2nd one is 
             land use data. If fake_data, then this parameter is [None, None].
+            data_path: If fake_data = False only. The directory of a binary dataset 
+            made by Dataset.py from the real data, loaded memory-mapped instead 
+            of real_data 
             height: If fake_data =True only. Define the height of the entire area 
             width: If fake_data =True only. Define the width of the entire area 
             initial_farmers: If fake_data =True only. Define the number of the farmers
-            scenario: 4 scenarios: 'Base', 'Trend', 'A1', 'B2',
+            scenario: 4 scenarios: 'Basic', 'Trend', 'A1', 'B2' (or a scenario of scenario_file)
             index_growth: the baseline growth of the commodity price in the model 
+            check_statistics: Debug mode, compare the statistics kept up to date 
+            during the steps with a full recalculation at each step 
+            scenario_file: the file of the constants of the agent types and the 
+            scenarios (scenarios.json of the model if None) 
+            market: 'sequential' sells the fields during the step of each farmer, 
+            'batched' collects the offers and clears them after all the farmers 
+            (see Market.LandMarket) 
+            torus_distance: whether the distances between the fields and the 
+            farmers wrap around the borders of the grid (see Distances) 
+            checkpoint: the directory of a checkpoint (see Checkpoint), the model 
+            continues from the state of the checkpoint instead of the data 
+            profile: time the phases of the steps and count the work done (see 
+            Profiling), collected with the results 
         '''
         super().__init__()
 
         #Set additional parameters 
         self.scenario = scenario
         self.index_growth = index_growth 
+        #Constants of the agent types and the scenarios, as arrays indexed by scenario 
+        self.scenario_file = scenario_file
+        self.scenarios = load_scenarios(scenario_file or SCENARIO_PATH)
+        self.scenario_index = self.scenarios.get_scenario(scenario)
         self.stepcounter=0
+        self.check_statistics = check_statistics
+        #Reporting of the results, nothing is formatted if it is silent 
+        if reporter is None:
+            reporter = create_reporter(verbose, report_interval)
+        self.reporter = reporter
+        self.reporting = not isinstance(reporter, SilentReporter)
+        #Random generators of the model, one independent stream per subsystem 
+        self.streams = RandomStreams(seed)
+        self.seed = self.streams.seed
+        self.rng_data = self.streams.get('data')
+        self.rng_farmers = self.streams.get('farmers')
+        self.rng_market = self.streams.get('market')
+        self.rng_schedule = self.streams.get('schedule')   # activation order of the schedule
+        self.random = self.streams.get_python_random('schedule')
+        #Random numbers of the farmers, drawn for all the farmers before each step 
+        self.draws = StepDraws(self.rng_farmers)
+        #Timers and counters of the phases of the steps (None without profiling) 
+        self.profiler = StepProfiler() if profile else None
+        #Land transactions of the last five years of all the farmers 
+        self.transactions = TransactionHistory(years=5)
         #Real data only needed if fake_data = False 
         self.fake_data= fake_data 
         self.real_data = real_data
@@ -112,7 +214,12 @@ class FarmerModel(Model):
         ##########################
         # CREATE FAKE DATA       #
         ##########################
-        if self.fake_data == True:
+        if checkpoint is not None:
+            # the fields and the farmers are taken from the checkpoint 
+            checkpoint = Checkpoint(checkpoint)
+            self.height, self.width = checkpoint.height, checkpoint.width
+            self.initial_farmers = checkpoint.state['initial_farmers']
+        elif self.fake_data == True:
             self.height= height
             self.width = width
             self.initial_farmers = initial_farmers
@@ -128,31 +235,32 @@ class FarmerModel(Model):
                               'agent_trans']
                 final_agent_data= pd.DataFrame(columns = col_names)
                 final_agent_data['agent_id'] = np.arange(1,self.initial_farmers+1,1)
-                final_agent_data['agent_x'] = np.random.randint(0,self.height,size=(self.initial_farmers,))
-                final_agent_data['agent_y'] = np.random.randint(0,self.width,size=(self.initial_farmers,))
-                final_agent_data['agent_type'] = np.random.randint(1,6,size=(self.initial_farmers,))
-                final_agent_data['agent_business'] = np.random.randint(1,6,size=(self.initial_farmers,))
-                final_agent_data['agent_age'] = np.random.randint(37,100,size=(self.initial_farmers,))
-                final_agent_data['agent_nlandscape'] =np.random.uniform(0,.1,size=(self.initial_farmers,))
-                final_agent_data['agent_product'] = np.random.uniform(0,100,size=(self.initial_farmers,))
-                final_agent_data['agent_product_extra'] = np.random.uniform(0,1000,size=(self.initial_farmers,))
-                final_agent_data['agent_trans'] = np.random.uniform(-9,63,size=(self.initial_farmers,))
+                final_agent_data['agent_x'] = self.rng_data.integers(0,self.height,size=(self.initial_farmers,))
+                final_agent_data['agent_y'] = self.rng_data.integers(0,self.width,size=(self.initial_farmers,))
+                final_agent_data['agent_type'] = self.rng_data.integers(1,6,size=(self.initial_farmers,))
+                final_agent_data['agent_business'] = self.rng_data.integers(1,6,size=(self.initial_farmers,))
+                final_agent_data['agent_age'] = self.rng_data.integers(37,100,size=(self.initial_farmers,))
+                final_agent_data['agent_nlandscape'] =self.rng_data.uniform(0,.1,size=(self.initial_farmers,))
+                final_agent_data['agent_product'] = self.rng_data.uniform(0,100,size=(self.initial_farmers,))
+                final_agent_data['agent_product_extra'] = self.rng_data.uniform(0,1000,size=(self.initial_farmers,))
+                final_agent_data['agent_trans'] = self.rng_data.uniform(-9,63,size=(self.initial_farmers,))
                 
-                #Create field data 
-                self.fields_suitability= pd.DataFrame(np.random.uniform(0,1,size=(self.height,self.width)))
-                self.fields_area =pd.DataFrame(np.random.uniform(1,5,size=(self.width,self.width)))
-                self.fields_ehs = pd.DataFrame(np.random.randint(0,2,size=(self.width,self.width)))
-                self.fields_id = pd.DataFrame(np.arange(1,self.area+1,1).reshape(self.height,self.width))
-                self.fields_le = pd.DataFrame(np.random.uniform(0,1,size=(self.height,self.width)))
-                self.fields_le_current = pd.DataFrame(np.random.uniform(0,1,size=(self.height,self.width)))
-                self.fields_le_potential =pd.DataFrame(np.random.uniform(0,1,size=(self.height,self.width)))
-                self.fields_owner =  pd.DataFrame(np.random.choice(final_agent_data['agent_id'],\
-                                                               size=(self.height,self.width)))
-                self.fields_size = pd.DataFrame(np.random.uniform(1,5,size=(self.height,self.width)))
-                self.fields_soil = pd.DataFrame(np.random.uniform(0,1,size=(self.height,self.width)))
-                self.fields_landuse = pd.DataFrame(np.random.choice([0,6,5,4],\
+                #Create field data, the rasters are read as raster[x][y] like the real 
+                #data: one column per x (height columns) and one row per y (width rows) 
+                self.fields_suitability= pd.DataFrame(self.rng_data.uniform(0,1,size=(self.width,self.height)))
+                self.fields_area =pd.DataFrame(self.rng_data.uniform(1,5,size=(self.width,self.height)))
+                self.fields_ehs = pd.DataFrame(self.rng_data.integers(0,2,size=(self.width,self.height)))
+                self.fields_id = pd.DataFrame(np.arange(1,self.area+1,1).reshape(self.width,self.height))
+                self.fields_le = pd.DataFrame(self.rng_data.uniform(0,1,size=(self.width,self.height)))
+                self.fields_le_current = pd.DataFrame(self.rng_data.uniform(0,1,size=(self.width,self.height)))
+                self.fields_le_potential =pd.DataFrame(self.rng_data.uniform(0,1,size=(self.width,self.height)))
+                self.fields_owner =  pd.DataFrame(self.rng_data.choice(final_agent_data['agent_id'],\
+                                                               size=(self.width,self.height)))
+                self.fields_size = pd.DataFrame(self.rng_data.uniform(1,5,size=(self.width,self.height)))
+                self.fields_soil = pd.DataFrame(self.rng_data.uniform(0,1,size=(self.width,self.height)))
+                self.fields_landuse = pd.DataFrame(self.rng_data.choice([0,6,5,4],\
                                                                p= [0.3,0.3,0.35,0.05],\
-                                                               size=(self.height,self.width)))
+                                                               size=(self.width,self.height)))
                 #Combine field data into one single dictionary that 
                 # include mutliple data tabel
                 self.farmer_data = final_agent_data
@@ -167,7 +275,9 @@ class FarmerModel(Model):
                                               'fields_size': self.fields_size,
                                               'fields_soil': self.fields_soil,
                                               'fields_landuse':self.fields_landuse}
-        if self.fake_data == False:
+        elif self.fake_data == False:
+            if data_path is not None:
+                real_data = load_dataset(data_path)
             self.farmer_data = real_data[0]
             self.final_fields_data_dictionary =real_data[1]
             # Add farmer agent and field 
@@ -184,274 +294,209 @@ class FarmerModel(Model):
             self.fields_landuse = self.final_fields_data_dictionary.get('fields_landuse')
             self.fields_soil = self.final_fields_data_dictionary.get('fields_soil')
             self.height, self.width = self.fields_id.shape[1],self.fields_id.shape[0]
-            self.initial_farmers = self.farmer_data.shape[0]
+            self.initial_farmers = len(self.farmer_data['agent_id'])
 
         ##########################
         # READ DATAFILE         #
         ##########################
         #Set up the height and weight of the model equivalent to the size of farm patch
-        self.grid = MultiGrid(self.height, self.width, torus=True)
+        #The field patches are stored as one array per characteristic 
+        self.fields = FieldStore(self, self.height, self.width)
+        self.grid = FieldGrid(self.height, self.width, torus=True, fields=self.fields)
         self.schedule = RandomActivationByBreed(self)
-        # Create grass patches
-        for agent, x, y in self.grid.coord_iter():
-            field_suitability = self.fields_suitability[x][y]
-            field_area = self.fields_area[x][y]
-            field_ehs = self.fields_ehs[x][y]
-            field_id = self.fields_id[x][y]
-            field_le= self.fields_le[x][y]
-            field_le_current = self.fields_le_current[x][y]
-            field_le_potential = self.fields_le_potential[x][y]
-            field_owner_id = self.fields_owner[x][y]
-            field_size = self.fields_size[x][y]
-            field_ehs = self.fields_ehs[x][y]
-            field_landuse = self.fields_landuse[x][y]
-            field_soil = self.fields_soil[x][y]
-            if field_id !=None or field_id !=0:
-                fieldpatch = FieldPatch(self.next_id(), (x, y), self,
-                                   field_id,field_owner_id,field_area,\
-                                   field_suitability, field_le, field_le_current, \
-                                   field_le_potential, field_size, field_soil, \
-                                   field_landuse,field_ehs)
-                self.grid.place_agent( fieldpatch,(x, y))
-                self.schedule.add(fieldpatch)
-        print('Done for .....Field')
+        #Index of the field patches by owner, updated at every land transaction
+        self.ownership = OwnershipIndex(self.schedule, Farmer, self.fields, self.profiler)
+        #Registry of the farmers that want to buy land
+        self.buyers = BuyerRegistry(self.grid.width, self.grid.height, torus=torus_distance)
+        #Batched land market, cleared after the step of all the farmers 
+        self.market = LandMarket(self) if market == 'batched' else None
+        #Statistics of the model, kept up to date by the farmers and the fields
+        self.statistics = ModelStatistics(self)
+        #Context of the step shared by all the farmers (scenario constants and 
+        #aggregates of the farmers) 
+        self.context = StepContext(self)
+        # Create field patches: each raster is converted once to an array [x, y] 
+        # and stored as a column of the field store
+        if checkpoint is not None:
+            checkpoint.restore_fields(self)
+        else:
+            self.fields.add_patches(field_id = self.to_raster(self.fields_id),
+                                    field_owner_id = self.to_raster(self.fields_owner),
+                                    field_area = self.to_raster(self.fields_area),
+                                    field_suitability = self.to_raster(self.fields_suitability),
+                                    field_le = self.to_raster(self.fields_le),
+                                    field_le_current = self.to_raster(self.fields_le_current),
+                                    field_le_potential = self.to_raster(self.fields_le_potential),
+                                    field_size = self.to_raster(self.fields_size),
+                                    field_soil = self.to_raster(self.fields_soil),
+                                    field_landuse = self.to_raster(self.fields_landuse),
+                                    field_ehs = self.to_raster(self.fields_ehs))
+        self.statistics.add_fields()
+        #Raster of the land use, used to count the patches around the farmers
+        self.landscape = LanduseRaster(self.fields.field_landuse, torus=torus_distance)
+        #Distances between the fields and the farmsteads of their owners 
+        self.distances = DistanceService(self, torus=torus_distance)
+        if self.reporting:
+            self.reporter.message('Done for .....Field')
 
-        # Read data file for the farmers 
-        self.agent_id_list = self.farmer_data['agent_id'].unique()
-        for agent_id in self.agent_id_list:
-            x = self.farmer_data[self.farmer_data['agent_id']==agent_id]['agent_x'].values[0]
-            y = self.farmer_data[self.farmer_data['agent_id']==agent_id]['agent_y'].values[0]
-            agent_type = self.farmer_data[self.farmer_data['agent_id']==agent_id]['agent_type'].values[0]
-            agent_business_type = self.farmer_data[self.farmer_data['agent_id']==agent_id]['agent_business'].values[0]
-            agent_age = self.farmer_data[self.farmer_data['agent_id']==agent_id]['agent_age'].values[0]
-            agent_national_landscape = self.farmer_data[self.farmer_data['agent_id']==agent_id]['agent_nlandscape'].values[0]
-            agent_production = self.farmer_data[self.farmer_data['agent_id']==agent_id]['agent_product'].values[0]
-            agent_production_extra = self.farmer_data[self.farmer_data['agent_id']==agent_id]['agent_product_extra'].values[0]
-            agent_previous_transaction = self.farmer_data[self.farmer_data['agent_id']==agent_id]['agent_trans'].values[0]
-            farmer= Farmer(agent_id, (x, y), self, agent_type,\
-                           agent_age,agent_business_type,agent_previous_transaction,
-                           agent_production,agent_production_extra,
-                           agent_national_landscape)
-            if farmer != None:
-                self.grid.place_agent(farmer, (x, y))
-                self.schedule.add(farmer)
-        print('Done for....Agent')
+        if checkpoint is not None:
+            checkpoint.restore_farmers(self)
+        else:
+            # Read data file for the farmers: the table (a DataFrame or the columns 
+            # of a dataset) is converted once to arrays and the farmers are created 
+            # row by row (first row of each agent_id)
+            _, first_rows = np.unique(np.asarray(self.farmer_data['agent_id']), return_index=True)
+            first_rows = np.sort(first_rows)
+            farmer_columns = [np.asarray(self.farmer_data[column])[first_rows] for column in \
+                              ['agent_id', 'agent_x', 'agent_y', 'agent_type',\
+                               'agent_business', 'agent_age', 'agent_nlandscape',\
+                               'agent_product', 'agent_product_extra', 'agent_trans']]
+            self.agent_id_list = farmer_columns[0]
+            for agent_id, x, y, agent_type, agent_business_type, agent_age,\
+                    agent_national_landscape, agent_production, agent_production_extra,\
+                    agent_previous_transaction in zip(*farmer_columns):
+                farmer= Farmer(agent_id, (x, y), self, agent_type,\
+                               agent_age,agent_business_type,agent_previous_transaction,
+                               agent_production,agent_production_extra,
+                               agent_national_landscape)
+                if farmer != None:
+                    self.grid.place_agent(farmer, (x, y))
+                    self.schedule.add(farmer)
+                    self.statistics.add(farmer)
+        if self.reporting:
+            self.reporter.message('Done for....Agent')
+        #The array engine takes the state of the farmers into NumPy columns 
+        if engine == 'array':
+            self.engine = ArrayEngine(self)
+        else:
+            self.engine = None
 
         self.running = True
         self.calculate_data()
-        self.datacollector = DataCollector(
-                {"percentage_agent_hobby": lambda m: m.percentage_agent_hobby,
-                 "mean_land_use": lambda m: m.mean_land_use,
-                 "percentage_agent_conventional": lambda m: m.percentage_agent_conventional,
-                 "percentage_agent_diversifier": lambda m: m.percentage_agent_diversifier,
-                 "percentage_agent_conventional_expansionist": lambda m: m.percentage_agent_conventional_expansionist,
-                 "percentage_agent_diversifier_expansionist": lambda m: m.percentage_agent_diversifier_expansionist,
-                 "percentage_farm_size_hobby":lambda m: m.percentage_farm_size_hobby,
-                 "percentage_farm_size_conventional": lambda m: m.percentage_farm_size_conventional,
-                 "percentage_farm_size_diversifier": lambda m: m.percentage_farm_size_diversifier,
-                 "percentage_farm_size_conventional_expansionist": lambda m: m.percentage_farm_size_conventional_expansionist,
-                 "percentage_farm_size_diversifier_expansionist": lambda m: m.percentage_farm_size_diversifier_expansionist,
-                 "mean_farm_size_hobby":lambda m: m.mean_farm_size_hobby,
-                 "mean_farm_size_conventional":lambda m: m.mean_farm_size_conventional,
-                 "mean_farm_size_diversifier":lambda m: m.mean_farm_size_diversifier,
-                 "mean_farm_size_conventional_expansionist":lambda m: m.mean_farm_size_conventional_expansionist,
-                 "mean_farm_size_diversifier_expansionist":lambda m: m.mean_farm_size_diversifier_expansionist,
-                 "percentage_agent_tree_hobby": lambda m: m.percentage_agent_tree_hobby,
-                 "percentage_agent_tree_conventional": lambda m: m.percentage_agent_tree_conventional,
-                 "percentage_agent_tree_diversifier": lambda m: m.percentage_agent_tree_diversifier,
-                 "percentage_agent_tree_conventional_expansionist": lambda m: m.percentage_agent_tree_conventional_expansionist,
-                 "percentage_agent_tree_diversifier_expansionist": lambda m: m.percentage_agent_tree_diversifier_expansionist,
-                 "nature": lambda m: m.nature
-                 })
+        #The collector is created once, the results of each step are stored 
+        #in its buffer 
+        model_reporters = ["percentage_agent_hobby",
+                           "mean_land_use",
+                           "percentage_agent_conventional",
+                           "percentage_agent_diversifier",
+                           "percentage_agent_conventional_expansionist",
+                           "percentage_agent_diversifier_expansionist",
+                           "percentage_farm_size_hobby",
+                           "percentage_farm_size_conventional",
+                           "percentage_farm_size_diversifier",
+                           "percentage_farm_size_conventional_expansionist",
+                           "percentage_farm_size_diversifier_expansionist",
+                           "mean_farm_size_hobby",
+                           "mean_farm_size_conventional",
+                           "mean_farm_size_diversifier",
+                           "mean_farm_size_conventional_expansionist",
+                           "mean_farm_size_diversifier_expansionist",
+                           "percentage_agent_tree_hobby",
+                           "percentage_agent_tree_conventional",
+                           "percentage_agent_tree_diversifier",
+                           "percentage_agent_tree_conventional_expansionist",
+                           "percentage_agent_tree_diversifier_expansionist",
+                           "nature"
+                           ]
+        #The timers and counters of the profiler are collected with the results 
+        if self.profiler is not None:
+            model_reporters = dict({name: name for name in model_reporters}, \
+                                   **self.profiler.get_reporters())
+            self.profiler.start_step()
+        self.datacollector = ColumnarCollector(model_reporters)
         self.datacollector.collect(self)
+        #The step, the results and the random generators of the checkpoint 
+        if checkpoint is not None:
+            checkpoint.restore_state(self)
 
-    def calculate_data(self):
-        #Generic calculation
-        self.total_agents = self.schedule.get_breed_count(Farmer)
-        self.total_farm_size = sum([field.field_size for field in \
-                                 self.schedule.get_agents_by_breed(FieldPatch).values()])
-        self.mean_land_use = np.mean([field.field_le for field in \
-                                 self.schedule.get_agents_by_breed(FieldPatch).values()])
-        self.agent_hobby = len([farmer for farmer in 
-                                 self.schedule.get_agents_by_breed(Farmer).values()
-                                 if (farmer.agent_type == 1)]) 
-        self.agent_conventional = len([farmer for farmer in 
-                                 self.schedule.get_agents_by_breed(Farmer).values()
-                                 if (farmer.agent_type == 2)])
-        self.agent_diversifier= len([farmer for farmer in 
-                                 self.schedule.get_agents_by_breed(Farmer).values()
-                                 if (farmer.agent_type == 3)])
-        self.agent_conventional_expansionist= len([farmer for farmer in 
-                                 self.schedule.get_agents_by_breed(Farmer).values()
-                                 if (farmer.agent_type == 4)])
-        self.agent_diversifier_expansionist = len([farmer for farmer in 
-                                 self.schedule.get_agents_by_breed(Farmer).values()
-                                 if (farmer.agent_type == 5)])
-        #Percentage of farmers
-        self.percentage_agent_hobby = self.agent_hobby /self.total_agents
-        self.percentage_agent_conventional = self.agent_conventional/self.total_agents
-        self.percentage_agent_diversifier= self.agent_diversifier/self.total_agents
-        self.percentage_agent_conventional_expansionist= self.agent_conventional_expansionist/self.total_agents
-        self.percentage_agent_diversifier_expansionist = self.agent_diversifier_expansionist/self.total_agents
+    #Continue a model from a checkpoint, with the parameters of the checkpoint 
+    #unless they are given (e.g. scenario to branch another scenario) 
+    @classmethod
+    def from_checkpoint(cls, path, **parameters):
+        checkpoint = Checkpoint(path)
+        return cls(**dict(checkpoint.parameters, fake_data=False, checkpoint=path, **parameters))
 
-        #Percentage of area 
-        self.percentage_farm_size_hobby = sum([farmer.agent_farm_size for farmer in \
-                                 self.schedule.get_agents_by_breed(Farmer).values()\
-                                 if (farmer.agent_type == 1)])/self.total_farm_size
-        self.percentage_farm_size_conventional = sum([farmer.agent_farm_size for farmer in \
-                                 self.schedule.get_agents_by_breed(Farmer).values()\
-                                 if (farmer.agent_type == 2)])/self.total_farm_size
-        self.percentage_farm_size_diversifier= sum([farmer.agent_farm_size for farmer in \
-                                 self.schedule.get_agents_by_breed(Farmer).values()\
-                                 if (farmer.agent_type == 3)])/self.total_farm_size
-        self.percentage_farm_size_conventional_expansionist= sum([farmer.agent_farm_size for farmer in \
-                                 self.schedule.get_agents_by_breed(Farmer).values()\
-                                 if (farmer.agent_type == 4)])/self.total_farm_size
-        self.percentage_farm_size_diversifier_expansionist = sum([farmer.agent_farm_size for farmer in \
-                                 self.schedule.get_agents_by_breed(Farmer).values()\
-                                 if (farmer.agent_type == 5)])/self.total_farm_size
+    #Save the state of the model into a checkpoint (between two steps) 
+    def save_checkpoint(self, path):
+        return save_checkpoint(self, path)
 
-        #Percentage of area 
-        self.mean_farm_size_hobby = np.mean([farmer.agent_farm_size for farmer in \
-                                 self.schedule.get_agents_by_breed(Farmer).values()\
-                                 if (farmer.agent_type == 1)])
-        self.mean_farm_size_conventional = np.mean([farmer.agent_farm_size for farmer in 
-                                 self.schedule.get_agents_by_breed(Farmer).values()
-                                 if (farmer.agent_type == 2)])
-        self.mean_farm_size_diversifier= np.mean([farmer.agent_farm_size for farmer in 
-                                 self.schedule.get_agents_by_breed(Farmer).values()
-                                 if (farmer.agent_type == 3)])
-        self.mean_farm_size_conventional_expansionist= np.mean([farmer.agent_farm_size for farmer in 
-                                 self.schedule.get_agents_by_breed(Farmer).values()
-                                 if (farmer.agent_type == 4)])
-        self.mean_farm_size_diversifier_expansionist = np.mean([farmer.agent_farm_size for farmer in 
-                                 self.schedule.get_agents_by_breed(Farmer).values()
-                                 if (farmer.agent_type == 5)])
+    #Convert a raster (DataFrame indexed as raster[x][y]) into an array [x, y]
+    @staticmethod
+    def to_raster(raster):
+        return np.asarray(raster).T
+
+    #Remove a farmer that quits farming from the model (once, the cessation of 
+    #the A1 scenario can ask twice for a farmer without fields)
+    def remove_farmer(self, farmer):
+        if farmer.unique_id not in self.schedule.agents_by_breed[Farmer]:
+            return
+        if self.profiler is not None:
+            self.profiler.count('farmers_removed')
+        self.schedule.remove(farmer)
+        self.grid.remove_agent(farmer)
+        self.buyers.remove(farmer)
+        self.statistics.remove(farmer)
+
+    #Write the state of the farmers of the array engine into the Farmer objects 
+    def sync_farmers(self):
+        if self.engine is not None:
+            self.engine.sync()
+
+    def calculate_data(self):
+        #The counters behind the results are kept up to date by the farmers and 
+        #the fields, so the results are calculated without scanning the agents 
+        if self.check_statistics:
+            self.sync_farmers()
+            self.statistics.check()
+        values = self.statistics.calculate()
+        #Generic calculation
+        self.total_agents = values['total_agents']
+        self.total_farm_size = values['total_farm_size']
+        self.mean_land_use = values['mean_land_use']
+        #Number of farmers, percentage of farmers, percentage of area,
+        #mean farm size and percentage of farmers with natural landscape per type
+        for name in AGENT_TYPES.values():
+            setattr(self, 'agent_' + name, values['agent_' + name])
+            setattr(self, 'percentage_agent_' + name, values['percentage_agent_' + name])
+            setattr(self, 'percentage_farm_size_' + name, values['percentage_farm_size_' + name])
+            setattr(self, 'mean_farm_size_' + name, values['mean_farm_size_' + name])
+            setattr(self, 'percentage_agent_tree_' + name, values['percentage_agent_tree_' + name])
         #Nature 
-        self.nature = sum([field.field_size for field in \
-                                 self.schedule.get_agents_by_breed(FieldPatch).values()\
-                                 if (field.field_owner_id == 9999)])/ \
-                                  sum([field.field_size for field in \
-                                 self.schedule.get_agents_by_breed(FieldPatch).values()])
-        #Total farmers with natural landscape 
-        if self.agent_hobby!=0:
-            self.percentage_agent_tree_hobby = len([farmer for farmer in \
-                                 self.schedule.get_agents_by_breed(Farmer).values()\
-                                 if (farmer.agent_type == 1) and \
-                                 (farmer.agent_tree_size>=1)])/self.agent_hobby
-        else:
-            self.percentage_agent_tree_hobby =0 
-        if self.agent_conventional!=0:
-            self.percentage_agent_tree_conventional = len([farmer for farmer in \
-                                 self.schedule.get_agents_by_breed(Farmer).values()\
-                                 if (farmer.agent_type == 2) and \
-                                 (farmer.agent_tree_size>=1)])/self.agent_conventional
-        else:
-            self.percentage_agent_tree_conventional =0 
-        if self.agent_diversifier !=0:
-            self.percentage_agent_tree_diversifier = len([farmer for farmer in \
-                                 self.schedule.get_agents_by_breed(Farmer).values()\
-                                 if (farmer.agent_type == 3) and \
-                                 (farmer.agent_tree_size>=1)])/self.agent_diversifier
-        else:
-            self.percentage_agent_tree_diversifier =0 
-        if self.agent_conventional_expansionist !=0:
-            self.percentage_agent_tree_conventional_expansionist = len([farmer for farmer in \
-                                 self.schedule.get_agents_by_breed(Farmer).values()\
-                                 if (farmer.agent_type == 4) and \
-                                 (farmer.agent_tree_size>=1)])/self.agent_conventional_expansionist
-        else:
-            self.percentage_agent_tree_conventional_expansionist =0 
-        if self.agent_diversifier_expansionist !=0:
-            self.percentage_agent_tree_diversifier_expansionist = len([farmer for farmer in \
-                                 self.schedule.get_agents_by_breed(Farmer).values()\
-                                 if (farmer.agent_type == 5) and \
-                                 (farmer.agent_tree_size>=1)])/self.agent_diversifier_expansionist
-        else:
-            self.percentage_agent_tree_diversifier_expansionist =0
+        self.nature = values['nature']
             
     def step(self):
+        self.context.refresh()
         self.calculate_data()
-        self.datacollector = DataCollector(
-                {"percentage_agent_hobby": lambda m: m.percentage_agent_hobby,
-                 "mean_land_use": lambda m: m.mean_land_use,
-                 "percentage_agent_conventional": lambda m: m.percentage_agent_conventional,
-                 "percentage_agent_diversifier": lambda m: m.percentage_agent_diversifier,
-                 "percentage_agent_conventional_expansionist": lambda m: m.percentage_agent_conventional_expansionist,
-                 "percentage_agent_diversifier_expansionist": lambda m: m.percentage_agent_diversifier_expansionist,
-                 "percentage_farm_size_hobby":lambda m: m.percentage_farm_size_hobby,
-                 "percentage_farm_size_conventional": lambda m: m.percentage_farm_size_conventional,
-                 "percentage_farm_size_diversifier": lambda m: m.percentage_farm_size_diversifier,
-                 "percentage_farm_size_conventional_expansionist": lambda m: m.percentage_farm_size_conventional_expansionist,
-                 "percentage_farm_size_diversifier_expansionist": lambda m: m.percentage_farm_size_diversifier_expansionist,
-                 "mean_farm_size_hobby":lambda m: m.mean_farm_size_hobby,
-                 "mean_farm_size_conventional":lambda m: m.mean_farm_size_conventional,
-                 "mean_farm_size_diversifier":lambda m: m.mean_farm_size_diversifier,
-                 "mean_farm_size_conventional_expansionist":lambda m: m.mean_farm_size_conventional_expansionist,
-                 "mean_farm_size_diversifier_expansionist":lambda m: m.mean_farm_size_diversifier_expansionist,
-                 "percentage_agent_tree_hobby": lambda m: m.percentage_agent_tree_hobby,
-                 "percentage_agent_tree_conventional": lambda m: m.percentage_agent_tree_conventional,
-                 "percentage_agent_tree_diversifier": lambda m: m.percentage_agent_tree_diversifier,
-                 "percentage_agent_tree_conventional_expansionist": lambda m: m.percentage_agent_tree_conventional_expansionist,
-                 "percentage_agent_tree_diversifier_expansionist": lambda m: m.percentage_agent_tree_diversifier_expansionist,
-                 "nature": lambda m: m.nature
-                 })
         self.datacollector.collect(self)
-        self.schedule.step()
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.start_step()
+        #One vectorized draw of the random numbers of all the farmers 
+        self.draws.draw()
+        if self.engine is not None:
+            self.engine.step()
+        else:
+            self.schedule.step()
+            if self.market is not None:
+                self.market.clear()
+                if profiler is not None:
+                    profiler.lap('market')
+        if profiler is not None:
+            profiler.end_step()
         self.stepcounter +=1
         
     def run_model(self, step_count=15):
-        self.datacollector.collect(self)
-        print("Initial mean_land_use", self.mean_land_use)
-        print("Initial percentage_agent_hobby", self.percentage_agent_hobby)
-        print("Initial percentage_agent_conventional", self.percentage_agent_conventional)
-        print("Initial percentage_agent_diversifier", self.percentage_agent_diversifier)
-        print("Initial percentage_agent_conventional_expansionist", self.percentage_agent_conventional_expansionist)
-        print("Initial percentage_agent_diversifier_expansionist", self.percentage_agent_diversifier_expansionist)
-        print("Initial percentage_farm_size_hobby",  self.percentage_farm_size_hobby)
-        print("Initial percentage_farm_size_conventional", self.percentage_farm_size_conventional)
-        print("Initial percentage_farm_size_diversifier", self.percentage_farm_size_diversifier)
-        print("Initial percentage_farm_size_conventional_expansionist", self.percentage_farm_size_conventional_expansionist)
-        print("Initial percentage_farm_size_diversifier_expansionist", self.percentage_farm_size_diversifier_expansionist)
-        print("Initial mean_farm_size_hobby", self.mean_farm_size_hobby)
-        print("Initial mean_farm_size_conventional", self.mean_farm_size_conventional)
-        print("Initial mean_farm_size_diversifier", self.mean_farm_size_diversifier)
-        print("Initial mean_farm_size_conventional_expansionist", self.mean_farm_size_conventional_expansionist)
-        print("Initial mean_farm_size_diversifier_expansionist", self.mean_farm_size_diversifier_expansionist)
-        print("Initial percentage_agent_tree_hobby", self.percentage_agent_tree_hobby)
-        print("Initial percentage_agent_tree_conventional", self.percentage_agent_tree_conventional)
-        print("Initial percentage_agent_tree_diversifier", self.percentage_agent_tree_diversifier)
-        print("Initial percentage_agent_tree_conventional_expansionist", self.percentage_agent_tree_conventional_expansionist)
-        print("Initial percentage_agent_tree_diversifier_expansionist", self.percentage_agent_tree_diversifier_expansionist)
-        print("Initial nature", self.nature)
-        self.result.append(self.datacollector.get_model_vars_dataframe().values[0])
+        #The initial results are already collected when the model is created, 
+        #the reporter writes them from the buffer of the collector 
+        if self.reporting:
+            self.reporter.report(self)
         for i in range(step_count):
             self.step()
-            print('')
-            print('Step count', i)
-            print("This step mean_land_use", self.mean_land_use)
-            print("This step percentage_agent_hobby", self.percentage_agent_hobby)
-            print("This step percentage_agent_conventional", self.percentage_agent_conventional)
-            print("This step percentage_agent_diversifier", self.percentage_agent_diversifier)
-            print("This step percentage_agent_conventional_expansionist", self.percentage_agent_conventional_expansionist)
-            print("This step percentage_agent_diversifier_expansionist", self.percentage_agent_diversifier_expansionist)
-            print("This step percentage_farm_size_hobby",  self.percentage_farm_size_hobby)
-            print("This step percentage_farm_size_conventional", self.percentage_farm_size_conventional)
-            print("This step percentage_farm_size_diversifier", self.percentage_farm_size_diversifier)
-            print("This step percentage_farm_size_conventional_expansionist", self.percentage_farm_size_conventional_expansionist)
-            print("This step percentage_farm_size_diversifier_expansionist", self.percentage_farm_size_diversifier_expansionist)
-            print("This step mean_farm_size_hobby", self.mean_farm_size_hobby)
-            print("This step mean_farm_size_conventional", self.mean_farm_size_conventional)
-            print("This step mean_farm_size_diversifier", self.mean_farm_size_diversifier)
-            print("This step mean_farm_size_conventional_expansionist", self.mean_farm_size_conventional_expansionist)
-            print("This step mean_farm_size_diversifier_expansionist", self.mean_farm_size_diversifier_expansionist)
-            print("This step percentage_agent_tree_hobby", self.percentage_agent_tree_hobby)
-            print("This step percentage_agent_tree_conventional", self.percentage_agent_tree_conventional)
-            print("This step percentage_agent_tree_diversifier", self.percentage_agent_tree_diversifier)
-            print("This step percentage_agent_tree_conventional_expansionist", self.percentage_agent_tree_conventional_expansionist)
-            print("This step percentage_agent_tree_diversifier_expansionist", self.percentage_agent_tree_diversifier_expansionist)
-            print("This step nature", self.nature)
-            self.result.append(self.datacollector.get_model_vars_dataframe().values[0])
+            if self.reporting:
+                self.reporter.report(self)
+        self.reporter.flush()
+        self.sync_farmers()
+        #Full time series of the results (step x result), copied out of the 
+        #buffer of the collector that the next steps keep writing into
+        self.result = self.datacollector.get_values().copy()
         return self.result
-
-        
@@ -0,0 +1,177 @@
+"""
+REPLICATION OF THE ABM MODEL
+An empirical ABM for regional land use/cover change:
+a Dutch case study (version 1.0.0)
+Quyen Nguyen | 16 December 2019
+THE MODEL INCLUDE FIVE COMPONENTS
+1. Agents: The module defines the characteristics and actions of the environment
+(Field Patch) and the farmers (Farmer)
+2. Schedule: The moduel defines the order that the model runs in cases there are
+several agent breeds. There are 2 breeds in the base model (Farmer and Field Patch).
+The Farmer can make decision, the Field Patch is static and only change after their
+respective owning Farmer makes decision
+3. SimpleModel: The module defines the inital states and the steps that all farmers
+makes during the time t
+4. Server: The module defines the visualization of the model
+5. Analysis: The module shows the analysis of the model
+##########################
+#       STATISTICS       #
+##########################
+"""
+##########################
+# IMPORT GENERIC LIBRARY #
+##########################
+import numpy as np
+from collections import defaultdict
+from Agents import Farmer
+
+#Names of the agent types used in the statistics
+AGENT_TYPES = {1: 'hobby',
+               2: 'conventional',
+               3: 'diversifier',
+               4: 'conventional_expansionist',
+               5: 'diversifier_expansionist'}
+
+##########################
+# CREATE STATISTICS      #
+##########################
+#Define the statistics of the model that are kept up to date by the agents
+class ModelStatistics():
+    ''' This is the set of counters and running sums behind the results of the
+    model: number of farmers, farm size and farmers with trees (agent_tree_size
+    >= 1) per agent type, number of farmers that stop farming, and the sum of 
+    the landscape elements of the fields. The farmers correct them every time 
+    their agent_type, agent_farm_size, agent_tree_size or agent_cessation change, when they enter or leave the model, and the field
+    patches when their field_le changes. The nature area is read from the
+    ownership index (owner 9999). Calculating the results is then O(1) per step
+    instead of scanning all farmers and patches.
+        Args:
+            model: the model of the statistics'''
+    def __init__(self, model):
+        self.model = model
+        self.farmers = set()                       # farmers included in the statistics
+        self.agents_by_type = defaultdict(int)     # agent_type -> number of farmers
+        self.farm_size_by_type = defaultdict(float) # agent_type -> sum of agent_farm_size
+        self.trees_by_type = defaultdict(int)      # agent_type -> farmers with agent_tree_size >= 1
+        self.agents_stop = 0                       # farmers with agent_cessation "stop"
+        self.total_farm_size = 0                   # size of all the fields
+        self.number_fields = 0                     # number of fields
+        self.sum_land_use = 0                      # sum of field_le of all the fields
+
+    #Calculate the characteristics of the fields (after the fields are created)
+    def add_fields(self):
+        fields = self.model.fields
+        self.total_farm_size = fields.field_size.values.sum()
+        self.number_fields = len(fields)
+        self.sum_land_use = fields.field_le.values.sum()
+
+    #Correct the sum of the landscape elements when the field_le of a field changes
+    def change_land_use(self, previous_field_le, field_le):
+        self.sum_land_use += field_le - previous_field_le
+
+    #Include a farmer in the statistics
+    def add(self, farmer):
+        if farmer in self.farmers:
+            return
+        self.farmers.add(farmer)
+        self.include(farmer)
+
+    #Exclude a farmer that leaves the model
+    def remove(self, farmer):
+        if farmer not in self.farmers:
+            return
+        self.farmers.remove(farmer)
+        self.exclude(farmer)
+
+    #Add the contribution of a farmer to the counters
+    def include(self, farmer):
+        self.agents_by_type[farmer.agent_type] += 1
+        self.farm_size_by_type[farmer.agent_type] += farmer.agent_farm_size
+        if farmer.agent_tree_size >= 1:
+            self.trees_by_type[farmer.agent_type] += 1
+        if farmer.agent_cessation == "stop":
+            self.agents_stop += 1
+
+    #Subtract the contribution of a farmer from the counters
+    def exclude(self, farmer):
+        self.agents_by_type[farmer.agent_type] -= 1
+        self.farm_size_by_type[farmer.agent_type] -= farmer.agent_farm_size
+        if farmer.agent_tree_size >= 1:
+            self.trees_by_type[farmer.agent_type] -= 1
+        if farmer.agent_cessation == "stop":
+            self.agents_stop -= 1
+
+    #Set the counters of the farmers from columns (one value per farmer),
+    #used by the array engine that keeps the farmers as NumPy columns
+    def set_counters(self, agent_types, farm_sizes, tree_sizes, stops):
+        self.agents_by_type.clear()
+        self.farm_size_by_type.clear()
+        self.trees_by_type.clear()
+        agents = np.bincount(agent_types, minlength=len(AGENT_TYPES) + 1)
+        farm_sizes = np.bincount(agent_types, weights=farm_sizes, minlength=len(AGENT_TYPES) + 1)
+        trees = np.bincount(agent_types, weights=tree_sizes >= 1, minlength=len(AGENT_TYPES) + 1)
+        for agent_type in np.flatnonzero(agents):
+            self.agents_by_type[int(agent_type)] = int(agents[agent_type])
+            self.farm_size_by_type[int(agent_type)] = float(farm_sizes[agent_type])
+            self.trees_by_type[int(agent_type)] = int(trees[agent_type])
+        self.agents_stop = int(np.count_nonzero(stops))
+
+    #Calculate the results of the model from the counters
+    def calculate(self):
+        total_agents = len(self.farmers)
+        values = {'total_agents': total_agents,
+                  'total_agents_stop': self.agents_stop,
+                  'total_farm_size': self.total_farm_size,
+                  'mean_land_use': self.sum_land_use / self.number_fields,
+                  'nature': self.model.ownership.get_size(9999) / self.total_farm_size}
+        for agent_type, name in AGENT_TYPES.items():
+            agents = self.agents_by_type[agent_type]
+            farm_size = self.farm_size_by_type[agent_type]
+            values['agent_' + name] = agents
+            values['percentage_agent_' + name] = agents / total_agents
+            values['percentage_farm_size_' + name] = farm_size / self.total_farm_size
+            if agents != 0:
+                values['mean_farm_size_' + name] = farm_size / agents
+                values['percentage_agent_tree_' + name] = self.trees_by_type[agent_type] / agents
+            else:
+                values['mean_farm_size_' + name] = np.nan
+                values['percentage_agent_tree_' + name] = 0
+        return values
+
+    #Calculate the results of the model from all the farmers in the schedule and all the fields
+    def recalculate(self):
+        fields = self.model.fields
+        farmers = list(self.model.schedule.agents_by_breed[Farmer].values())
+        total_agents = len(farmers)
+        total_farm_size = fields.field_size.values.sum()
+        values = {'total_agents': total_agents,
+                  'total_agents_stop': len([farmer for farmer in farmers if farmer.agent_cessation == "stop"]),
+                  'total_farm_size': total_farm_size,
+                  'mean_land_use': np.mean(fields.field_le.values),
+                  'nature': fields.field_size.values[fields.field_owner_id.values == 9999].sum() / total_farm_size}
+        for agent_type, name in AGENT_TYPES.items():
+            farmers_type = [farmer for farmer in farmers if farmer.agent_type == agent_type]
+            agents = len(farmers_type)
+            farm_size = sum(farmer.agent_farm_size for farmer in farmers_type)
+            values['agent_' + name] = agents
+            values['percentage_agent_' + name] = agents / total_agents
+            values['percentage_farm_size_' + name] = farm_size / total_farm_size
+            if agents != 0:
+                values['mean_farm_size_' + name] = farm_size / agents
+                values['percentage_agent_tree_' + name] = len([farmer for farmer in farmers_type \
+                                                              if farmer.agent_tree_size >= 1]) / agents
+            else:
+                values['mean_farm_size_' + name] = np.nan
+                values['percentage_agent_tree_' + name] = 0
+        return values
+
+    #Compare the counters with a full recalculation (debug mode)
+    def check(self):
+        values = self.calculate()
+        expected_values = self.recalculate()
+        wrong = [name for name in expected_values if not \
+                 np.isclose(values[name], expected_values[name], equal_nan=True)]
+        if wrong != []:
+            raise RuntimeError('The statistics differ from a full recalculation: %s' % \
+                               ', '.join('%s=%s (expected %s)' % (name, values[name], expected_values[name]) \
+                                         for name in wrong))
@@ -0,0 +1,102 @@
+"""
+REPLICATION OF THE ABM MODEL
+An empirical ABM for regional land use/cover change:
+a Dutch case study (version 1.0.0)
+Quyen Nguyen | 16 December 2019
+THE MODEL INCLUDE FIVE COMPONENTS
+1. Agents: The module defines the characteristics and actions of the environment
+(Field Patch) and the farmers (Farmer)
+2. Schedule: The moduel defines the order that the model runs in cases there are
+several agent breeds. There are 2 breeds in the base model (Farmer and Field Patch).
+The Farmer can make decision, the Field Patch is static and only change after their
+respective owning Farmer makes decision
+3. SimpleModel: The module defines the inital states and the steps that all farmers
+makes during the time t
+4. Server: The module defines the visualization of the model
+5. Analysis: The module shows the analysis of the model
+##########################
+#     RANDOM STREAMS     #
+##########################
+"""
+##########################
+# IMPORT GENERIC LIBRARY #
+##########################
+import random
+import numpy as np
+
+##########################
+# CREATE RANDOM STREAMS  #
+##########################
+#Define the random generators of a model, one independent stream per subsystem
+class RandomStreams():
+    ''' This is the set of random generators of a model. All of them come
+    from the seed of the model: each subsystem (fake data, farmers, land
+    market, schedule) gets its own stream spawned from the seed, so the
+    draws of a subsystem do not change when another subsystem draws more or
+    less numbers, and models of the same process never share a generator.
+        Args:
+            seed: the seed of the model (a new random seed if None)'''
+    names = ('data', 'farmers', 'market', 'schedule')
+    def __init__(self, seed=None):
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.seed = self.seed_sequence.entropy    # seed to reproduce the model
+        # the streams are spawned in a fixed order, so they only depend on the seed
+        self.generators = {name: np.random.default_rng(sequence) for name, sequence in \
+                           zip(self.names, self.seed_sequence.spawn(len(self.names)))}
+
+    #Get the generator of a subsystem
+    def get(self, name):
+        return self.generators[name]
+
+    #Python random generator of a subsystem (for the Mesa schedule)
+    def get_python_random(self, name):
+        return random.Random(int(self.generators[name].integers(2**63)))
+
+##########################
+# CREATE STEP DRAWS      #
+##########################
+#Define the random numbers that the farmers use during a step
+class StepDraws():
+    ''' This is the table of the random numbers of the farmers for one step.
+    Every farmer has a row of the table (given when it is created), and
+    all the numbers of a step are drawn at once before the step, in one
+    vectorized call per kind of number, instead of one call per farmer and
+    per decision. A number is used at most once per step by a farmer.
+        Args:
+            rng: the generator of the farmers'''
+    uniform_columns = {'stop': 0,      # random number of the farmers that stop
+                       'inherit': 1,   # random number to inherit the farm
+                       'cessation': 2, # random number to stop farming this year
+                       'sell': 3,      # random number to sell to urban immigrants
+                       'immigrant': 4, # random number of the new urban immigrants
+                       'abandon': 5}   # random number to abandon fields (A1)
+    normal_columns = {'expand': 0,     # change of the random number to expand
+                      'protect': 1}    # change of the random number to protect
+    def __init__(self, rng):
+        self.rng = rng
+        self.rows = 0
+        self.uniform = np.empty((0, len(self.uniform_columns)))
+        self.normal = np.empty((0, len(self.normal_columns)))
+
+    #Give a row of the table to a new farmer
+    def add_row(self):
+        self.rows += 1
+        return self.rows - 1
+
+    #Draw the random numbers of all the farmers for the next step
+    def draw(self):
+        self.uniform = self.rng.random((self.rows, len(self.uniform_columns)))
+        self.normal = self.rng.standard_normal((self.rows, len(self.normal_columns)))
+
+    #Get a uniform number in [0, 1) of a farmer
+    def get_uniform(self, row, name):
+        # a farmer created after the draw of the step draws its own number
+        if row >= self.uniform.shape[0]:
+            return self.rng.random()
+        return self.uniform[row, self.uniform_columns[name]]
+
+    #Get a standard normal number of a farmer
+    def get_normal(self, row, name):
+        if row >= self.normal.shape[0]:
+            return self.rng.standard_normal()
+        return self.normal[row, self.normal_columns[name]]
@@ -0,0 +1,267 @@
+"""
+REPLICATION OF THE ABM MODEL
+An empirical ABM for regional land use/cover change:
+a Dutch case study (version 1.0.0)
+Quyen Nguyen | 16 December 2019
+THE MODEL INCLUDE FIVE COMPONENTS
+1. Agents: The module defines the characteristics and actions of the environment
+(Field Patch) and the farmers (Farmer)
+2. Schedule: The moduel defines the order that the model runs in cases there are
+several agent breeds. There are 2 breeds in the base model (Farmer and Field Patch).
+The Farmer can make decision, the Field Patch is static and only change after their
+respective owning Farmer makes decision
+3. SimpleModel: The module defines the inital states and the steps that all farmers
+makes during the time t
+4. Server: The module defines the visualization of the model
+5. Analysis: The module shows the analysis of the model
+##########################
+#          SWEEP         #
+##########################
+"""
+##########################
+# IMPORT GENERIC LIBRARY #
+##########################
+import itertools
+import json
+import os
+import threading
+import time
+import traceback
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+import pandas as pd
+
+##########################
+# IMPORT MODEL COMPONENT #
+##########################
+from SimpleModel import FarmerModel
+
+##########################
+# DEFINE THE RUNS        #
+##########################
+#Name of a run, it is also the name of its file in the store
+def get_run_id(run):
+    return '%s_growth%g_farmers%d_seed%d' % (run['scenario'], run['index_growth'], \
+                                             run['initial_farmers'], run['seed'])
+
+#Seed of the random generators of a run. It only depends on the parameters
+#of the run (not on the order of the runs or on the worker that runs it)
+def get_run_seed(run):
+    parameters = '%s_%r_%d' % (run['scenario'], run['index_growth'], run['initial_farmers'])
+    sequence = np.random.SeedSequence([run['seed'], zlib.crc32(parameters.encode())])
+    return int(sequence.generate_state(1)[0])
+
+#Create the runs of a sweep: scenarios x index_growth x initial_farmers x seeds
+def make_runs(scenarios=('Basic', 'Trend', 'B2', 'A1'), index_growths=(0.01,), \
+              initial_farmers=(30,), seeds=range(10)):
+    runs = []
+    for scenario, index_growth, farmers, seed in itertools.product(scenarios, index_growths, \
+                                                                  initial_farmers, seeds):
+        run = {'scenario': scenario,
+               'index_growth': index_growth,
+               'initial_farmers': farmers,
+               'seed': seed}
+        run['run_id'] = get_run_id(run)
+        run['run_seed'] = get_run_seed(run)
+        runs.append(run)
+    return runs
+
+##########################
+# RUN THE MODELS         #
+##########################
+#Run one model and return its results (step x result)
+def run_one(run, fixed_params, step_count):
+    model = FarmerModel(verbose=False,
+                        scenario=run['scenario'],
+                        index_growth=run['index_growth'],
+                        initial_farmers=run['initial_farmers'],
+                        seed=run['run_seed'],
+                        **fixed_params)
+    values = model.run_model(step_count=step_count)
+    return model.datacollector.names, np.array(values)
+
+#Run a chunk of runs in a worker. An error of a run does not stop the others
+#of the chunk, it is returned with the run
+def run_chunk(chunk, fixed_params, step_count):
+    results = []
+    for run in chunk:
+        start = time.perf_counter()
+        try:
+            names, values = run_one(run, fixed_params, step_count)
+            results.append((run, names, values, None, time.perf_counter() - start))
+        except Exception:
+            results.append((run, None, None, traceback.format_exc(), time.perf_counter() - start))
+    return results
+
+##########################
+# CREATE SWEEP STORE     #
+##########################
+#Define the on-disk store of the results of a sweep
+class SweepStore():
+    ''' This is the on-disk store of a sweep. The results of every finished
+    run are written at once into their own .npy file (step x result, stored
+    column by column), then the run is appended to the manifest runs.jsonl.
+    A run is completed only when it is in the manifest, so an interrupted
+    sweep can be resumed by skipping the completed runs. Runs that failed
+    are written into failed.jsonl and are run again when the sweep resumes.
+        Args:
+            path: the directory of the store'''
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.manifest_path = os.path.join(path, 'runs.jsonl')
+        self.failed_path = os.path.join(path, 'failed.jsonl')
+        self.names = None
+        self.completed = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as manifest:
+                for line in manifest:
+                    # the last line may be cut if the sweep was killed while writing it
+                    try:
+                        run = json.loads(line)
+                    except ValueError:
+                        continue
+                    if os.path.exists(self.get_path(run['run_id'])):
+                        self.completed[run['run_id']] = run
+                        self.names = run['names']
+
+    #Path of the results of a run
+    def get_path(self, run_id):
+        return os.path.join(self.path, run_id + '.npy')
+
+    #Check if a run is completed
+    def is_completed(self, run_id):
+        return run_id in self.completed
+
+    #Write the results of a finished run
+    def write(self, run, names, values, duration):
+        if self.is_completed(run['run_id']):
+            return
+        # write into a temporary file first, so a killed sweep never leaves half a file
+        path = self.get_path(run['run_id'])
+        with open(path + '.tmp', 'wb') as file:
+            np.save(file, np.asfortranarray(values))
+        os.replace(path + '.tmp', path)
+        record = dict(run, names=list(names), steps=int(values.shape[0]), duration=duration)
+        with open(self.manifest_path, 'a') as manifest:
+            manifest.write(json.dumps(record) + '\n')
+        self.completed[run['run_id']] = record
+        self.names = record['names']
+
+    #Write a run that failed
+    def write_failure(self, run, error):
+        with open(self.failed_path, 'a') as failed:
+            failed.write(json.dumps(dict(run, error=error)) + '\n')
+
+    #Get the results of a run (memory-mapped, without reading the file)
+    def get_values(self, run_id):
+        return np.load(self.get_path(run_id), mmap_mode='r')
+
+    #Get the results of all the completed runs as one DataFrame
+    #(parameters of the run, step and results)
+    def load(self):
+        frames = []
+        for run_id, run in self.completed.items():
+            frame = pd.DataFrame(self.get_values(run_id), columns=run['names'])
+            frame.insert(0, 'step', np.arange(len(frame)))
+            for column, name in enumerate(['run_id', 'scenario', 'index_growth', \
+                                           'initial_farmers', 'seed']):
+                frame.insert(column, name, run[name])
+            frames.append(frame)
+        if frames == []:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+##########################
+# CREATE SWEEP RUNNER    #
+##########################
+#Define the runner of a parameter sweep of the model
+class SweepRunner():
+    ''' This is the runner of a parameter sweep of FarmerModel, the parallel
+    version of the Mesa BatchRunner. The runs are grouped into chunks that
+    are run by a pool of processes; every run has its own seed from its
+    parameters, so its results do not depend on the worker or the order.
+    The results are written into the store as soon as a chunk finishes.
+    If a worker dies, the pool cannot tell which chunk killed it: the chunks
+    that were not finished are run again, each in its own pool of one worker,
+    so a crash is only charged to the chunk that caused it (a chunk fails
+    after it crashed max_retries + 1 times on its own).
+        Args:
+            runs: the runs of the sweep (see make_runs)
+            store_path: the directory of the store of the results
+            fixed_params: the other parameters of FarmerModel (e.g. height, width)
+            step_count: the number of steps of each run
+            processes: the number of processes (0 runs everything in this process)
+            chunksize: the number of runs of a chunk
+            max_retries: the number of times a chunk is run again after a crash'''
+    def __init__(self, runs, store_path, fixed_params=None, step_count=15, \
+                 processes=None, chunksize=1, max_retries=2):
+        self.runs = runs
+        self.store = SweepStore(store_path)
+        self.fixed_params = dict(fixed_params or {})
+        self.step_count = step_count
+        self.processes = processes if processes is not None else os.cpu_count()
+        self.chunksize = chunksize
+        self.max_retries = max_retries
+        self.failed = {}
+        self.lock = threading.Lock()   # the chunks run alone write into the store one at a time
+
+    #Runs that are not completed yet, grouped into chunks
+    def get_chunks(self):
+        pending = [run for run in self.runs if not self.store.is_completed(run['run_id'])]
+        return [pending[i:i + self.chunksize] for i in range(0, len(pending), self.chunksize)]
+
+    #Write the results of a chunk into the store
+    def collect(self, results):
+        with self.lock:
+            for run, names, values, error, duration in results:
+                if error is None:
+                    self.store.write(run, names, values, duration)
+                else:
+                    self.failed[run['run_id']] = error
+                    self.store.write_failure(run, error)
+
+    #Run all the runs that are not completed yet
+    def run_all(self):
+        chunks = dict(enumerate(self.get_chunks()))
+        if self.processes == 0:
+            for chunk in chunks.values():
+                self.collect(run_chunk(chunk, self.fixed_params, self.step_count))
+            return self.store
+        try:
+            with ProcessPoolExecutor(self.processes) as pool:
+                futures = {pool.submit(run_chunk, chunk, self.fixed_params, \
+                                       self.step_count): chunk_id \
+                           for chunk_id, chunk in chunks.items()}
+                for future in as_completed(futures):
+                    chunk_id = futures[future]
+                    self.collect(future.result())
+                    del chunks[chunk_id]
+        except BrokenProcessPool:
+            # a worker died: the chunks that were not finished are run alone,
+            # processes of them at a time
+            with ThreadPoolExecutor(self.processes) as threads:
+                list(threads.map(self.run_alone, chunks.values()))
+        return self.store
+
+    #Run a chunk in its own pool of one worker, again after each crash of 
+    #that worker, and write its runs as failed after max_retries + 1 crashes
+    def run_alone(self, chunk):
+        for attempt in range(self.max_retries + 1):
+            try:
+                with ProcessPoolExecutor(1) as pool:
+                    results = pool.submit(run_chunk, chunk, self.fixed_params, self.step_count).result()
+            except BrokenProcessPool:
+                continue
+            self.collect(results)
+            return
+        self.collect([(run, None, None, 'worker crashed', 0.0) for run in chunk])
+
+if __name__ == '__main__':
+    runner = SweepRunner(make_runs(seeds=range(3)), 'sweep_results',
+                         fixed_params={'height': 30, 'width': 30},
+                         step_count=15, chunksize=2)
+    store = runner.run_all()
+    print('Completed runs: %d, failed runs: %d' % (len(store.completed), len(runner.failed)))
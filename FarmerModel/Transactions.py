@@ -0,0 +1,91 @@
+"""
+REPLICATION OF THE ABM MODEL
+An empirical ABM for regional land use/cover change:
+a Dutch case study (version 1.0.0)
+Quyen Nguyen | 16 December 2019
+THE MODEL INCLUDE FIVE COMPONENTS
+1. Agents: The module defines the characteristics and actions of the environment
+(Field Patch) and the farmers (Farmer)
+2. Schedule: The moduel defines the order that the model runs in cases there are
+several agent breeds. There are 2 breeds in the base model (Farmer and Field Patch).
+The Farmer can make decision, the Field Patch is static and only change after their
+respective owning Farmer makes decision
+3. SimpleModel: The module defines the inital states and the steps that all farmers
+makes during the time t
+4. Server: The module defines the visualization of the model
+5. Analysis: The module shows the analysis of the model
+##########################
+#  TRANSACTION HISTORY   #
+##########################
+"""
+##########################
+# IMPORT GENERIC LIBRARY #
+##########################
+import numpy as np
+
+##########################
+# CREATE HISTORY         #
+##########################
+#Define the land transactions of the last years of all the farmers
+class TransactionHistory():
+    ''' This is the history of the land transactions of the farmers, shared
+    by all the farmers of a model: one row per farmer (given when it is
+    created, as the rows of the step draws) in an array N x years used as a
+    ring buffer. Each row has the column of its oldest year (head) and the
+    sum of its years, so adding the transaction of a year overwrites the
+    oldest one and corrects the sum in O(1), and the sums of all the farmers
+    (agent_farm_expansion_sum) are read at once by the array engine. The sum
+    of a row is calculated again every time its head goes round, so the
+    rounding of the corrections does not add up.
+        Args:
+            years: the number of years of the history
+            capacity: the number of rows at the start (doubled when it is full)'''
+    def __init__(self, years=5, capacity=64):
+        self.years = years
+        self.rows = 0
+        self.values = np.zeros((capacity, years))       # transactions of the rows
+        self.head = np.zeros(capacity, dtype=np.int64)  # column of the oldest year of each row
+        self.sums = np.zeros(capacity)                  # sum of the transactions of each row
+
+    #Give a row to a new farmer, with the transactions of its first years
+    #(oldest first)
+    def add_row(self, transactions):
+        if self.rows == len(self.sums):
+            capacity = max(2 * len(self.sums), 16)
+            self.values = np.concatenate((self.values, np.zeros((capacity - self.rows, self.years))))
+            self.head = np.concatenate((self.head, np.zeros(capacity - self.rows, dtype=np.int64)))
+            self.sums = np.concatenate((self.sums, np.zeros(capacity - self.rows)))
+        self.rows += 1
+        self.set_row(self.rows - 1, transactions)
+        return self.rows - 1
+
+    #Set all the transactions of a row (oldest first)
+    def set_row(self, row, transactions):
+        self.values[row] = transactions
+        self.head[row] = 0
+        self.sums[row] = self.values[row].sum()
+
+    #Get the transactions of a row (oldest first)
+    def get_row(self, row):
+        head = self.head[row]
+        values = self.values[row].tolist()
+        return values[head:] + values[:head]
+
+    #Add the transaction of the current year of a row, instead of the oldest one
+    def add(self, row, transaction):
+        head = self.head[row]
+        self.sums[row] += transaction - self.values[row, head]
+        self.values[row, head] = transaction
+        self.head[row] = (head + 1) % self.years
+        if self.head[row] == 0:
+            self.sums[row] = self.values[row].sum()
+
+    #Add the transactions of the current year of many rows (array of distinct rows)
+    def add_rows(self, rows, transactions):
+        heads = self.head[rows]
+        self.sums[rows] += transactions - self.values[rows, heads]
+        self.values[rows, heads] = transactions
+        heads = (heads + 1) % self.years
+        self.head[rows] = heads
+        wrapped = rows[heads == 0]
+        self.sums[wrapped] = self.values[wrapped].sum(axis=1)
@@ -0,0 +1,218 @@
+"""
+REPLICATION OF THE ABM MODEL
+An empirical ABM for regional land use/cover change:
+a Dutch case study (version 1.0.0)
+Quyen Nguyen | 16 December 2019
+THE MODEL INCLUDE FIVE COMPONENTS
+1. Agents: The module defines the characteristics and actions of the environment
+(Field Patch) and the farmers (Farmer)
+2. Schedule: The moduel defines the order that the model runs in cases there are
+several agent breeds. There are 2 breeds in the base model (Farmer and Field Patch).
+The Farmer can make decision, the Field Patch is static and only change after their
+respective owning Farmer makes decision
+3. SimpleModel: The module defines the inital states and the steps that all farmers
+makes during the time t
+4. Server: The module defines the visualization of the model
+5. Analysis: The module shows the analysis of the model
+##########################
+#  RASTER VISUALIZATION  #
+##########################
+"""
+##########################
+# IMPORT GENERIC LIBRARY #
+##########################
+import base64
+from collections import defaultdict
+from types import MappingProxyType
+import numpy as np
+from mesa.visualization.ModularVisualization import VisualizationElement
+from mesa.visualization.modules import CanvasGrid
+
+##########################
+# IMPORT MODEL COMPONENT #
+##########################
+from Agents import FieldPatch, Farmer
+
+#Colors of the field patches: index = landscape elements (field_le > 0.5)
+#+ 2 * nature (field_landuse 4)
+FIELD_COLORS = ["#608960",   # few landscape elements
+                "#00CC00",   # landscape elements
+                "#405c40",   # nature, few landscape elements
+                "#009900"]   # nature, landscape elements
+#Colors of the farmers per agent_type (as the shapes of the farmers, see make_portrayal)
+FARMER_COLORS = {1: "red",
+                 2: "blue",
+                 3: "black",
+                 4: "orange",
+                 5: "gray"}
+
+#Encode an array as base64 text (little-endian bytes)
+def encode(values):
+    values = np.ascontiguousarray(values, dtype=values.dtype.newbyteorder('<'))
+    return base64.b64encode(values.tobytes()).decode('ascii')
+
+##########################
+# CREATE RASTER CANVAS   #
+##########################
+#Define the canvas that draws the fields as a raster and the farmers on top
+class RasterCanvas(VisualizationElement):
+    ''' This is the canvas of the model, the replacement of the CanvasGrid of
+    Mesa for large rasters. The colors of the field patches are calculated
+    at once from the field store as one byte per cell, and only the cells
+    that changed since the last frame are sent (index and color), the whole
+    raster only for the first frame of a model. The farmers are sent as a
+    separate sparse layer (x, y, agent_type). The browser (RasterModule.js,
+    served from the directory of the server) sizes the canvas from the size
+    of the grid of the model, within canvas_width x canvas_height pixels.
+    The frames are made for one browser at a time, as the model of the server.
+        Args:
+            canvas_width, canvas_height: the maximum size of the canvas in pixels'''
+    local_includes = ["RasterModule.js"]
+    def __init__(self, canvas_width=500, canvas_height=500):
+        self.canvas_width = canvas_width
+        self.canvas_height = canvas_height
+        self.js_code = "elements.push(new RasterModule({}, {}, {}, {}));".format(
+            canvas_width, canvas_height, FIELD_COLORS, list(FARMER_COLORS.values())).replace("'", '"')
+        self.model = None       # model of the last frame
+        self.previous = None    # colors of the last frame
+
+    #Colors of all the field patches (index in FIELD_COLORS, 255 without a patch)
+    def get_colors(self, model):
+        fields = model.fields
+        colors = (np.asarray(fields.field_le) > 0.5).astype(np.uint8) + \
+            2 * (np.asarray(model.landscape.landuse) == 4).astype(np.uint8)
+        colors[~fields.exists] = 255
+        return colors
+
+    #Farmers as an array of rows (x, y, agent_type)
+    def get_farmers(self, model):
+        engine = model.engine
+        if engine is not None:
+            # the agent types are kept in the columns of the array engine
+            rows = np.flatnonzero(engine.alive)
+            farmers = [engine.farmers[row] for row in rows]
+            agent_types = engine.agent_type[rows]
+        else:
+            farmers = model.schedule.agents_by_breed[Farmer].values()
+            agent_types = [farmer.agent_type for farmer in farmers]
+        positions = np.array([farmer.pos for farmer in farmers], dtype=np.int64).reshape(-1, 2)
+        return np.column_stack((positions, np.asarray(agent_types, dtype=np.int64)))
+
+    def render(self, model):
+        colors = self.get_colors(model)
+        width, height = colors.shape
+        frame = {'width': width,
+                 'height': height,
+                 'farmers': self.get_farmers(model).ravel().tolist()}
+        if (model is not self.model) or (self.previous is None) or (self.previous.shape != colors.shape):
+            # first frame of the model: the whole raster ([x, y] in the order of the grid)
+            frame['full'] = True
+            frame['cells'] = encode(colors.ravel())
+        else:
+            changed = np.flatnonzero(colors.ravel() != self.previous.ravel()).astype(np.uint32)
+            frame['full'] = False
+            frame['index'] = encode(changed)
+            frame['values'] = encode(colors.ravel()[changed])
+        self.model = model
+        self.previous = colors
+        return frame
+
+##########################
+# CREATE PORTRAYALS      #
+##########################
+#Portrayal of the agents that have the same key (see PortrayalCache.get_key)
+def make_portrayal(key):
+    breed, value = key
+    portrayal = {}
+    if breed is Farmer:
+        portrayal["Filled"]= "true"
+        portrayal["r"]= 0.5
+        portrayal["scale"] = 1
+        portrayal["Layer"]= 1
+        portrayal["Shape"]= 'circle'
+        if value in FARMER_COLORS:
+            portrayal["Color"]= FARMER_COLORS[value]
+    elif breed is FieldPatch:
+        if value:
+            portrayal["Color"] = ["#00FF00", "#00CC00", "#009900"]
+        else:
+            portrayal["Color"] = ["#405c40", "#608960", "#89ac89"]
+        portrayal["Shape"] = "rect"
+        portrayal["Filled"] = "true"
+        portrayal["Layer"] = 0
+        portrayal["w"] = 1
+        portrayal["h"] = 1
+    return portrayal
+
+#Define the cache of the portrayals of the agents
+class PortrayalCache():
+    ''' This is the cache of the portrayals of the canvas. A portrayal only
+    depends on the agent_type of a farmer and on field_le > 0.5 of a field
+    patch, so it is made once per key and shared (read-only) by all the
+    agents with the same key. portray gives a copy for the CanvasGrid of Mesa,
+    which writes the position into the portrayal; portray_grid portrays the
+    whole grid in one call, the fields from the field store at once.'''
+    def __init__(self):
+        self.portrayals = {}    # key -> read-only portrayal
+
+    #Key of the portrayal of an agent (None if the agent is not drawn)
+    @staticmethod
+    def get_key(agent):
+        if type(agent) is Farmer:
+            return (Farmer, agent.agent_type)
+        if type(agent) is FieldPatch:
+            return (FieldPatch, bool(agent.field_le > 0.5))
+        return None
+
+    #Shared portrayal of a key
+    def get(self, key):
+        portrayal = self.portrayals.get(key)
+        if portrayal is None:
+            portrayal = MappingProxyType(make_portrayal(key))
+            self.portrayals[key] = portrayal
+        return portrayal
+
+    #Portrayal of one agent (a new dict, as the portrayal method of a CanvasGrid)
+    def portray(self, agent):
+        key = self.get_key(agent)
+        if key is None:
+            return None
+        return dict(self.get(key))
+
+    #Portrayals of the whole grid, by layer (as CanvasGrid.render)
+    def portray_grid(self, model):
+        grid_state = defaultdict(list)
+        fields = model.fields
+        xs, ys = fields.xs, fields.ys
+        le = (fields.field_le.values > 0.5).tolist()
+        for x, y, value in zip(xs.tolist(), ys.tolist(), le):
+            portrayal = self.get((FieldPatch, value))
+            grid_state[portrayal["Layer"]].append(dict(portrayal, x=x, y=y))
+        for farmer in model.schedule.agents_by_breed[Farmer].values():
+            portrayal = self.get((Farmer, farmer.agent_type))
+            x, y = farmer.pos
+            grid_state[portrayal["Layer"]].append(dict(portrayal, x=int(x), y=int(y)))
+        return grid_state
+
+#Portrayals shared by the canvases of the server
+PORTRAYALS = PortrayalCache()
+
+##########################
+# CREATE PORTRAYAL GRID  #
+##########################
+#Define the CanvasGrid that portrays the whole grid with the portrayal cache
+class PortrayalGrid(CanvasGrid):
+    ''' This is the CanvasGrid of Mesa drawn with the batch portrayals of a
+    PortrayalCache, instead of one call of the portrayal method per content
+    of every cell. The farmers of the array engine are written first.
+        Args:
+            grid_width, grid_height: the size of the grid
+            canvas_width, canvas_height: the size of the canvas in pixels
+            portrayals: the portrayal cache (PORTRAYALS if None)'''
+    def __init__(self, grid_width, grid_height, canvas_width=500, canvas_height=500, portrayals=None):
+        self.portrayals = portrayals if portrayals is not None else PORTRAYALS
+        super().__init__(self.portrayals.portray, grid_width, grid_height, canvas_width, canvas_height)
+
+    def render(self, model):
+        model.sync_farmers()
+        return self.portrayals.portray_grid(model)
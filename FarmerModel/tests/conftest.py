@@ -0,0 +1,28 @@
+"""
+Shared fixtures of the tests of the farmer model. The modules of the model are
+imported from the FarmerModel folder, like in the notebooks and the server.
+"""
+import os
+import sys
+import random
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from SimpleModel import FarmerModel
+
+
+#Create a small model with fake data
+def make_model(scenario='Basic', seed=0, **kwargs):
+    random.seed(seed)
+    np.random.seed(seed)
+    kwargs.setdefault('height', 12)
+    kwargs.setdefault('width', 12)
+    kwargs.setdefault('initial_farmers', 25)
+    return FarmerModel(scenario=scenario, seed=seed, **kwargs)
+
+
+@pytest.fixture
+def model():
+    return make_model()
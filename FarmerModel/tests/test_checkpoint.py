@@ -0,0 +1,29 @@
+"""
+Tests of the checkpoints: the restored model has the same ownership index and
+the same engine columns, and continues the same run.
+"""
+import numpy as np
+import pytest
+
+from Engine import ArrayEngine
+from SimpleModel import FarmerModel
+from conftest import make_model
+
+
+@pytest.mark.parametrize('engine', ['object', 'array'])
+def test_restore_continues_the_run(tmp_path, engine):
+    model = make_model('A1', engine=engine)
+    model.step()
+    model.save_checkpoint(str(tmp_path))
+    restored = FarmerModel.from_checkpoint(str(tmp_path))
+    assert restored.ownership.patches_by_owner == model.ownership.patches_by_owner
+    assert [list(cells) for cells in restored.ownership.patches_by_owner.values()] == \
+           [list(cells) for cells in model.ownership.patches_by_owner.values()]
+    assert restored.ownership.size_by_owner == pytest.approx(model.ownership.size_by_owner)
+    if engine == 'array':
+        for name in ArrayEngine.int_columns + ArrayEngine.float_columns + tuple(ArrayEngine.code_columns):
+            np.testing.assert_array_equal(getattr(restored.engine, name), getattr(model.engine, name))
+    for _ in range(3):
+        model.step()
+        restored.step()
+    np.testing.assert_array_equal(restored.datacollector.get_values(), model.datacollector.get_values())
@@ -0,0 +1,82 @@
+"""
+Tests of the conversion of the real data into a binary dataset: the nodata
+cells of the integer rasters and the dtypes of the field store.
+"""
+import json
+import os
+import numpy as np
+import pandas as pd
+
+from Dataset import RASTERS, FARMER_FILE, FARMER_COLUMNS, MANIFEST, NODATA, \
+                    convert_dataset, load_dataset
+from Agents import Farmer
+from SimpleModel import FarmerModel
+
+
+#Write text rasters of size x size cells whose right half is nodata, and 5 farmers
+def write_real_data(path, size=10, nodata=np.nan):
+    rng = np.random.default_rng(0)
+    empty = np.zeros((size, size), dtype=bool)
+    empty[:, size // 2:] = True
+    for name, (file, dtype) in RASTERS.items():
+        if name == 'fields_id':
+            values = np.arange(1, size * size + 1).reshape(size, size).astype(float)
+        elif name == 'fields_owner':
+            values = rng.integers(1, 6, (size, size)).astype(float)
+        elif name in ('fields_landuse', 'fields_ehs'):
+            values = rng.integers(1, 5, (size, size)).astype(float)
+        else:
+            values = rng.random((size, size))
+        if (name == 'fields_id') or np.isnan(nodata):
+            values[empty] = nodata
+        pd.DataFrame(values).to_csv(os.path.join(path, file), sep=" ", header=False, index=False)
+    farmers = {name: np.ones(5) for name in FARMER_COLUMNS}
+    farmers['agent_id'] = np.arange(1, 6)
+    farmers['agent_x'] = np.arange(5)
+    farmers['agent_y'] = np.arange(5)
+    pd.DataFrame(farmers).to_csv(os.path.join(path, FARMER_FILE), index=False)
+
+
+def test_nodata_of_integer_rasters(tmp_path):
+    write_real_data(str(tmp_path))
+    manifest = convert_dataset(str(tmp_path), str(tmp_path / 'dataset'))
+    with open(str(tmp_path / 'dataset' / MANIFEST)) as file:
+        assert json.load(file) == manifest
+    rasters = load_dataset(str(tmp_path / 'dataset'))[1]
+    for name, value in NODATA.items():
+        assert manifest['rasters'][name]['nodata'] == value
+        assert rasters[name].dtype == RASTERS[name][1]
+        assert (rasters[name][:, 5:] == value).all()
+        assert (rasters[name][:, :5] != value).all()
+    assert np.isnan(rasters['fields_size'][:, 5:]).all()
+
+
+def test_field_store_keeps_dtypes(tmp_path):
+    write_real_data(str(tmp_path))
+    convert_dataset(str(tmp_path), str(tmp_path / 'dataset'))
+    model = FarmerModel(fake_data=False, data_path=str(tmp_path / 'dataset'))
+    assert model.fields.field_id.dtype == np.int32
+    assert model.fields.field_owner_id.dtype == np.int32
+    assert model.fields.field_area.dtype == np.float32
+    assert model.fields.field_landuse.dtype == np.int8
+    assert model.landscape.landuse is model.fields.field_landuse
+    assert model.fields.exists.sum() == 50
+    model.step()
+
+
+def test_nodata_cells_are_not_counted(tmp_path):
+    # only field_id is nodata (0), the other rasters keep values in the empty cells
+    write_real_data(str(tmp_path), size=20, nodata=0)
+    convert_dataset(str(tmp_path), str(tmp_path / 'dataset'))
+    model = FarmerModel(fake_data=False, data_path=str(tmp_path / 'dataset'))
+    fields = model.fields
+    assert fields.exists.sum() == 200
+    assert (fields.field_owner_id[~fields.exists] == -1).all()
+    assert (fields.field_landuse[~fields.exists] == 0).all()
+    assert (fields.field_le[~fields.exists] == 0).all()
+    for farmer in model.schedule.agents_by_breed[Farmer].values():
+        xs, ys = model.landscape.disk_cells(farmer.pos, 10)
+        assert model.landscape.count_within(farmer.pos, 10) == fields.exists[xs, ys].sum()
+        assert model.landscape.count_within(farmer.pos, 10, landuse_class=4) == \
+               (fields.exists & (np.asarray(fields.field_landuse) == 4))[xs, ys].sum()
+        assert all(fields.exists[patch.pos] for patch in model.ownership.get_patches(farmer.agent_id))
@@ -0,0 +1,45 @@
+"""
+Tests of the distances of the model: the buyer registry and the distance
+service use the same metric, and the cached distances follow the owners.
+"""
+import numpy as np
+import pytest
+
+from Agents import Farmer
+from conftest import make_model
+
+
+@pytest.mark.parametrize('torus', [False, True])
+def test_buyer_registry_uses_the_distance_of_the_model(torus):
+    model = make_model(height=12, width=30, initial_farmers=40, torus_distance=torus)
+    assert model.buyers.torus == model.distances.torus == torus
+    farmers = list(model.schedule.agents_by_breed[Farmer].values())
+    for farmer in farmers[::2]:
+        farmer.agent_expansion = 'buy'
+    buyers = list(model.buyers)
+    for farmer in farmers:
+        for buyer in buyers:
+            assert model.buyers.calculate_distance(farmer.pos, buyer.pos) == \
+                   pytest.approx(model.distances.calculate(farmer.pos, buyer.pos))
+        # same buyers as sorting all the buyers by (distance, unique_id)
+        expected = sorted(buyers, key=lambda buyer: (farmer.calculate_distance(buyer), buyer.unique_id))
+        for k in (1, 9, len(buyers)):
+            nearest = model.buyers.find_nearest(farmer.pos, k=k)
+            assert [buyer for distance, buyer in nearest] == expected[:k]
+            assert [distance for distance, buyer in nearest] == \
+                   pytest.approx([farmer.calculate_distance(buyer) for buyer in expected[:k]])
+
+
+def test_distance_follows_the_owner():
+    model = make_model(initial_farmers=10)
+    farmers = list(model.schedule.agents_by_breed[Farmer].values())
+    seller, buyer = farmers[0], farmers[1]
+    pos = model.ownership.get_positions(seller.agent_id)[0]
+    assert model.distances.get_owner_distance(pos) == pytest.approx(model.distances.calculate(pos, seller.pos))
+    model.ownership.transfer(pos, buyer.agent_id)
+    assert model.distances.get_owner_distance(pos) == pytest.approx(model.distances.calculate(pos, buyer.pos))
+    xs, ys = zip(*model.ownership.get_positions(buyer.agent_id))
+    np.testing.assert_allclose(model.distances.get_distances(xs, ys, buyer),
+                               model.distances.calculate_many(xs, ys, buyer.pos))
+    model.ownership.transfer(pos, None)
+    assert model.distances.get_owner_distance(pos) is None
@@ -0,0 +1,38 @@
+import pytest
+from Agents import Farmer
+from Benchmark import check_conformance
+
+
+#Force the paths that a run of the model does not reach: a third of the 
+#farmers want to buy land and (in A1) some old farmers stop farming
+def force_buyers_and_cessation(model):
+    farmers = list(model.schedule.agents_by_breed[Farmer].values())
+    for i, farmer in enumerate(farmers):
+        if i % 3 == 0:
+            farmer.agent_expansion = "buy"
+        elif (i % 5 == 1) and (model.scenario == "A1"):
+            farmer.agent_age = 84
+            farmer.agent_cessation = "stop"
+
+
+@pytest.mark.parametrize('scenario', ['Basic', 'Trend', 'A1'])
+@pytest.mark.parametrize('market', ['sequential', 'batched'])
+def test_array_engine_matches_object_engine(scenario, market):
+    for seed in range(2):
+        check_conformance(scenario, seed, step_count=5, market=market)
+
+
+@pytest.mark.parametrize('scenario', ['Basic', 'Trend', 'A1'])
+@pytest.mark.parametrize('market', ['sequential', 'batched'])
+def test_engines_match_with_buyers_and_cessation(scenario, market):
+    bought = removed = 0
+    for seed in range(3):
+        models = check_conformance(scenario, seed, step_count=5, market=market,
+                                   prepare=force_buyers_and_cessation)
+        farmers = models['object'].schedule.agents_by_breed[Farmer]
+        bought += sum(farmer.agent_expansion == "bought" for farmer in farmers.values())
+        removed += 100 - len(farmers)
+    #The forced paths are taken
+    assert bought > 0
+    if scenario == "A1":
+        assert removed > 0
@@ -0,0 +1,51 @@
+"""
+Tests of the field store: one row per field patch, read and written by the
+position of the patches, and the empty cells of the grid.
+"""
+import numpy as np
+
+from Agents import Farmer
+from Dataset import convert_dataset
+from SimpleModel import FarmerModel
+from test_dataset import write_real_data
+
+
+def make_real_model(path):
+    write_real_data(path, size=20, nodata=0)
+    convert_dataset(path, path + '/dataset')
+    return FarmerModel(fake_data=False, data_path=path + '/dataset', verbose=False)
+
+
+def test_columns_have_one_row_per_field(tmp_path):
+    model = make_real_model(str(tmp_path))
+    fields = model.fields
+    assert len(fields) == 200
+    for name in fields.columns:
+        assert getattr(fields, name).values.shape == (200,)
+    # rows in the order of the grid, and the map of the cells to the rows
+    assert (np.diff(fields.cells) > 0).all()
+    assert (fields.row[fields.xs, fields.ys] == np.arange(200)).all()
+    assert (fields.row[~fields.exists] == -1).all()
+    # a cell without a field patch reads the nodata value, also after it is written
+    x, y = np.argwhere(~fields.exists)[0]
+    fields.field_owner_id[x, y] = 3
+    assert fields.field_owner_id[x, y] == -1
+    x, y = fields.xs[5], fields.ys[5]
+    fields.field_le[x, y] = 0.25
+    assert fields.field_le.values[5] == 0.25
+    assert np.asarray(fields.field_le)[x, y] == 0.25
+
+
+def test_empty_cells(tmp_path):
+    model = make_real_model(str(tmp_path))
+    grid, fields = model.grid, model.fields
+    farmers = list(model.schedule.agents_by_breed[Farmer].values())
+    occupied = {farmer.pos for farmer in farmers}
+    empties = {(int(x), int(y)) for x, y in np.argwhere(~fields.exists)} - occupied
+    assert grid.empties == empties
+    assert grid.exists_empty_cells()
+    assert all(grid.is_cell_empty(pos) for pos in empties)
+    assert not any(grid.is_cell_empty((int(x), int(y))) for x, y in zip(fields.xs, fields.ys))
+    grid.move_to_empty(farmers[0])
+    assert farmers[0].pos in empties
+    assert farmers[0].pos not in grid.empties
@@ -0,0 +1,43 @@
+"""
+Tests of the land use raster: the count maps give the same counts as counting
+the patches within the radius one by one, with and without wrapping around
+the borders, also after the land use changes.
+"""
+import random
+import numpy as np
+import pytest
+
+from Agents import Farmer
+from conftest import make_model
+
+
+#Count the patches of a land use class within a radius of a farmer, one by one
+def count_directly(model, farmer, radius, landuse_class=None):
+    fields = model.fields
+    landuse = np.asarray(fields.field_landuse)
+    count = 0
+    for x, y in zip(fields.xs.tolist(), fields.ys.tolist()):
+        if landuse_class == None:
+            in_class = landuse[x, y] > 0
+        else:
+            in_class = landuse[x, y] == landuse_class
+        if in_class and (model.distances.calculate(farmer.pos, (x, y)) < radius):
+            count += 1
+    return count
+
+
+@pytest.mark.parametrize('torus', [False, True])
+def test_counts_match_direct_counts(torus):
+    model = make_model(height=12, width=30, initial_farmers=20, torus_distance=torus)
+    farmers = list(model.schedule.agents_by_breed[Farmer].values())
+    rng = random.Random(0)
+    for change in range(4):
+        for farmer in farmers:
+            for radius in (3, 10, 16):
+                for landuse_class in (None, 4):
+                    assert model.landscape.count_within(farmer.pos, radius, landuse_class) == \
+                           count_directly(model, farmer, radius, landuse_class)
+        # change the land use of some patches, the count maps are updated around them
+        for _ in range(10):
+            x, y = rng.randrange(model.fields.width), rng.randrange(model.fields.height)
+            model.landscape.set_landuse((x, y), rng.choice([1, 2, 3, 4]))
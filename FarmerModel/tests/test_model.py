@@ -0,0 +1,22 @@
+import numpy as np
+from conftest import make_model
+
+
+def test_result_does_not_share_the_collector_buffer():
+    model = make_model()
+    result = model.run_model(step_count=2)
+    expected = result.copy()
+    model.datacollector.data[:] = np.nan
+    np.testing.assert_array_equal(result, expected)
+    assert result.shape == (3, len(model.datacollector.names))
+
+
+def test_non_square_grid():
+    from Benchmark import check_conformance
+    from Visualization import RasterCanvas
+    models = check_conformance('Basic', 0, step_count=3, height=12, width=20, initial_farmers=25)
+    for model in models.values():
+        assert model.fields.field_id.shape == (model.grid.width, model.grid.height) == (12, 20)
+        assert all(model.fields.exists[farmer.pos] for farmer in model.schedule.agents)
+        frame = RasterCanvas().render(model)
+        assert (frame['width'], frame['height']) == (12, 20)
@@ -0,0 +1,51 @@
+"""
+Tests of the ownership index: the index kept up to date by the land
+transactions is the same as an index built again from the field store.
+"""
+import random
+import pytest
+
+from Agents import Farmer
+from Ownership import OwnershipIndex
+from conftest import make_model
+from test_engine import force_buyers_and_cessation
+
+
+#Compare the index of the model with an index built from the field store
+def check_index(model):
+    ownership = model.ownership
+    built = OwnershipIndex(model.schedule, Farmer, model.fields)
+    built.build()
+    assert {owner_id: set(cells) for owner_id, cells in ownership.patches_by_owner.items()} == \
+           {owner_id: set(cells) for owner_id, cells in built.patches_by_owner.items()}
+    assert dict(ownership.size_by_owner) == pytest.approx(dict(built.size_by_owner))
+    assert ownership.get_size(9999) == pytest.approx(built.get_size(9999))
+    for owner_id in built.patches_by_owner:
+        assert ownership.get_positions(owner_id) == built.get_positions(owner_id)
+        assert ownership.get_patches(owner_id) == built.get_patches(owner_id)
+
+
+@pytest.mark.parametrize('engine', ['object', 'array'])
+@pytest.mark.parametrize('market', ['sequential', 'batched'])
+def test_index_matches_a_new_build(engine, market):
+    model = make_model('A1', engine=engine, market=market)
+    force_buyers_and_cessation(model)
+    if model.engine is not None:
+        model.engine.load()
+    for _ in range(5):
+        model.step()
+        check_index(model)
+
+
+def test_patches_follow_the_transfers():
+    model = make_model(initial_farmers=10)
+    ownership = model.ownership
+    owners = list(ownership.patches_by_owner)
+    rng = random.Random(0)
+    for _ in range(50):
+        # the kept lists of the owners are read before every transfer
+        for owner_id in owners:
+            ownership.get_patches(owner_id)
+        x, y = rng.randrange(model.fields.width), rng.randrange(model.fields.height)
+        ownership.transfer((x, y), rng.choice(owners + [9999, None]))
+        check_index(model)
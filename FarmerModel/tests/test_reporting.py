@@ -0,0 +1,14 @@
+import json
+from Reporting import JsonLinesReporter
+from conftest import make_model
+
+
+def test_json_lines_reporter_is_flushed_and_closed(tmp_path):
+    path = tmp_path / 'results.jsonl'
+    with JsonLinesReporter(str(path)) as reporter:
+        model = make_model(reporter=reporter)
+        model.run_model(step_count=2)
+        #The results of the run are in the file before the reporter is closed
+        records = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [record['step'] for record in records] == [0, 1, 2]
+    assert reporter.file.closed
@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+from Scenarios import load_scenarios, SCENARIO_PATH
+
+
+#p_exogenous_expand of the if-chains of the original model, None if not set
+def original_exogenous_expand(scenario, agent_type):
+    if scenario == 'Basic':
+        return 0
+    if scenario == 'B2':
+        return 0.3 if agent_type < 4 else None
+    if agent_type < 4:
+        return 0.2
+    return 0.3 if scenario == 'Trend' else 0.4
+
+
+@pytest.mark.parametrize('scenario', ['Basic', 'Trend', 'B2', 'A1'])
+def test_exogenous_expand_of_all_agent_types(scenario):
+    tables = load_scenarios(SCENARIO_PATH)
+    for agent_type in range(0, 9):
+        value = tables.get_exogenous(tables.get_scenario(scenario), agent_type, 1)[2]
+        expected = original_exogenous_expand(scenario, agent_type)
+        if expected is None:
+            assert np.isnan(value)
+        else:
+            assert value == expected
@@ -0,0 +1,89 @@
+import numpy as np
+from mesa import Agent, Model
+from Agents import Farmer
+from Schedule import RandomActivationByBreed
+from conftest import make_model
+
+
+#Agent that removes other agents (or adds a new one) when it is stepped
+class Walker(Agent):
+    def __init__(self, unique_id, model, remove=(), add=None):
+        super().__init__(unique_id, model)
+        self.remove = remove
+        self.add = add
+        self.steps = 0
+
+    def step(self):
+        self.steps += 1
+        for unique_id in self.remove:
+            if unique_id in self.model.schedule.agents_by_breed[Walker]:
+                self.model.schedule.remove(self.model.walkers[unique_id])
+        if self.add is not None:
+            self.model.schedule.add(self.model.walkers[self.add])
+
+
+def make_walkers(number, seed, remove, add=None):
+    model = Model()
+    model.rng_schedule = np.random.default_rng(seed)
+    model.schedule = RandomActivationByBreed(model)
+    model.walkers = {i: Walker(i, model, remove.get(i, ()), add if i == 0 else None) \
+                     for i in range(number + 1)}
+    for i in range(number):
+        model.schedule.add(model.walkers[i])
+    return model
+
+
+def test_removed_agents_are_skipped():
+    for seed in range(20):
+        #Agent 0 removes the first, the last and a middle agent, agent 5 removes 
+        #agents that can have moved into the place of removed ones, agent 0 adds one
+        remove = {0: (1, 9, 4), 5: (8, 2, 0)}
+        model = make_walkers(10, seed, remove, add=10)
+        model.schedule.step()
+        #The same step with a snapshot of the agents
+        expected = make_walkers(10, seed, remove, add=10)
+        agents = expected.schedule.agents_by_breed[Walker]
+        for agent in agents.shuffled(expected.schedule.rng):
+            if agent.unique_id in agents:
+                agent.step()
+        assert [walker.steps for walker in model.walkers.values()] == \
+            [walker.steps for walker in expected.walkers.values()]
+        assert model.walkers[10].steps == 0
+        assert max(walker.steps for walker in model.walkers.values()) == 1
+        #The agents are in the same positions after the step
+        assert [agent.unique_id for agent in model.schedule.agents_by_breed[Walker].values()] == \
+            [agent.unique_id for agent in agents.values()]
+
+
+def test_removed_farmer_is_skipped(monkeypatch):
+    model = make_model()
+    farmers = model.schedule.agents_by_breed[Farmer]
+    stepped = []
+    step = Farmer.step
+
+    #The first farmer of the step removes all the farmers that are not stepped yet
+    def step_and_remove(farmer):
+        stepped.append(farmer.unique_id)
+        if len(stepped) == 1:
+            for other in list(farmers.values()):
+                if other is not farmer:
+                    model.remove_farmer(other)
+        step(farmer)
+
+    monkeypatch.setattr(Farmer, 'step', step_and_remove)
+    model.schedule.step_breed(Farmer)
+    assert len(stepped) == 1
+    assert list(farmers.keys()) == [stepped[0]]
+
+
+#The field patches are not in the schedule, a step only activates the farmers
+def test_step_activates_only_farmers(monkeypatch):
+    model = make_model()
+    assert [breed for breed, agents in model.schedule.agents_by_breed.items() if len(agents) > 0] == [Farmer]
+    stepped = []
+    step = Farmer.step
+    monkeypatch.setattr(Farmer, 'step', lambda farmer: (stepped.append(farmer.unique_id), step(farmer)))
+    model.step()
+    assert len(stepped) == len(set(stepped))
+    assert set(stepped) == set(model.schedule.agents_by_breed[Farmer])
+    assert len(model.schedule.agents) == len(stepped)
@@ -0,0 +1,20 @@
+import pytest
+from Agents import Farmer
+from conftest import make_model
+
+
+@pytest.mark.parametrize('engine', ['object', 'array'])
+def test_statistics_match_recalculation(engine):
+    model = make_model(check_statistics=True, engine=engine)
+    model.run_model(step_count=3)
+    model.statistics.check()
+
+
+def test_recalculate_reads_the_schedule():
+    model = make_model()
+    farmers = list(model.schedule.agents_by_breed[Farmer].values())
+    #A farmer that leaves the schedule without passing through the statistics
+    model.schedule.remove(farmers[0])
+    values = model.statistics.recalculate()
+    assert values['total_agents'] == len(farmers) - 1
+    assert model.statistics.calculate()['total_agents'] == len(farmers)
@@ -0,0 +1,80 @@
+import json
+import os
+import Sweep
+from Sweep import SweepRunner, make_runs
+
+FIXED_PARAMS = {'height': 8, 'width': 8}
+
+
+#Worker that dies (like a killed process) the first time it runs a chunk
+def crash_once(chunk, fixed_params, step_count):
+    marker = os.path.join(fixed_params.pop('marker'), 'crashed')
+    if not os.path.exists(marker):
+        open(marker, 'w').close()
+        os._exit(1)
+    return run_chunk(chunk, fixed_params, step_count)
+
+
+#Worker that always dies
+def crash_always(chunk, fixed_params, step_count):
+    os._exit(1)
+
+
+#Worker that dies on the runs with the seed 1 (a run that always crashes)
+def crash_seed_1(chunk, fixed_params, step_count):
+    if any(run['seed'] == 1 for run in chunk):
+        os._exit(1)
+    return run_chunk(chunk, fixed_params, step_count)
+
+
+run_chunk = Sweep.run_chunk
+
+
+def test_failed_b2_runs_are_recorded(tmp_path):
+    assert [run['scenario'] for run in make_runs(seeds=[0])] == ['Basic', 'Trend', 'B2', 'A1']
+    runs = make_runs(scenarios=['Basic', 'B2'], initial_farmers=[10], seeds=[0])
+    runner = SweepRunner(runs, str(tmp_path / 'store'), fixed_params=FIXED_PARAMS,
+                         step_count=2, processes=0)
+    store = runner.run_all()
+    # the baseline model fails in B2 (no national landscape), the run is recorded as failed
+    assert list(store.completed) == [runs[0]['run_id']]
+    assert list(runner.failed) == [runs[1]['run_id']]
+    assert 'national_landscape' in runner.failed[runs[1]['run_id']]
+    with open(str(tmp_path / 'store' / 'failed.jsonl')) as failed:
+        assert [json.loads(line)['run_id'] for line in failed] == [runs[1]['run_id']]
+
+
+def test_crashed_chunk_is_run_again(tmp_path, monkeypatch):
+    monkeypatch.setattr(Sweep, 'run_chunk', crash_once)
+    runs = make_runs(scenarios=['Basic'], initial_farmers=[10], seeds=[0])
+    runner = SweepRunner(runs, str(tmp_path / 'store'), step_count=2, processes=1,
+                         fixed_params=dict(FIXED_PARAMS, marker=str(tmp_path)))
+    store = runner.run_all()
+    assert os.path.exists(tmp_path / 'crashed')
+    assert runner.failed == {}
+    assert list(store.completed) == [runs[0]['run_id']]
+    assert store.get_values(runs[0]['run_id']).shape[0] == 3
+
+
+def test_chunk_fails_after_max_retries(tmp_path, monkeypatch):
+    monkeypatch.setattr(Sweep, 'run_chunk', crash_always)
+    runs = make_runs(scenarios=['Basic'], initial_farmers=[10], seeds=[0])
+    runner = SweepRunner(runs, str(tmp_path / 'store'), fixed_params=FIXED_PARAMS,
+                         step_count=2, processes=1, max_retries=1)
+    store = runner.run_all()
+    assert runner.failed == {runs[0]['run_id']: 'worker crashed'}
+    assert store.completed == {}
+    assert os.path.exists(tmp_path / 'store' / 'failed.jsonl')
+
+
+def test_crash_is_charged_to_its_chunk(tmp_path, monkeypatch):
+    monkeypatch.setattr(Sweep, 'run_chunk', crash_seed_1)
+    runs = make_runs(scenarios=['Basic'], initial_farmers=[10], seeds=range(6))
+    runner = SweepRunner(runs, str(tmp_path / 'store'), fixed_params=FIXED_PARAMS,
+                         step_count=2, processes=2, max_retries=1)
+    store = runner.run_all()
+    # only the run that crashes is lost, the other runs of the pool complete
+    assert runner.failed == {runs[1]['run_id']: 'worker crashed'}
+    assert sorted(store.completed) == sorted(run['run_id'] for run in runs if run['seed'] != 1)
+    with open(str(tmp_path / 'store' / 'failed.jsonl')) as failed:
+        assert [json.loads(line)['run_id'] for line in failed] == [runs[1]['run_id']]
@@ -0,0 +1,46 @@
+"""
+Tests of the transaction history: the ring buffer keeps the same years and
+sums as a list of the last five years of each farmer.
+"""
+import numpy as np
+import pytest
+
+from Agents import Farmer
+from Transactions import TransactionHistory
+from conftest import make_model
+
+
+def test_history_matches_lists():
+    rng = np.random.default_rng(0)
+    history = TransactionHistory(years=5, capacity=2)
+    lists = []
+    for step in range(40):
+        # new farmers join, more than the capacity at the start
+        if step % 4 == 0:
+            transactions = rng.integers(-2, 3, 5).astype(float).tolist()
+            assert history.add_row(transactions) == len(lists)
+            lists.append(transactions)
+        # repeated values, which list.remove(value) of the oldest year gets wrong
+        values = rng.integers(-1, 2, len(lists)).astype(float) * 0.1
+        if step % 2 == 0:
+            for row, value in enumerate(values.tolist()):
+                history.add(row, value)
+        else:
+            rows = rng.permutation(len(lists))
+            history.add_rows(rows, values[rows])
+        for row, value in enumerate(values.tolist()):
+            lists[row] = lists[row][1:] + [value]
+        for row, transactions in enumerate(lists):
+            assert history.get_row(row) == transactions
+            assert history.sums[row] == pytest.approx(sum(transactions))
+
+
+@pytest.mark.parametrize('engine', ['object', 'array'])
+def test_farmers_read_their_history(engine):
+    model = make_model('A1', engine=engine)
+    for _ in range(7):
+        model.step()
+    model.sync_farmers()
+    for farmer in model.schedule.agents_by_breed[Farmer].values():
+        assert len(farmer.agent_transactions) == 5
+        assert farmer.agent_farm_expansion_sum == pytest.approx(sum(farmer.agent_transactions))
@@ -0,0 +1,70 @@
+"""
+Tests of the portrayals of the canvas: the portrayal cache and the batch
+portrayal of the grid draw the same as the CanvasGrid of Mesa with the
+portrayal method of the agents.
+"""
+import pytest
+from mesa.visualization.modules import CanvasGrid
+
+from Agents import FieldPatch, Farmer
+from Visualization import PortrayalCache, PortrayalGrid
+from conftest import make_model
+
+
+#Portrayal of an agent made for every agent (FarmerPotrayal of the server
+#before the portrayal cache)
+def portray_agent(agent):
+    if agent is None:
+        return
+    portrayal = {}
+    if type(agent) is Farmer:
+        portrayal["Filled"]= "true"
+        portrayal["r"]= 0.5
+        portrayal["scale"] = 1
+        portrayal["Layer"]= 1
+        portrayal["Shape"]= 'circle'
+        colors = {1: "red", 2: "blue", 3: "black", 4: "orange", 5: "gray"}
+        if agent.agent_type in colors:
+            portrayal["Color"]= colors[agent.agent_type]
+    elif type(agent) is FieldPatch:
+        if agent.field_le >0.5:
+            portrayal["Color"] = ["#00FF00", "#00CC00", "#009900"]
+        elif agent.field_le <=0.5:
+            portrayal["Color"] = ["#405c40", "#608960", "#89ac89"]
+        portrayal["Shape"] = "rect"
+        portrayal["Filled"] = "true"
+        portrayal["Layer"] = 0
+        portrayal["w"] = 1
+        portrayal["h"] = 1
+    return portrayal
+
+
+#Portrayals of a layer in a fixed order, to compare the grids
+def sort_layer(portrayals):
+    return sorted(portrayals, key=lambda portrayal: (portrayal["x"], portrayal["y"], repr(portrayal)))
+
+
+def test_portray_is_the_portrayal_of_the_agent():
+    model = make_model(height=12, width=20)
+    portrayals = PortrayalCache()
+    for agent in list(model.fields.iter_patches()) + list(model.schedule.agents_by_breed[Farmer].values()):
+        portrayal = portrayals.portray(agent)
+        assert portrayal == portray_agent(agent)
+        # a new dict each time, the shared portrayal is not changed by the canvas
+        portrayal["x"] = 0
+        assert "x" not in portrayals.portray(agent)
+
+
+@pytest.mark.parametrize('engine', ['object', 'array'])
+def test_portrayal_grid_draws_as_the_canvas_grid(engine):
+    model = make_model('A1', height=12, width=20, engine=engine)
+    canvas = CanvasGrid(portray_agent, model.grid.width, model.grid.height, 500, 500)
+    portrayal_grid = PortrayalGrid(model.grid.width, model.grid.height, 500, 500, PortrayalCache())
+    for _ in range(3):
+        model.step()
+        model.sync_farmers()
+        expected = canvas.render(model)
+        grid_state = portrayal_grid.render(model)
+        assert sorted(grid_state) == sorted(expected)
+        for layer in expected:
+            assert sort_layer(grid_state[layer]) == sort_layer(expected[layer])